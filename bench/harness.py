@@ -0,0 +1,284 @@
+"""
+Benchmark harness for the example scripts.
+
+Runs each script the way the web worker does (with the `gcoordinator_web`
+runtime installed, then `GCode(full_object).generate()`), timing the
+gcoordinator stages the scripts spend their time in. The same module runs
+under CPython (`bench/run.py`) and inside Pyodide under Node
+(`bench/pyodide.mjs`), so the results of both can be compared.
+
+Stage times are inclusive: a `Path` created inside `line_infill` counts for
+both stages, and `script` covers everything the script itself does. The
+result cache is cleared before every run so cached infill does not hide
+regressions.
+
+Functions:
+- scale_overrides: Returns the constant overrides of a scaled-up variant.
+- run_script: Runs one script and returns its timings.
+- run_suite: Runs scripts and scaled variants and returns the results.
+- compare: Compares two result sets and returns the regressions.
+"""
+
+import ast
+import contextlib
+import gc as garbage_collector
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Top-level constants of the examples that set the amount of work; a variant
+# with scale `s` multiplies each of them by `s`.
+SCALED_CONSTANTS = (
+    'TOTAL_LAYERS', 'PEAK_LAYER', 'PHASE_INVERSION_LAYERS',
+    'WALL_POINTS_PER_SIDE', 'WALL_POINTS_PER_LAYER', 'SPIRAL_POINTS_PER_TURN',
+)
+DEFAULT_THRESHOLD = 0.10  # relative slowdown reported as a regression
+
+
+class _StageTimer:
+    """Accumulates the time and call count of the instrumented stages."""
+
+    def __init__(self) -> None:
+        self.times = {}
+        self.calls = {}
+        self._active = set()
+
+    def wrap(self, stage: str, func):
+        def wrapper(*args, **kwargs):
+            if stage in self._active:  # recursion is timed by the outer call
+                return func(*args, **kwargs)
+            self._active.add(stage)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._active.discard(stage)
+                self.times[stage] = self.times.get(stage, 0.0) + time.perf_counter() - start
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+
+@contextlib.contextmanager
+def _instrumented(timer: _StageTimer):
+    """Patches the timed stages into gcoordinator for the duration of a run."""
+    import gcoordinator
+    from gcoordinator import infill_generator, path_generator, path_transformer
+
+    patches = [
+        (path_generator.Path, '__init__', 'Path', False),
+        (path_generator.PathList, 'sort_paths', 'sort_paths', False),
+        (path_transformer.Transform, 'offset', 'offset', True),
+        (gcoordinator.GCode, '__init__', 'prepare', False),
+        (gcoordinator.GCode, 'generate', 'generate', False),
+    ]
+    for name in ('line_infill', 'gyroid_infill'):
+        patches += [(infill_generator, name, name, False), (gcoordinator, name, name, False)]
+
+    saved = []
+    wrapped = {}
+    for owner, name, stage, static in patches:
+        original = owner.__dict__[name] if isinstance(owner, type) else getattr(owner, name)
+        saved.append((owner, name, original))
+        func = original.__func__ if static else original
+        # the same function patched on two modules is wrapped once
+        replacement = wrapped.setdefault(id(func), timer.wrap(stage, func))
+        setattr(owner, name, staticmethod(replacement) if static else replacement)
+    try:
+        yield
+    finally:
+        for owner, name, original in reversed(saved):
+            setattr(owner, name, original)
+
+
+def scale_overrides(code: str, scale: float) -> dict:
+    """
+    Returns the overrides that scale the work of a script by `scale`.
+
+    Args:
+        code (str): The source of the script.
+        scale (float): The factor for every constant in `SCALED_CONSTANTS`
+            assigned at the top level of the script.
+
+    Returns:
+        dict: Maps constant names to their scaled values; empty if the script
+        has none of them.
+    """
+    overrides = {}
+    for node in ast.parse(code).body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1):
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name) or target.id not in SCALED_CONSTANTS:
+            continue
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, int):
+            overrides[target.id] = max(1, round(node.value.value * scale))
+    return overrides
+
+
+def _execute(code: str, timer: _StageTimer) -> dict:
+    """Runs a script and generates its G-code; returns the run's counters."""
+    import gcoordinator_web
+
+    gcoordinator_web.memo.clear_cache()
+    gcoordinator_web.begin_run()
+    namespace = {'__name__': '__main__'}
+    with _instrumented(timer):
+        start = time.perf_counter()
+        exec(compile(code, '<script>', 'exec'), namespace)
+        timer.add('script', time.perf_counter() - start)
+        gcode = gcoordinator_web.GCode(namespace['full_object'])
+        text = gcode.generate()
+    return {
+        'paths': len(gcode.full_object),
+        'points': sum(len(path.x) for path in gcode.full_object),
+        'gcode_bytes': len(text.encode()),
+    }
+
+
+def run_script(name: str, code: str, repeat: int = 3, memory: bool = True) -> dict:
+    """
+    Runs a script `repeat` times and returns the median time of each stage.
+
+    Args:
+        name (str): The name reported for the script.
+        code (str): The script source; it must assign `full_object`.
+        repeat (int): Timed runs; the median of each stage is reported.
+        memory (bool): Whether to measure the peak memory in an extra run
+            with `tracemalloc`, which would slow down the timed runs.
+
+    Returns:
+        dict: `name`, `repeat`, `total` (s, script and G-code), `stages`
+        (stage -> {'time': s, 'calls': n}), `peak_memory` (bytes traced by
+        `tracemalloc`, NumPy arrays included, or None) and the `paths`,
+        `points` and `gcode_bytes` of the output.
+    """
+    runs = []
+    for _ in range(repeat):
+        garbage_collector.collect()
+        timer = _StageTimer()
+        start = time.perf_counter()
+        counters = _execute(code, timer)
+        total = time.perf_counter() - start
+        runs.append((total, timer))
+
+    peak_memory = None
+    if memory:
+        garbage_collector.collect()
+        tracemalloc.start()
+        try:
+            _execute(code, _StageTimer())
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    stages = {}
+    for stage in sorted({stage for _, timer in runs for stage in timer.times}):
+        stages[stage] = {
+            'time': statistics.median(timer.times.get(stage, 0.0) for _, timer in runs),
+            'calls': runs[0][1].calls.get(stage, 0),
+        }
+    return {
+        'name': name,
+        'repeat': repeat,
+        'total': statistics.median(total for total, _ in runs),
+        'stages': stages,
+        'peak_memory': peak_memory,
+        **counters,
+    }
+
+
+def environment() -> dict:
+    """Returns the interpreter and library versions the results belong to."""
+    import numpy
+
+    try:
+        from importlib.metadata import version
+        gcoordinator_version = version('gcoordinator')
+    except Exception:
+        gcoordinator_version = None
+    return {
+        'runtime': 'pyodide' if sys.platform == 'emscripten' else platform.python_implementation(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': numpy.__version__,
+        'gcoordinator': gcoordinator_version,
+    }
+
+
+def run_suite(scripts: dict, scales=(1,), repeat: int = 3, memory: bool = True, log=None) -> dict:
+    """
+    Runs every script at every scale.
+
+    Args:
+        scripts (dict): Maps script names (e.g. 'vase2.py') to their source.
+        scales (iterable): Scale factors, see `scale_overrides`; scales other
+            than 1 are skipped for scripts without scalable constants.
+        repeat (int): Timed runs per script and scale.
+        memory (bool): Whether to measure peak memory.
+        log (callable, optional): Receives one progress line per finished run.
+
+    Returns:
+        dict: `environment` (see `environment`) and `results`, a list of
+        `run_script` results with an added `scale`.
+    """
+    import gcoordinator_web
+
+    gcoordinator_web.install()
+    results = []
+    for name, code in scripts.items():
+        for scale in scales:
+            overrides = scale_overrides(code, scale) if scale != 1 else {}
+            if scale != 1 and not overrides:
+                continue
+            source = gcoordinator_web.sweep.apply_overrides(code, overrides)
+            label = name if scale == 1 else f'{name} x{scale:g}'
+            result = run_script(label, source, repeat, memory)
+            result['scale'] = scale
+            results.append(result)
+            if log is not None:
+                log(f"{label:28} {result['total']:8.3f} s  {result['points']:>9} pts")
+    return {'environment': environment(), 'results': results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compares the totals and stage times of two `run_suite` results.
+
+    Args:
+        baseline (dict): The reference results.
+        current (dict): The results to check.
+        threshold (float): The relative slowdown that counts as a regression.
+
+    Returns:
+        list: One row per script present in both, as dicts with `name`,
+        `baseline` and `current` totals (s), their `ratio`, `regression`
+        (bool) and `stages`, the ratio of every stage present in both.
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        ratio = result['total'] / before['total'] if before['total'] else float('inf')
+        stages = {
+            stage: timing['time'] / before['stages'][stage]['time']
+            for stage, timing in result['stages'].items()
+            if before['stages'].get(stage, {}).get('time')
+        }
+        rows.append({
+            'name': result['name'],
+            'baseline': before['total'],
+            'current': result['total'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+            'stages': stages,
+        })
+    return rows
@@ -0,0 +1,131 @@
+// Benchmarks the example scripts in Pyodide under Node, for in-browser
+// numbers. Takes the same arguments as bench/run.py except --baseline and
+// --compare (compare the output files with `python bench/run.py --compare`):
+//
+//   node bench/pyodide.mjs --scale 1 2 -o pyodide.json
+//
+// Pyodide comes from node_modules; numpy and micropip are fetched from the
+// Pyodide CDN on first use.
+import { readFileSync, readdirSync, writeFileSync } from "node:fs";
+import path from "node:path";
+import { fileURLToPath } from "node:url";
+import { loadPyodide } from "pyodide";
+
+const ROOT = path.resolve(path.dirname(fileURLToPath(import.meta.url)), "..");
+const WHEEL = "gcoordinator-0.0.2-py3-none-any.whl";
+const RUNTIME_DIR = "/home/pyodide/runtime";
+const BENCH_DIR = "/home/pyodide/bench";
+
+function parseArgs(argv) {
+  const args = {
+    scripts: [],
+    examples: path.join(ROOT, "public", "example"),
+    scale: [1],
+    repeat: 3,
+    memory: true,
+    output: null,
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (arg === "--scale") {
+      args.scale = [];
+      while (i + 1 < argv.length && !argv[i + 1].startsWith("-")) {
+        args.scale.push(Number(argv[++i]));
+      }
+    } else if (arg === "--repeat") {
+      args.repeat = Number(argv[++i]);
+    } else if (arg === "--no-memory") {
+      args.memory = false;
+    } else if (arg === "--examples") {
+      args.examples = path.resolve(argv[++i]);
+    } else if (arg === "-o" || arg === "--output") {
+      args.output = argv[++i];
+    } else if (arg.startsWith("-")) {
+      throw new Error(`unknown option ${arg}`);
+    } else {
+      args.scripts.push(arg);
+    }
+  }
+  return args;
+}
+
+function loadScripts(directory, names) {
+  const scripts = {};
+  for (const file of readdirSync(directory).sort()) {
+    if (!file.endsWith(".py")) continue;
+    const stem = file.slice(0, -3);
+    if (names.length && !names.includes(file) && !names.includes(stem)) {
+      continue;
+    }
+    scripts[file] = readFileSync(path.join(directory, file), "utf8");
+  }
+  return scripts;
+}
+
+// Writes the .py files below `source` into the Pyodide file system.
+function copyTree(pyodide, source, target) {
+  for (const entry of readdirSync(source, { withFileTypes: true })) {
+    const from = path.join(source, entry.name);
+    const to = `${target}/${entry.name}`;
+    if (entry.isDirectory()) {
+      if (entry.name === "__pycache__") continue;
+      pyodide.FS.mkdirTree(to);
+      copyTree(pyodide, from, to);
+    } else if (entry.name.endsWith(".py")) {
+      pyodide.FS.writeFile(to, readFileSync(from, "utf8"));
+    }
+  }
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const scripts = loadScripts(args.examples, args.scripts);
+  if (!Object.keys(scripts).length) {
+    throw new Error(`no scripts found in ${args.examples}`);
+  }
+
+  const pyodide = await loadPyodide();
+  await pyodide.loadPackage(["micropip", "numpy"]);
+  pyodide.FS.writeFile(
+    `/tmp/${WHEEL}`,
+    readFileSync(path.join(ROOT, "public", WHEEL)),
+  );
+  await pyodide.pyimport("micropip").install(`emfs:/tmp/${WHEEL}`);
+
+  pyodide.FS.mkdirTree(RUNTIME_DIR);
+  copyTree(pyodide, path.join(ROOT, "src", "python"), RUNTIME_DIR);
+  pyodide.FS.mkdirTree(BENCH_DIR);
+  pyodide.FS.writeFile(
+    `${BENCH_DIR}/harness.py`,
+    readFileSync(path.join(ROOT, "bench", "harness.py"), "utf8"),
+  );
+  pyodide.runPython(
+    `import sys\nsys.path[:0] = ["${RUNTIME_DIR}", "${BENCH_DIR}"]`,
+  );
+
+  const harness = pyodide.pyimport("harness");
+  const json = pyodide.pyimport("json");
+  const results = harness.run_suite.callKwargs(
+    pyodide.toPy(scripts),
+    pyodide.toPy(args.scale),
+    args.repeat,
+    {
+      memory: args.memory,
+      log: (line) => process.stderr.write(`${line}\n`),
+    },
+  );
+  // The WASM heap only grows, so its size is the peak of the whole suite.
+  const output = JSON.parse(String(json.dumps(results)));
+  output.environment.wasm_heap_bytes = pyodide._module.HEAPU8.length;
+  const text = JSON.stringify(output, null, 2);
+  if (args.output) {
+    writeFileSync(args.output, text);
+  } else {
+    process.stdout.write(`${text}\n`);
+  }
+}
+
+main().catch((error) => {
+  console.error(error);
+  process.exit(1);
+});
@@ -0,0 +1,90 @@
+"""
+Benchmarks the example scripts under CPython.
+
+Usage:
+    python bench/run.py                          # all examples, scale 1
+    python bench/run.py --scale 1 2 4 -o new.json
+    python bench/run.py --baseline old.json      # run and compare
+    python bench/run.py --compare old.json new.json
+
+The gcoordinator wheel (`public/gcoordinator-*.whl`) must be installed, e.g.
+with `pip install public/gcoordinator-0.0.2-py3-none-any.whl`. The results
+are JSON (see `harness.run_suite`); `bench/pyodide.mjs` writes the same
+format for Pyodide under Node. With `--baseline` or `--compare`, the exit
+status is 1 if any script got slower than the threshold.
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src' / 'python'))
+sys.path.insert(0, str(ROOT / 'bench'))
+
+import harness  # noqa: E402
+
+
+def load_scripts(directory: pathlib.Path, names: list) -> dict:
+    paths = sorted(directory.glob('*.py'))
+    if names:
+        paths = [path for path in paths if path.stem in names or path.name in names]
+    return {path.name: path.read_text() for path in paths}
+
+
+def print_comparison(rows: list, threshold: float, file=sys.stdout) -> bool:
+    """Prints the comparison table; returns True if anything regressed."""
+    print(f"{'script':28} {'baseline':>9} {'current':>9} {'ratio':>7}  worst stage", file=file)
+    for row in rows:
+        slowest = max(row['stages'].items(), key=lambda item: item[1], default=None)
+        stage = f'{slowest[0]} x{slowest[1]:.2f}' if slowest else ''
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:28} {row['baseline']:9.3f} {row['current']:9.3f} {row['ratio']:7.2f}  {stage}{flag}", file=file)
+    regressed = any(row['regression'] for row in rows)
+    if regressed:
+        print(f'slower than the {threshold:.0%} threshold', file=file)
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the example scripts.')
+    parser.add_argument('scripts', nargs='*', help='example names to run (default: all)')
+    parser.add_argument('--examples', type=pathlib.Path, default=ROOT / 'public' / 'example')
+    parser.add_argument('--scale', type=float, nargs='+', default=[1], help='work scale factors')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per script (median)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the peak memory run')
+    parser.add_argument('-o', '--output', type=pathlib.Path, help='write the results as JSON')
+    parser.add_argument('--baseline', type=pathlib.Path, help='compare the results with this file')
+    parser.add_argument('--compare', type=pathlib.Path, nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='only compare two result files')
+    parser.add_argument('--threshold', type=float, default=harness.DEFAULT_THRESHOLD,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        return int(print_comparison(harness.compare(baseline, current, args.threshold), args.threshold))
+
+    scripts = load_scripts(args.examples, args.scripts)
+    if not scripts:
+        parser.error(f'no scripts found in {args.examples}')
+    results = harness.run_suite(
+        scripts, args.scale, args.repeat, memory=not args.no_memory,
+        log=lambda line: print(line, file=sys.stderr),
+    )
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        rows = harness.compare(baseline, results, args.threshold)
+        # stdout may hold the JSON results
+        return int(print_comparison(rows, args.threshold, file=sys.stderr))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,69 @@
 import { useState, useCallback, useSyncExternalStore, useEffect } from "react";
-import { getGcodeSnapshot, subscribe } from "./outputStore";
+import {
+  getGcodeSnapshot,
+  getProgressSnapshot,
+  getRunInfoSnapshot,
+  subscribe,
+} from "./outputStore";
 import GCodeTextViewer from "./GCodeTextViewer";
 import ConsoleOutput from "./ConsoleOutput";
+import ProfilePanel from "./ProfilePanel";
 import CodeEditor from "./CodeEditor";
 import GCode3DViewer from "./GCode3DViewer";
 import DownloadModal from "./DownloadModal";
 import AboutModal from "./AboutModal";
-import { useLocalStorageNumber } from "./hooks/useLocalStorageState";
+import SweepModal from "./SweepModal";
+import {
+  useLocalStorageNumber,
+  useLocalStorageState,
+} from "./hooks/useLocalStorageState";
 import { usePanelLayout } from "./hooks/usePanelLayout";
 import { usePyodideRunner } from "./hooks/usePyodideRunner";
-import { useAutoRun } from "./hooks/useAutoRun";
+import { autoRunDelay, useAutoRun } from "./hooks/useAutoRun";
 import { DEFAULT_EXAMPLE, loadExampleCode } from "./examples";
-import { Download as DownloadIcon } from "lucide-react";
+import {
+  Cylinder,
+  Download as DownloadIcon,
+  Gauge,
+  SlidersHorizontal,
+  Zap,
+} from "lucide-react";
 import IconButtonWithTooltip from "./IconButtonWithTooltip";
+import RunStats from "./RunStats";
+import {
+  getMaxPoolSize,
+  setMemoryOptions,
+  setPoolSize,
+  setStandbyWorker,
+} from "./pyodide";
+import type { RunProgress } from "./pyodide";
 
 const CODE_STORAGE_KEY = "savedEditorCode";
 
+function formatProgress(progress: RunProgress | null): string {
+  if (!progress) return "";
+  if (progress.total) {
+    return ` ${progress.stage} ${Math.round((progress.current / progress.total) * 100)}%`;
+  }
+  return ` ${progress.stage} ${progress.current}`;
+}
+
 function App() {
   const [code, setCode] = useState("");
   const [initialCode, setInitialCode] = useState<string | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [isAboutModalOpen, setIsAboutModalOpen] = useState(false);
+  const [isSweepModalOpen, setIsSweepModalOpen] = useState(false);
+  const [consoleTab, setConsoleTab] = useState<"console" | "profile">(
+    "console",
+  );
 
   const gcode = useSyncExternalStore(subscribe, getGcodeSnapshot);
+  const progress = useSyncExternalStore(subscribe, getProgressSnapshot);
+  const runInfo = useSyncExternalStore(subscribe, getRunInfoSnapshot);
+  const isDraftResult = runInfo?.quality?.mode === "draft";
+  const progressFraction =
+    progress && progress.total ? progress.current / progress.total : null;
 
   const [leftWidth, setLeftWidth] = useLocalStorageNumber(
     "editorWidthPercent",
@@ -36,6 +77,48 @@ function App() {
     "consoleHeightPx",
     128,
   );
+  const [workerCount, setWorkerCount] = useLocalStorageNumber(
+    "workerPoolSize",
+    1,
+  );
+
+  const [memoryLimitMb, setMemoryLimitMb] = useLocalStorageNumber(
+    "memoryLimitMB",
+    1536,
+  );
+  const [traceMemory, setTraceMemory] = useLocalStorageState(
+    "traceMemory",
+    false,
+    (v) => v === "true",
+  );
+  const [standbyWorker, setStandbyWorkerEnabled] = useLocalStorageState(
+    "standbyWorker",
+    true,
+    (v) => v === "true",
+  );
+  // Preview edits in draft quality, then in full once the code rests
+  const [draftPreview, setDraftPreview] = useLocalStorageState(
+    "draftPreview",
+    true,
+    (v) => v === "true",
+  );
+  // Draw extrusions in the 3D view as tubes of their bead size
+  const [tubePreview, setTubePreview] = useLocalStorageState(
+    "tubePreview",
+    true,
+    (v) => v === "true",
+  );
+
+  useEffect(() => {
+    setPoolSize(workerCount);
+  }, [workerCount]);
+
+  useEffect(() => {
+    setMemoryOptions({
+      limit: memoryLimitMb > 0 ? memoryLimitMb * 1024 * 1024 : null,
+      trace: traceMemory,
+    });
+  }, [memoryLimitMb, traceMemory]);
 
   useEffect(() => {
     const loadInitial = async () => {
@@ -64,9 +147,16 @@ function App() {
     loadInitial();
   }, []);
 
-  const { isLoading, isRunning, runCode, lastRunCodeRef } =
+  const { isLoading, isRunning, runCode, lastRunCodeRef, runTime } =
     usePyodideRunner(initialCode);
 
+  // The standby worker loads once the primary one has, not alongside it
+  useEffect(() => {
+    if (!isLoading) {
+      setStandbyWorker(standbyWorker);
+    }
+  }, [isLoading, standbyWorker]);
+
   const {
     containerRef,
     leftPanelRef,
@@ -84,9 +174,18 @@ function App() {
   });
 
   const handleRun = useCallback(() => {
+    runCode(code, { draft: draftPreview });
+  }, [code, runCode, draftPreview]);
+
+  const handleFullRun = useCallback(() => {
     runCode(code);
   }, [code, runCode]);
 
+  const handleProfileRun = useCallback(() => {
+    setConsoleTab("profile");
+    runCode(code, { profile: true });
+  }, [code, runCode]);
+
   const handleCodeChange = useCallback((value: string) => {
     setCode(value);
     try {
@@ -102,14 +201,24 @@ function App() {
     isRunning,
     lastRunCodeRef,
     onRun: handleRun,
+    delay: autoRunDelay(runTime),
+    isDraft: isDraftResult,
+    onIdleRun: handleFullRun,
   });
 
-  const handleOpenModal = useCallback(() => {
-    if (!gcode || !gcode.trim()) {
+  const handleOpenModal = useCallback(async () => {
+    if (isLoading || isRunning) return;
+    // A draft is never downloaded: generate the full model first, and open
+    // the dialog only if that result is the one shown
+    if (isDraftResult) {
+      if (await runCode(code)) setIsModalOpen(true);
+      return;
+    }
+    if (gcode.size === 0) {
       return;
     }
     setIsModalOpen(true);
-  }, [gcode]);
+  }, [gcode, isDraftResult, isLoading, isRunning, runCode, code]);
 
   return (
     <div className="h-screen bg-gray-900 text-white flex flex-col overflow-hidden">
@@ -125,7 +234,11 @@ function App() {
               }`}
             />
             <span className="text-xs sm:text-sm font-medium text-gray-300 whitespace-nowrap">
-              {isLoading ? "Loading..." : isRunning ? "Running..." : "Ready"}
+              {isLoading
+                ? "Loading..."
+                : isRunning
+                  ? `Running...${formatProgress(progress)}`
+                  : "Ready"}
             </span>
           </div>
         </div>
@@ -174,9 +287,48 @@ function App() {
           />
           <div
             style={{ height: `${consoleHeight}px` }}
-            className="app-console-output border-t border-gray-700 bg-black overflow-auto py-1 px-2 flex-shrink-0"
+            className="app-console-output border-t border-gray-700 bg-black flex flex-col flex-shrink-0"
           >
-            <ConsoleOutput />
+            <div className="flex items-center gap-3 px-2 text-xs border-b border-gray-800 flex-shrink-0">
+              {(["console", "profile"] as const).map((tab) => (
+                <button
+                  key={tab}
+                  type="button"
+                  onClick={() => setConsoleTab(tab)}
+                  className={`py-0.5 capitalize ${
+                    consoleTab === tab
+                      ? "text-white border-b border-blue-500"
+                      : "text-gray-500 hover:text-gray-300"
+                  }`}
+                >
+                  {tab}
+                </button>
+              ))}
+              <button
+                type="button"
+                onClick={handleProfileRun}
+                disabled={isLoading || isRunning}
+                title="Run with cProfile and time each stage"
+                className="ml-auto inline-flex items-center gap-1 text-gray-400 hover:text-white disabled:opacity-50"
+              >
+                <Gauge className="h-3 w-3" aria-hidden="true" />
+                Profile run
+              </button>
+            </div>
+            <div className="flex-1 min-h-0 overflow-auto py-1 px-2">
+              {consoleTab === "profile" ? (
+                <ProfilePanel
+                  memoryLimitMb={memoryLimitMb}
+                  onMemoryLimitChange={setMemoryLimitMb}
+                  traceMemory={traceMemory}
+                  onTraceMemoryChange={setTraceMemory}
+                  standbyWorker={standbyWorker}
+                  onStandbyWorkerChange={setStandbyWorkerEnabled}
+                />
+              ) : (
+                <ConsoleOutput />
+              )}
+            </div>
           </div>
         </div>
 
@@ -191,13 +343,84 @@ function App() {
           className="app-right-panel relative bg-gray-950 min-h-0 overflow-hidden"
         >
           <div className="flex items-center gap-2 px-2 py-1 bg-gray-800 border-b border-gray-700">
-            <div className="flex gap-2 ml-auto">
+            <RunStats />
+            <div className="flex items-center gap-2 ml-auto">
+              <IconButtonWithTooltip tooltip="Workers used to generate G-code">
+                <select
+                  value={workerCount}
+                  onChange={(e) => setWorkerCount(Number(e.target.value))}
+                  aria-label="Worker count"
+                  className="rounded-md border border-gray-600 bg-gray-700 px-1 py-0.5 text-xs text-gray-200 hover:bg-gray-600 focus:outline-none focus:ring-1 focus:ring-blue-500"
+                >
+                  {Array.from({ length: getMaxPoolSize() }, (_, i) => i + 1).map(
+                    (n) => (
+                      <option key={n} value={n}>
+                        {n} {n === 1 ? "worker" : "workers"}
+                      </option>
+                    ),
+                  )}
+                </select>
+              </IconButtonWithTooltip>
+              <IconButtonWithTooltip
+                tooltip={
+                  draftPreview
+                    ? "Draft preview on: edits preview at reduced resolution"
+                    : "Draft preview off: every run is full quality"
+                }
+              >
+                <button
+                  type="button"
+                  onClick={() => setDraftPreview(!draftPreview)}
+                  aria-label="Draft preview"
+                  aria-pressed={draftPreview}
+                  className={`p-1.5 border rounded-md transition-colors inline-flex items-center justify-center ${
+                    draftPreview
+                      ? "border-amber-500/60 bg-amber-600 hover:bg-amber-500 text-white"
+                      : "border-gray-600 bg-gray-700 hover:bg-gray-600 text-gray-400"
+                  }`}
+                >
+                  <Zap className="h-4 w-4" aria-hidden="true" />
+                </button>
+              </IconButtonWithTooltip>
+              <IconButtonWithTooltip
+                tooltip={
+                  tubePreview
+                    ? "Tube preview on: extrusions are drawn at their bead width and height"
+                    : "Tube preview off: extrusions are drawn as lines"
+                }
+              >
+                <button
+                  type="button"
+                  onClick={() => setTubePreview(!tubePreview)}
+                  aria-label="Tube preview"
+                  aria-pressed={tubePreview}
+                  className={`p-1.5 border rounded-md transition-colors inline-flex items-center justify-center ${
+                    tubePreview
+                      ? "border-cyan-500/60 bg-cyan-700 hover:bg-cyan-600 text-white"
+                      : "border-gray-600 bg-gray-700 hover:bg-gray-600 text-gray-400"
+                  }`}
+                >
+                  <Cylinder className="h-4 w-4" aria-hidden="true" />
+                </button>
+              </IconButtonWithTooltip>
+              <IconButtonWithTooltip tooltip="Parameter sweep">
+                <button
+                  type="button"
+                  onClick={() => setIsSweepModalOpen(true)}
+                  disabled={isLoading || isRunning}
+                  aria-label="Parameter sweep"
+                  className="p-1.5 border border-gray-600 rounded-md bg-gray-700 hover:bg-gray-600 text-white transition-colors inline-flex items-center justify-center disabled:opacity-50"
+                >
+                  <SlidersHorizontal className="h-4 w-4" aria-hidden="true" />
+                </button>
+              </IconButtonWithTooltip>
               <IconButtonWithTooltip tooltip="Download gcode">
                 <button
                   type="button"
                   onClick={handleOpenModal}
+                  disabled={isLoading || isRunning}
                   aria-label="Download G-code"
-                  className="p-1.5 border border-emerald-500/60 rounded-md bg-emerald-600 hover:bg-emerald-500 text-white transition-colors inline-flex items-center justify-center"
+                  className="p-1.5 border border-emerald-500/60 rounded-md bg-emerald-600 hover:bg-emerald-500 text-white transition-colors inline-flex items-center justify-center disabled:opacity-50"
                 >
                   <DownloadIcon className="h-4 w-4" aria-hidden="true" />
                 </button>
@@ -206,10 +429,17 @@ function App() {
           </div>
           {(isLoading || isRunning) && (
             <div className="absolute top-9 left-0 right-0 h-1 z-30 overflow-hidden bg-gray-700">
-              <div className="h-full w-1/3 bg-blue-500 animate-[loading-bar_1s_ease-in-out_infinite]" />
+              {progressFraction !== null ? (
+                <div
+                  className="h-full bg-blue-500 transition-[width] duration-100"
+                  style={{ width: `${progressFraction * 100}%` }}
+                />
+              ) : (
+                <div className="h-full w-1/3 bg-blue-500 animate-[loading-bar_1s_ease-in-out_infinite]" />
+              )}
             </div>
           )}
-          <GCode3DViewer />
+          <GCode3DViewer tubes={tubePreview} />
           <div
             style={{ height: `${outputHeight - 40}px` }}
             className="app-output-overlay absolute px-0 py-0 top-10 left-0 right-0 bg-gray-900/60 border-b border-gray-700 overflow-auto p-4 z-10"
@@ -226,6 +456,12 @@ function App() {
             onClose={() => setIsModalOpen(false)}
             gcode={gcode}
           />
+          <SweepModal
+            isOpen={isSweepModalOpen}
+            onClose={() => setIsSweepModalOpen(false)}
+            code={code}
+            isBusy={isLoading || isRunning}
+          />
         </div>
       </div>
       <AboutModal
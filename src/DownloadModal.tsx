@@ -1,13 +1,43 @@
 import { useState, useCallback } from "react";
+import {
+  DOWNLOAD_FORMATS,
+  STORAGE_KEY_END,
+  STORAGE_KEY_START,
+  gcodeFileParts,
+  saveGCode,
+  withGCodeExtension,
+} from "./download";
+import type { DownloadFormat } from "./download";
+import { getRunInfoSnapshot } from "./outputStore";
+import { formatDuration } from "./format";
+import type { GCodeDocument } from "./gcodeDocument";
 
 interface DownloadModalProps {
   isOpen: boolean;
   onClose: () => void;
-  gcode: string;
+  gcode: GCodeDocument;
 }
 
-const STORAGE_KEY_START = "gcoordinator-start-gcode";
-const STORAGE_KEY_END = "gcoordinator-end-gcode";
+const STORAGE_KEY_FORMAT = "gcoordinator-download-format";
+
+function loadFormat(): DownloadFormat {
+  const saved = localStorage.getItem(STORAGE_KEY_FORMAT);
+  return saved && saved in DOWNLOAD_FORMATS
+    ? (saved as DownloadFormat)
+    : "gcode";
+}
+
+// Print metadata for binary G-code, from the statistics of the last run.
+function printMetadata(): Record<string, string> {
+  const summary = getRunInfoSnapshot()?.summary;
+  if (!summary) return {};
+  return {
+    "filament used [mm]": summary.filament_length.toFixed(2),
+    "estimated printing time (normal mode)": formatDuration(
+      summary.print_time,
+    ),
+  };
+}
 
 function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
   const [startGCode, setStartGCode] = useState(
@@ -20,6 +50,15 @@ function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
     () => `gcoordinator-web-${new Date().toISOString().replace(/:/g, "-")}`,
   );
 
+  const [format, setFormat] = useState(loadFormat);
+  const [isSaving, setIsSaving] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  const handleFormatChange = useCallback((value: DownloadFormat) => {
+    setFormat(value);
+    localStorage.setItem(STORAGE_KEY_FORMAT, value);
+  }, []);
+
   const handleStartBlur = useCallback(() => {
     localStorage.setItem(STORAGE_KEY_START, startGCode);
   }, [startGCode]);
@@ -28,25 +67,26 @@ function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
     localStorage.setItem(STORAGE_KEY_END, endGCode);
   }, [endGCode]);
 
-  const handleDownload = useCallback(() => {
-    const finalGCode = [startGCode, gcode, endGCode]
-      .filter((part) => part.trim())
-      .join("\n");
-
-    const downloadFilename = filename.endsWith(".gcode")
-      ? filename
-      : `${filename}.gcode`;
-    const blob = new Blob([finalGCode], { type: "text/plain" });
-    const url = URL.createObjectURL(blob);
-
-    const anchor = document.createElement("a");
-    anchor.href = url;
-    anchor.download = downloadFilename;
-    anchor.click();
-
-    URL.revokeObjectURL(url);
-    onClose();
-  }, [startGCode, endGCode, gcode, filename, onClose]);
+  const handleDownload = useCallback(async () => {
+    setIsSaving(true);
+    setError(null);
+    // A run started meanwhile must not remove the file being saved
+    const release = gcode.hold();
+    try {
+      const saved = await saveGCode(
+        gcodeFileParts(startGCode, await gcode.blob(), endGCode),
+        withGCodeExtension(filename, format),
+        format,
+        { print: printMetadata() },
+      );
+      if (saved) onClose();
+    } catch (err) {
+      setError(err instanceof Error ? err.message : String(err));
+    } finally {
+      release();
+      setIsSaving(false);
+    }
+  }, [startGCode, endGCode, gcode, filename, format, onClose]);
 
   const handleBackdropClick = useCallback(
     (e: React.MouseEvent<HTMLDivElement>) => {
@@ -89,6 +129,24 @@ function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
               className="w-full rounded-md border border-gray-600 bg-gray-800 px-2 py-1 font-mono text-sm text-gray-100 transition-colors placeholder:text-gray-500 hover:bg-gray-700 focus:outline-none focus:ring-1 focus:ring-blue-500"
             />
           </div>
+          <div className="space-y-1">
+            <label className="text-xs text-gray-300">Format</label>
+            <select
+              value={format}
+              onChange={(e) =>
+                handleFormatChange(e.target.value as DownloadFormat)
+              }
+              className="w-full rounded-md border border-gray-600 bg-gray-800 px-2 py-1 text-sm text-gray-100 transition-colors hover:bg-gray-700 focus:outline-none focus:ring-1 focus:ring-blue-500"
+            >
+              {Object.entries(DOWNLOAD_FORMATS).map(
+                ([value, { label, extension }]) => (
+                  <option key={value} value={value}>
+                    {label} ({extension})
+                  </option>
+                ),
+              )}
+            </select>
+          </div>
           <div className="space-y-1">
             <div className="space-y-1">
               <label className="text-xs text-gray-300">Start G-code</label>
@@ -123,6 +181,8 @@ function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
             </div>
           </div>
 
+          {error && <p className="text-xs text-red-400">{error}</p>}
+
           <div className="mt-1 flex justify-end gap-2">
             <button
               type="button"
@@ -134,9 +194,10 @@ function DownloadModal({ isOpen, onClose, gcode }: DownloadModalProps) {
             <button
               type="button"
               onClick={handleDownload}
-              className="rounded-md border border-blue-500 bg-blue-600 px-3 py-1 text-sm text-white transition-colors hover:bg-blue-500"
+              disabled={isSaving}
+              className="rounded-md border border-blue-500 bg-blue-600 px-3 py-1 text-sm text-white transition-colors hover:bg-blue-500 disabled:opacity-50"
             >
-              Download
+              {isSaving ? "Saving..." : "Download"}
             </button>
           </div>
         </div>
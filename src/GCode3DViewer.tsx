@@ -1,7 +1,21 @@
-import { useEffect, useRef, useSyncExternalStore } from "react";
+import { useEffect, useRef, useState, useSyncExternalStore } from "react";
 import * as THREE from "three";
 import { OrbitControls } from "three/addons/controls/OrbitControls.js";
-import { subscribe, getGcodeSnapshot, getSelectedLineSnapshot } from "./outputStore";
+import {
+  subscribe,
+  getGcodeSnapshot,
+  getSelectedLineSnapshot,
+  getRunInfoSnapshot,
+  setTiming,
+} from "./outputStore";
+import type { GCodeDocument } from "./gcodeDocument";
+import type { RunLayer } from "./pyodide";
+import {
+  TUBE_SEGMENT_BUDGET,
+  buildTubes,
+  createTubeMaterial,
+  setTubeSelection,
+} from "./tubeGeometry";
 
 interface Point3D {
   x: number;
@@ -9,106 +23,291 @@ interface Point3D {
   z: number;
 }
 
-interface ParsedGCodeSegment {
-  points: Point3D[];
-  lineIndices: number[]; // Maps each point to its original line index in the gcode
+// Bead sizes: [line relative to the block start, width, height] from each
+// of these lines on
+type BeadSizes = [number, number, number][];
+
+// A range of lines of the G-code, drawn as one object
+interface BlockRange {
+  // Cache key of its geometry, null if it is not cached
+  key: string | null;
+  // First line
+  start: number;
+  // Null if not known; the block is then drawn as lines
+  sizes: BeadSizes | null;
+}
+
+interface ParsedBlock extends BlockRange {
+  // The extruding moves as line segments, six coordinates each, and the line
+  // of each relative to `start` (ascending); null if the geometry of `key`
+  // was cached when parsing.
+  positions: Float32Array | null;
+  lines: Int32Array | null;
 }
 
 interface ParsedGCode {
-  segments: ParsedGCodeSegment[];
+  blocks: ParsedBlock[];
+  // An empty document (e.g. while a run is in progress) leaves the cached
+  // geometry for the next run.
+  isEmpty: boolean;
+}
+
+// The geometry of a block: two vertices per move for lines, and the tubes
+// of the moves once they are drawn as tubes
+interface BlockGeometry {
+  geometry: THREE.BufferGeometry;
+  positions: Float32Array;
+  lines: Int32Array;
+  sizes: BeadSizes | null;
+  tubes: THREE.InstancedBufferGeometry[] | null;
+}
+
+interface ShownBlock {
+  key: string | null;
+  start: number;
+  block: BlockGeometry;
+}
+
+// Arcs (G2/G3) are drawn as polylines with at most this angle per segment.
+const ARC_SEGMENT_ANGLE = Math.PI / 36;
+
+// Points along an arc from `start` to `end` around `center` (XY), excluding
+// the start point. Z changes linearly (helical moves).
+function arcPoints(
+  start: Point3D,
+  end: Point3D,
+  center: { x: number; y: number },
+  clockwise: boolean,
+): Point3D[] {
+  const startAngle = Math.atan2(start.y - center.y, start.x - center.x);
+  const endAngle = Math.atan2(end.y - center.y, end.x - center.x);
+  let sweep = endAngle - startAngle;
+  if (clockwise && sweep >= 0) sweep -= 2 * Math.PI;
+  if (!clockwise && sweep <= 0) sweep += 2 * Math.PI;
+
+  const radius = Math.hypot(start.x - center.x, start.y - center.y);
+  const count = Math.max(1, Math.ceil(Math.abs(sweep) / ARC_SEGMENT_ANGLE));
+  const points: Point3D[] = [];
+  for (let k = 1; k < count; k++) {
+    const t = k / count;
+    const angle = startAngle + sweep * t;
+    points.push({
+      x: center.x + radius * Math.cos(angle),
+      y: center.y + radius * Math.sin(angle),
+      z: start.z + (end.z - start.z) * t,
+    });
+  }
+  points.push(end);
+  return points;
 }
 
-function parseGCode(gcode: string): ParsedGCode {
-  const segments: ParsedGCodeSegment[] = [];
-  let currentSegment: ParsedGCodeSegment = { points: [], lineIndices: [] };
+// The blocks the G-code is drawn in: the lines before the first layer, then
+// one block per layer of the run (see RunLayer). Without layers, e.g. after
+// parallel generation, a single block covers everything and is not cached.
+function layerBlocks(
+  layers: RunLayer[] | null,
+  lineCount: number,
+): BlockRange[] {
+  const blocks: BlockRange[] = [{ key: null, start: 0, sizes: null }];
+  if (!layers) return blocks;
+  for (let k = 0; k < layers.length; k++) {
+    const { line, hash, sizes } = layers[k];
+    const end = k + 1 < layers.length ? layers[k + 1].line : lineCount;
+    // Lines are stored relative to the block start, so the line count of
+    // the block is part of the key as well.
+    blocks.push({
+      key: `${hash}:${end - line}`,
+      start: line,
+      sizes: sizes.map(([from, width, height]) => [from - line, width, height]),
+    });
+  }
+  return blocks;
+}
 
-  const lines = gcode.split("\n");
+// Parses the G-code a chunk of lines at a time, so that the whole text is
+// never needed at once. The moves of a block are only collected if
+// `isCached` returns false for its key.
+async function parseGCode(
+  gcode: GCodeDocument,
+  blocks: BlockRange[],
+  isCached: (key: string) => boolean,
+  isCancelled: () => boolean,
+): Promise<ParsedGCode | null> {
+  const parsed: ParsedBlock[] = [];
+  let block = -1;
+  let blockStart = 0;
+  // Null while in a cached block
+  let positions: number[] | null = null;
+  let lines: number[] = [];
+  let lineOffset = 0;
+
+  const nextBlock = () => {
+    if (block >= 0) {
+      parsed.push({
+        ...blocks[block],
+        positions: positions && Float32Array.from(positions),
+        lines: positions && Int32Array.from(lines),
+      });
+    }
+    block++;
+    if (block < blocks.length) {
+      const { key, start } = blocks[block];
+      blockStart = start;
+      positions = key !== null && isCached(key) ? null : [];
+      lines = [];
+    }
+  };
+  nextBlock();
 
   let currentX = 0;
   let currentY = 0;
   let currentZ = 0;
   let isAbsolute = true; // G90: absolute, G91: relative
 
-  const flushSegment = () => {
-    if (currentSegment.points.length > 0) {
-      segments.push(currentSegment);
-      currentSegment = { points: [], lineIndices: [] };
+  const addMove = (to: Point3D, line: number) => {
+    if (positions) {
+      positions.push(currentX, currentY, currentZ, to.x, to.y, to.z);
+      lines.push(line - blockStart);
     }
+    currentX = to.x;
+    currentY = to.y;
+    currentZ = to.z;
   };
 
-  for (let i = 0; i < lines.length; i++) {
-    const line = lines[i];
-    const trimmed = line.trim();
+  for await (const chunk of gcode.lines()) {
+    if (isCancelled()) return null;
+    for (let k = 0; k < chunk.length; k++) {
+      const i = lineOffset + k;
+      while (block + 1 < blocks.length && blocks[block + 1].start <= i) {
+        nextBlock();
+      }
+      const trimmed = chunk[k].trim();
 
-    if (trimmed.startsWith("G90")) {
-      isAbsolute = true;
-      continue;
-    }
+      if (trimmed.startsWith("G90")) {
+        isAbsolute = true;
+        continue;
+      }
 
-    if (trimmed.startsWith("G91")) {
-      isAbsolute = false;
-      continue;
-    }
+      if (trimmed.startsWith("G91")) {
+        isAbsolute = false;
+        continue;
+      }
 
-    const isG0 = trimmed.startsWith("G0");
-    const isG1 = trimmed.startsWith("G1");
-    if (!isG0 && !isG1) continue;
-
-    const xMatch = trimmed.match(/X(-?\d+\.?\d*)/);
-    const yMatch = trimmed.match(/Y(-?\d+\.?\d*)/);
-    const zMatch = trimmed.match(/Z(-?\d+\.?\d*)/);
-    const eMatch = trimmed.match(/E(-?\d+\.?\d*)/);
-
-    const nextX = xMatch
-      ? isAbsolute
-        ? parseFloat(xMatch[1])
-        : currentX + parseFloat(xMatch[1])
-      : currentX;
-    const nextY = yMatch
-      ? isAbsolute
-        ? parseFloat(yMatch[1])
-        : currentY + parseFloat(yMatch[1])
-      : currentY;
-    const nextZ = zMatch
-      ? isAbsolute
-        ? parseFloat(zMatch[1])
-        : currentZ + parseFloat(zMatch[1])
-      : currentZ;
-
-    const hasCoordinate = xMatch || yMatch || zMatch;
-
-    const isExtruding = isG1 && !!eMatch;
-
-    if (!isExtruding) {
-      if (hasCoordinate) {
+      const isG0 = trimmed.startsWith("G0");
+      const isG1 = trimmed.startsWith("G1");
+      const isArc = /^G[23](\s|$)/.test(trimmed);
+      if (!isG0 && !isG1 && !isArc) continue;
+
+      const xMatch = trimmed.match(/X(-?\d+\.?\d*)/);
+      const yMatch = trimmed.match(/Y(-?\d+\.?\d*)/);
+      const zMatch = trimmed.match(/Z(-?\d+\.?\d*)/);
+      const eMatch = trimmed.match(/E(-?\d+\.?\d*)/);
+
+      const nextX = xMatch
+        ? isAbsolute
+          ? parseFloat(xMatch[1])
+          : currentX + parseFloat(xMatch[1])
+        : currentX;
+      const nextY = yMatch
+        ? isAbsolute
+          ? parseFloat(yMatch[1])
+          : currentY + parseFloat(yMatch[1])
+        : currentY;
+      const nextZ = zMatch
+        ? isAbsolute
+          ? parseFloat(zMatch[1])
+          : currentZ + parseFloat(zMatch[1])
+        : currentZ;
+
+      if (!xMatch && !yMatch && !zMatch) continue;
+
+      const next = { x: nextX, y: nextY, z: nextZ };
+      const isExtruding = (isG1 || isArc) && !!eMatch;
+
+      if (!isExtruding) {
         currentX = nextX;
         currentY = nextY;
         currentZ = nextZ;
+      } else if (isArc) {
+        const iMatch = trimmed.match(/I(-?\d+\.?\d*)/);
+        const jMatch = trimmed.match(/J(-?\d+\.?\d*)/);
+        const center = {
+          x: currentX + (iMatch ? parseFloat(iMatch[1]) : 0),
+          y: currentY + (jMatch ? parseFloat(jMatch[1]) : 0),
+        };
+        const start = { x: currentX, y: currentY, z: currentZ };
+        const clockwise = trimmed[1] === "2";
+        for (const point of arcPoints(start, next, center, clockwise)) {
+          addMove(point, i);
+        }
+      } else {
+        addMove(next, i);
       }
-      flushSegment();
-      continue;
     }
+    lineOffset += chunk.length;
+  }
 
-    if (hasCoordinate) {
-      if (currentSegment.points.length === 0) {
-        currentSegment.points.push({ x: currentX, y: currentY, z: currentZ });
-        currentSegment.lineIndices.push(i);
-      }
+  while (block < blocks.length) nextBlock();
 
-      currentX = nextX;
-      currentY = nextY;
-      currentZ = nextZ;
+  return { blocks: parsed, isEmpty: gcode.size === 0 };
+}
 
-      currentSegment.points.push({ x: currentX, y: currentY, z: currentZ });
-      currentSegment.lineIndices.push(i);
-    }
-  }
+function buildBlockGeometry(
+  positions: Float32Array,
+  lines: Int32Array,
+  sizes: BeadSizes | null,
+): BlockGeometry {
+  const geometry = new THREE.BufferGeometry();
+  geometry.setAttribute("position", new THREE.BufferAttribute(positions, 3));
+  geometry.computeBoundingBox();
+  return { geometry, positions, lines, sizes, tubes: null };
+}
 
-  flushSegment();
+function disposeBlockGeometry(block: BlockGeometry) {
+  block.geometry.dispose();
+  block.tubes?.forEach((tube) => tube.dispose());
+}
+
+// Index of the first element of the ascending `values` greater than `value`
+function upperBound(values: ArrayLike<number>, value: number): number {
+  let low = 0;
+  let high = values.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (values[mid] <= value) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
 
-  return { segments };
+// Index of the first element of the ascending `values` not less than `value`
+function lowerBound(values: ArrayLike<number>, value: number): number {
+  let low = 0;
+  let high = values.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (values[mid] < value) low = mid + 1;
+    else high = mid;
+  }
+  return low;
 }
 
+// Colors for before, at, and after the selected line
+const colorBefore = 0x00ffff; // Cyan
+const colorSelected = 0xffff00; // Yellow
+const colorAfter = 0x666666; // Gray
+const materialBefore = new THREE.LineBasicMaterial({ color: colorBefore });
+const materialSelected = new THREE.LineBasicMaterial({ color: colorSelected });
+const materialAfter = new THREE.LineBasicMaterial({ color: colorAfter });
+const tubeBefore = createTubeMaterial(colorBefore, colorBefore, colorBefore);
+const tubeAfter = createTubeMaterial(colorAfter, colorAfter, colorAfter);
+// Used by the block the selected line is in
+const tubeSelection = createTubeMaterial(
+  colorBefore,
+  colorSelected,
+  colorAfter,
+);
+
 function createAxesHelper(size: number): THREE.Group {
   const group = new THREE.Group();
 
@@ -142,7 +341,12 @@ function createAxesHelper(size: number): THREE.Group {
   return group;
 }
 
-function GCode3DViewer() {
+interface GCode3DViewerProps {
+  // Draw extrusions as tubes of their bead size instead of lines
+  tubes?: boolean;
+}
+
+function GCode3DViewer({ tubes = false }: GCode3DViewerProps) {
   const gcode = useSyncExternalStore(subscribe, getGcodeSnapshot);
   const selectedLine = useSyncExternalStore(subscribe, getSelectedLineSnapshot);
   const containerRef = useRef<HTMLDivElement>(null);
@@ -152,14 +356,23 @@ function GCode3DViewer() {
   const controlsRef = useRef<OrbitControls | null>(null);
   const pathGroupRef = useRef<THREE.Group | null>(null);
   const animationIdRef = useRef<number | null>(null);
-  const parsedDataRef = useRef<ParsedGCode | null>(null);
-  const prevGcodeRef = useRef<string>("");
+  const [parsed, setParsed] = useState<ParsedGCode>({
+    blocks: [],
+    isEmpty: true,
+  });
+  // Geometry of the layers of the shown run by cache key, kept across runs so
+  // that only changed layers are built and uploaded again
+  const blockCacheRef = useRef(new Map<string, BlockGeometry>());
+  // Keys the parse in progress expects to stay cached
+  const reusedKeysRef = useRef(new Set<string>());
+  const shownBlocksRef = useRef<ShownBlock[]>([]);
 
   // Initialize Three.js scene
   useEffect(() => {
     if (!containerRef.current) return;
 
     const container = containerRef.current;
+    const cache = blockCacheRef.current;
 
     // Scene
     const scene = new THREE.Scene();
@@ -236,6 +449,8 @@ function GCode3DViewer() {
         cancelAnimationFrame(animationIdRef.current);
       }
       controls.dispose();
+      // Frees the GPU buffers; the geometry is uploaded again if used
+      cache.forEach(disposeBlockGeometry);
       renderer.dispose();
       container.removeChild(renderer.domElement);
     };
@@ -243,146 +458,188 @@ function GCode3DViewer() {
 
   // Update parsed data when gcode changes
   useEffect(() => {
-    parsedDataRef.current = parseGCode(gcode);
+    let cancelled = false;
+    const start = performance.now();
+    const cache = blockCacheRef.current;
+    const reused = new Set<string>();
+    reusedKeysRef.current = reused;
+    // The run info of a result is set before its G-code
+    const layers = gcode.size > 0 ? getRunInfoSnapshot()?.layers : null;
+    const isCached = (key: string) => {
+      if (!cache.has(key)) return false;
+      reused.add(key);
+      return true;
+    };
+    parseGCode(
+      gcode,
+      layerBlocks(layers ?? null, gcode.lineCount),
+      isCached,
+      () => cancelled,
+    )
+      .then((result) => {
+        if (!result || cancelled) return;
+        if (gcode.size > 0) setTiming("parse", performance.now() - start);
+        setParsed(result);
+      })
+      .catch((err) => {
+        // A replaced document may be removed while it is read
+        if (!cancelled) console.error("Failed to parse G-code", err);
+      });
+    return () => {
+      cancelled = true;
+    };
   }, [gcode]);
 
-  // Update path visualization when gcode or selected line changes
+  // Build the geometry of new blocks and drop what is no longer shown
+  useEffect(() => {
+    const cache = blockCacheRef.current;
+    const renderStart = performance.now();
+
+    const shown: ShownBlock[] = [];
+    for (const { key, start, sizes, positions, lines } of parsed.blocks) {
+      let block = key !== null ? cache.get(key) : undefined;
+      if (!block) {
+        // Collected unless cached when parsing, and cached keys are kept
+        // until the parse is shown
+        if (!positions || !lines) continue;
+        block = buildBlockGeometry(positions, lines, sizes);
+        if (key !== null) cache.set(key, block);
+      }
+      if (block.lines.length > 0) shown.push({ key, start, block });
+      else if (key === null) disposeBlockGeometry(block);
+    }
+    // Uncached geometry belongs to this parse only
+    const disposeUncached = () => {
+      for (const { key, block } of shown) {
+        if (key === null) disposeBlockGeometry(block);
+      }
+    };
+
+    if (!parsed.isEmpty) {
+      const keep = new Set(reusedKeysRef.current);
+      for (const { key } of parsed.blocks) {
+        if (key !== null) keep.add(key);
+      }
+      for (const [key, block] of cache) {
+        if (!keep.has(key)) {
+          disposeBlockGeometry(block);
+          cache.delete(key);
+        }
+      }
+    }
+    shownBlocksRef.current = shown;
+
+    if (shown.length === 0) return disposeUncached;
+
+    // Auto-center camera on the path (only when gcode changes, not on selection change)
+    if (cameraRef.current && controlsRef.current) {
+      const box = new THREE.Box3();
+      for (const { block } of shown) {
+        if (block.geometry.boundingBox) box.union(block.geometry.boundingBox);
+      }
+      const center = box.getCenter(new THREE.Vector3());
+      const size = box.getSize(new THREE.Vector3());
+      const maxDim = Math.max(size.x, size.y, size.z);
+
+      controlsRef.current.target.copy(center);
+      // Keep X axis horizontal (view along Y) and tilt slightly downward
+      cameraRef.current.position.set(
+        center.x,
+        center.y - maxDim * 2,
+        center.z + maxDim
+      );
+      controlsRef.current.update();
+    }
+
+    // Building the geometry plus drawing the next frame
+    requestAnimationFrame(() =>
+      setTiming("render", performance.now() - renderStart),
+    );
+    return disposeUncached;
+  }, [parsed]);
+
+  // Update path visualization when the parsed gcode, the selected line or
+  // the drawing mode changes
   useEffect(() => {
     if (!sceneRef.current) return;
 
     const scene = sceneRef.current;
 
-    // Remove existing path group
+    // Remove existing path group; the geometry belongs to the blocks
     if (pathGroupRef.current) {
       scene.remove(pathGroupRef.current);
-      pathGroupRef.current.traverse((child) => {
-        if (child instanceof THREE.Line) {
-          child.geometry.dispose();
-          if (child.material instanceof THREE.Material) {
-            child.material.dispose();
-          }
-        }
-      });
       pathGroupRef.current = null;
     }
 
-    // Parse G-code and create new path
-    const parsed = parsedDataRef.current || parseGCode(gcode);
-    const { segments } = parsed;
-
-    if (segments.length > 0) {
-      const pathGroup = new THREE.Group();
-
-      // Colors for before, at, and after selected line
-      const colorBefore = 0x00ffff; // Cyan - lines before selection
-      const colorSelected = 0xffff00; // Yellow - selected line
-      const colorAfter = 0x666666; // Gray - lines after selection
-
-      // Helper to render a single polyline with given points and color
-      const addLine = (pts: THREE.Vector3[], color: number, width = 2) => {
-        if (pts.length < 2) return;
-        const geometry = new THREE.BufferGeometry().setFromPoints(pts);
-        const material = new THREE.LineBasicMaterial({ color, linewidth: width });
-        const line = new THREE.Line(geometry, material);
-        pathGroup.add(line);
-      };
-
-      if (selectedLine === null) {
-        // No selection - render all segments in cyan
-        segments.forEach((segment) => {
-          const threePoints = segment.points.map(
-            (p) => new THREE.Vector3(p.x, p.y, p.z)
-          );
-          addLine(threePoints, colorBefore);
-        });
-      } else {
-        segments.forEach((segment) => {
-          const threePoints = segment.points.map(
-            (p) => new THREE.Vector3(p.x, p.y, p.z)
-          );
-          const indices = segment.lineIndices;
-
-          // Find selected point within this segment
-          let selectedPointIndex = -1;
-          for (let i = 0; i < indices.length; i++) {
-            if (indices[i] === selectedLine) {
-              selectedPointIndex = i;
-              break;
-            }
-          }
-
-          // If not exact, pick nearest previous in this segment
-          if (selectedPointIndex === -1) {
-            for (let i = indices.length - 1; i >= 0; i--) {
-              if (indices[i] < selectedLine) {
-                selectedPointIndex = i;
-                break;
-              }
-            }
-          }
-
-          if (threePoints.length < 2) return;
-
-          if (selectedPointIndex === -1) {
-            // No relevant point in this segment; render as after/before based on first index
-            const color = indices[indices.length - 1] < selectedLine ? colorBefore : colorAfter;
-            addLine(threePoints, color);
-            return;
-          }
-
-          // Before selection
-          if (selectedPointIndex > 0) {
-            const beforePts = threePoints.slice(0, selectedPointIndex + 1);
-            addLine(beforePts, colorBefore);
-          }
-
-          // Selected segment (edge ending at selected point)
-          if (selectedPointIndex >= 0) {
-            const startIdx = Math.max(0, selectedPointIndex - 1);
-            const selPts = [threePoints[startIdx], threePoints[selectedPointIndex]];
-            addLine(selPts, colorSelected, 3);
-          }
-
-          // After selection
-          if (selectedPointIndex < threePoints.length - 1) {
-            const afterPts = threePoints.slice(selectedPointIndex);
-            addLine(afterPts, colorAfter);
-          }
-        });
+    const shown = shownBlocksRef.current;
+    if (shown.length === 0) return;
+
+    const pathGroup = new THREE.Group();
+    // The block the selected line is in: blocks before it are drawn as
+    // before the selection, blocks after it as after
+    const selectedBlock =
+      selectedLine === null
+        ? shown.length
+        : upperBound(
+            shown.map(({ start }) => start),
+            selectedLine,
+          ) - 1;
+    // Tubes for every block with bead sizes, unless there are too many moves
+    let moves = 0;
+    for (const { block } of shown) moves += block.lines.length;
+    const drawTubes = tubes && moves <= TUBE_SEGMENT_BUDGET;
+
+    for (const { block } of shown) block.geometry.clearGroups();
+    shown.forEach(({ block, start }, k) => {
+      const { lines } = block;
+      // Moves up to the selected line are before it; the last of them (all
+      // segments of an arc) is the selected move.
+      let begin = 0;
+      let end = 0;
+      if (k === selectedBlock) {
+        end = upperBound(lines, (selectedLine ?? 0) - start);
+        begin = end > 0 ? lowerBound(lines, lines[end - 1]) : 0;
       }
 
-      scene.add(pathGroup);
-      pathGroupRef.current = pathGroup;
-
-      // Auto-center camera on the path (only when gcode changes, not on selection change)
-      const gcodeChanged = prevGcodeRef.current !== gcode;
-      if (gcodeChanged && cameraRef.current && controlsRef.current) {
-        // Flatten all points for bounding box calculation
-        const allPoints: THREE.Vector3[] = [];
-        segments.forEach((segment) => {
-          segment.points.forEach((p) => allPoints.push(new THREE.Vector3(p.x, p.y, p.z)));
-        });
-
-        if (allPoints.length > 0) {
-          const box = new THREE.Box3().setFromPoints(allPoints);
-          const center = box.getCenter(new THREE.Vector3());
-          const size = box.getSize(new THREE.Vector3());
-          const maxDim = Math.max(size.x, size.y, size.z);
-
-          controlsRef.current.target.copy(center);
-          // Keep X axis horizontal (view along Y) and tilt slightly downward
-          cameraRef.current.position.set(
-            center.x,
-            center.y - maxDim * 2,
-            center.z + maxDim
-          );
-          controlsRef.current.update();
+      if (drawTubes && block.sizes) {
+        const chunks = (block.tubes ??= buildTubes(
+          block.positions,
+          lines,
+          block.sizes,
+        ));
+        let material = k < selectedBlock ? tubeBefore : tubeAfter;
+        if (k === selectedBlock) {
+          material = tubeSelection;
+          const selected = end > 0 ? lines[end - 1] : -1;
+          setTubeSelection(material, selected, selected);
         }
+        for (const chunk of chunks) {
+          pathGroup.add(new THREE.Mesh(chunk, material));
+        }
+        return;
       }
-    }
-    
-    prevGcodeRef.current = gcode;
-  }, [gcode, selectedLine]);
+
+      const { geometry } = block;
+      if (k !== selectedBlock) {
+        const material = k < selectedBlock ? materialBefore : materialAfter;
+        pathGroup.add(new THREE.LineSegments(geometry, material));
+        return;
+      }
+      geometry.addGroup(0, 2 * begin, 0);
+      geometry.addGroup(2 * begin, 2 * (end - begin), 1);
+      geometry.addGroup(2 * end, 2 * (lines.length - end), 2);
+      pathGroup.add(
+        new THREE.LineSegments(geometry, [
+          materialBefore,
+          materialSelected,
+          materialAfter,
+        ]),
+      );
+    });
+
+    scene.add(pathGroup);
+    pathGroupRef.current = pathGroup;
+  }, [parsed, selectedLine, tubes]);
 
   return (
     <div
@@ -12,19 +12,28 @@ import {
   getSelectedLineSnapshot,
   setSelectedLine,
 } from "./outputStore";
+import type { GCodeDocument } from "./gcodeDocument";
 
 const LINE_HEIGHT = 20; // pixels per line
 const OVERSCAN = 32; // extra rows to render above/below viewport
 
+// Lines read from the document for the rows around the viewport
+interface LoadedLines {
+  gcode: GCodeDocument;
+  start: number;
+  lines: string[];
+}
+
 function GCodeTextViewer() {
   const gcode = useSyncExternalStore(subscribe, getGcodeSnapshot);
   const selectedLine = useSyncExternalStore(subscribe, getSelectedLineSnapshot);
   const containerRef = useRef<HTMLDivElement>(null);
   const [scrollTop, setScrollTop] = useState(0);
   const [containerHeight, setContainerHeight] = useState(0);
+  const [loaded, setLoaded] = useState<LoadedLines | null>(null);
 
-  const lines = useMemo(() => gcode.split("\n"), [gcode]);
-  const totalHeight = lines.length * LINE_HEIGHT;
+  const lineCount = gcode.lineCount;
+  const totalHeight = lineCount * LINE_HEIGHT;
 
   // Update container height on mount and resize
   useEffect(() => {
@@ -43,6 +52,19 @@ function GCodeTextViewer() {
     return () => resizeObserver.disconnect();
   }, []);
 
+  // Scroll lines selected elsewhere (3D viewer, validation issues) into view
+  useEffect(() => {
+    const container = containerRef.current;
+    if (!container || selectedLine === null) return;
+    const top = selectedLine * LINE_HEIGHT;
+    if (
+      top < container.scrollTop ||
+      top + LINE_HEIGHT > container.scrollTop + container.clientHeight
+    ) {
+      container.scrollTop = Math.max(0, top - container.clientHeight / 2);
+    }
+  }, [selectedLine]);
+
   const handleScroll = useCallback((e: React.UIEvent<HTMLDivElement>) => {
     setScrollTop(e.currentTarget.scrollTop);
   }, []);
@@ -56,17 +78,41 @@ function GCodeTextViewer() {
     }
   }, []);
 
-  // Calculate visible range
-  const startIndex = Math.max(0, Math.floor(scrollTop / LINE_HEIGHT) - OVERSCAN);
+  // Calculate visible range; it moves in steps of OVERSCAN rows so that the
+  // document is read once per step rather than once per row scrolled
+  const firstRow = Math.floor(scrollTop / LINE_HEIGHT);
+  const lastRow = Math.ceil((scrollTop + containerHeight) / LINE_HEIGHT);
+  const startIndex = Math.max(
+    0,
+    Math.floor(firstRow / OVERSCAN) * OVERSCAN - OVERSCAN,
+  );
   const endIndex = Math.min(
-    lines.length - 1,
-    Math.ceil((scrollTop + containerHeight) / LINE_HEIGHT) + OVERSCAN
+    lineCount - 1,
+    Math.ceil(lastRow / OVERSCAN) * OVERSCAN + OVERSCAN,
   );
 
+  // Read the lines of the range; the previous ones stay until they arrive
+  useEffect(() => {
+    let cancelled = false;
+    gcode
+      .readLines(startIndex, endIndex + 1)
+      .then((lines) => {
+        if (!cancelled) setLoaded({ gcode, start: startIndex, lines });
+      })
+      .catch((err) => {
+        // A replaced document may be removed while it is read
+        if (!cancelled) console.error("Failed to read G-code lines", err);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [gcode, startIndex, endIndex]);
+
   const visibleLines = useMemo(() => {
     const items = [];
+    const current = loaded?.gcode === gcode ? loaded : null;
     for (let i = startIndex; i <= endIndex; i++) {
-      const line = lines[i];
+      const line = current ? current.lines[i - current.start] : undefined;
       const className = `cursor-pointer ${
         selectedLine === i ? "hover:bg-yellow-900" : "hover:bg-gray-700"
       } ${
@@ -100,7 +146,7 @@ function GCodeTextViewer() {
       );
     }
     return items;
-  }, [startIndex, endIndex, lines, selectedLine, handleLineClick]);
+  }, [startIndex, endIndex, gcode, loaded, selectedLine, handleLineClick]);
 
   return (
     <div
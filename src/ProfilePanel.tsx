@@ -0,0 +1,226 @@
+import { useSyncExternalStore } from "react";
+import {
+  subscribe,
+  getProfileSnapshot,
+  getRunInfoSnapshot,
+  getTimingsSnapshot,
+} from "./outputStore";
+import { saveBlob } from "./download";
+import { formatBytes } from "./format";
+import type { MemoryReport } from "./pyodide";
+
+// Soft memory limits offered, in MB (0: off)
+const MEMORY_LIMITS = [0, 512, 1024, 1536, 2048, 3072];
+
+// Stages in the order they happen; Python stages are in seconds, main
+// thread timings in milliseconds.
+const PYTHON_STAGES = ["script", "prepare", "generate", "report"];
+const CLIENT_STAGES = ["transfer", "parse", "render"];
+
+function formatMs(milliseconds: number) {
+  return milliseconds >= 100
+    ? `${Math.round(milliseconds)} ms`
+    : `${milliseconds.toFixed(1)} ms`;
+}
+
+function fileName(file: string) {
+  return file === "~" ? "" : file.slice(file.lastIndexOf("/") + 1);
+}
+
+function StageTimes({ times }: { times: [string, number][] }) {
+  return (
+    <>
+      {times.map(([stage, milliseconds]) => (
+        <span key={stage}>
+          {stage}{" "}
+          <span className="text-gray-200">{formatMs(milliseconds)}</span>
+        </span>
+      ))}
+    </>
+  );
+}
+
+interface MemorySettingsProps {
+  memoryLimitMb: number;
+  onMemoryLimitChange: (megabytes: number) => void;
+  traceMemory: boolean;
+  onTraceMemoryChange: (trace: boolean) => void;
+  standbyWorker: boolean;
+  onStandbyWorkerChange: (enabled: boolean) => void;
+}
+
+function MemorySection({
+  memory,
+  memoryLimitMb,
+  onMemoryLimitChange,
+  traceMemory,
+  onTraceMemoryChange,
+  standbyWorker,
+  onStandbyWorkerChange,
+}: MemorySettingsProps & { memory: MemoryReport | null }) {
+  return (
+    <div className="mb-1">
+      <div className="flex flex-wrap items-center gap-3">
+        memory
+        {memory?.heap != null && (
+          <span title="Size of the WASM heap of the worker; it never shrinks">
+            heap{" "}
+            <span className="text-gray-200">{formatBytes(memory.heap)}</span>
+          </span>
+        )}
+        {memory?.peak != null && (
+          <span title="Peak memory traced by tracemalloc during the run">
+            peak{" "}
+            <span className="text-gray-200">{formatBytes(memory.peak)}</span>
+          </span>
+        )}
+        <label className="ml-auto flex items-center gap-1">
+          limit
+          <select
+            value={memoryLimitMb}
+            onChange={(e) => onMemoryLimitChange(Number(e.target.value))}
+            className="rounded border border-gray-600 bg-gray-800 px-1 text-gray-200"
+          >
+            {MEMORY_LIMITS.map((megabytes) => (
+              <option key={megabytes} value={megabytes}>
+                {megabytes === 0 ? "off" : `${megabytes} MB`}
+              </option>
+            ))}
+          </select>
+        </label>
+        <label
+          className="flex items-center gap-1"
+          title="Trace allocations for the peak and the largest arrays; runs get several times slower"
+        >
+          <input
+            type="checkbox"
+            checked={traceMemory}
+            onChange={(e) => onTraceMemoryChange(e.target.checked)}
+          />
+          trace
+        </label>
+        <label
+          className="flex items-center gap-1"
+          title="Keep a second Python worker loaded so edits start running while an older version still runs; uses as much memory as the first"
+        >
+          <input
+            type="checkbox"
+            checked={standbyWorker}
+            onChange={(e) => onStandbyWorkerChange(e.target.checked)}
+          />
+          standby
+        </label>
+      </div>
+      {memory?.arrays && memory.arrays.length > 0 && (
+        <div className="flex flex-wrap gap-3">
+          largest arrays
+          {memory.arrays.map((array, i) => (
+            <span key={i}>
+              {array.dtype}[{array.shape.join("×")}]{" "}
+              <span className="text-gray-200">{formatBytes(array.bytes)}</span>
+            </span>
+          ))}
+        </div>
+      )}
+    </div>
+  );
+}
+
+function ProfilePanel(memorySettings: MemorySettingsProps) {
+  const profile = useSyncExternalStore(subscribe, getProfileSnapshot);
+  const timings = useSyncExternalStore(subscribe, getTimingsSnapshot);
+  const runInfo = useSyncExternalStore(subscribe, getRunInfoSnapshot);
+  const memorySection = (
+    <MemorySection memory={runInfo?.memory ?? null} {...memorySettings} />
+  );
+
+  const clientTimes = CLIENT_STAGES.filter((stage) => stage in timings).map(
+    (stage): [string, number] => [stage, timings[stage]],
+  );
+
+  if (!profile) {
+    return (
+      <div className="font-mono text-xs text-gray-500">
+        {memorySection}
+        <p>Use "Profile run" to see where the time of a run goes.</p>
+        {clientTimes.length > 0 && (
+          <div className="flex flex-wrap gap-3 mt-1">
+            browser <StageTimes times={clientTimes} />
+          </div>
+        )}
+      </div>
+    );
+  }
+
+  const pythonTimes = PYTHON_STAGES.filter(
+    (stage) => stage in profile.stages,
+  ).map((stage): [string, number] => [stage, profile.stages[stage] * 1000]);
+
+  const handleDownload = () => {
+    saveBlob(
+      new Blob([profile.collapsed], { type: "text/plain" }),
+      "profile.collapsed.txt",
+    );
+  };
+
+  return (
+    <div className="font-mono text-xs text-gray-400">
+      {memorySection}
+      <div className="flex flex-wrap items-center gap-3">
+        python <StageTimes times={pythonTimes} />
+      </div>
+      {clientTimes.length > 0 && (
+        <div className="flex flex-wrap items-center gap-3">
+          browser <StageTimes times={clientTimes} />
+        </div>
+      )}
+      <div className="flex items-center gap-3 my-1">
+        <span>
+          hottest functions of the script (generate is timed, not profiled)
+        </span>
+        <button
+          type="button"
+          onClick={handleDownload}
+          className="ml-auto px-2 border border-gray-600 rounded bg-gray-800 hover:bg-gray-700 text-gray-200"
+          title="Collapsed stacks for speedscope or flamegraph.pl"
+        >
+          flame graph stacks
+        </button>
+      </div>
+      <table className="w-full">
+        <thead className="text-gray-500 text-left">
+          <tr>
+            <th className="font-normal text-right pr-3">own</th>
+            <th className="font-normal text-right pr-3">cumulative</th>
+            <th className="font-normal text-right pr-3">calls</th>
+            <th className="font-normal">function</th>
+          </tr>
+        </thead>
+        <tbody>
+          {profile.functions.map((entry, i) => (
+            <tr key={i} className="hover:bg-gray-800">
+              <td className="text-right pr-3 text-gray-200">
+                {formatMs(entry.own * 1000)}
+              </td>
+              <td className="text-right pr-3">
+                {formatMs(entry.cumulative * 1000)}
+              </td>
+              <td className="text-right pr-3">{entry.calls}</td>
+              <td className="truncate max-w-0 w-full" title={entry.file}>
+                {entry.function}
+                {entry.file !== "~" && (
+                  <span className="text-gray-500">
+                    {" "}
+                    {fileName(entry.file)}:{entry.line}
+                  </span>
+                )}
+              </td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}
+
+export default ProfilePanel;
@@ -0,0 +1,183 @@
+import { useState, useSyncExternalStore } from "react";
+import { TriangleAlert } from "lucide-react";
+import {
+  subscribe,
+  getRunInfoSnapshot,
+  setSelectedLine,
+} from "./outputStore";
+import { formatBytes, formatDuration } from "./format";
+import type { LayerTime, Validation, ValidationIssue } from "./pyodide";
+
+const CHART_WIDTH = 80;
+const CHART_HEIGHT = 14;
+
+// Time per layer from bottom (left) to top (right); with more layers than
+// pixels, each bar shows the slowest layer of its range.
+function LayerTimeChart({ layers }: { layers: LayerTime[] }) {
+  if (layers.length < 2) return null;
+  const barCount = Math.min(layers.length, CHART_WIDTH);
+  const bars = Array.from({ length: barCount }, (_, i) => {
+    const start = Math.floor((i * layers.length) / barCount);
+    const end = Math.floor(((i + 1) * layers.length) / barCount);
+    return layers
+      .slice(start, end)
+      .reduce((max, layer) => Math.max(max, layer.time), 0);
+  });
+  const max = Math.max(...bars);
+  if (max <= 0) return null;
+  const slowest = layers.reduce((a, b) => (b.time > a.time ? b : a));
+  const barWidth = CHART_WIDTH / barCount;
+
+  return (
+    <svg
+      width={CHART_WIDTH}
+      height={CHART_HEIGHT}
+      className="text-blue-400"
+      aria-label="Time per layer"
+    >
+      <title>
+        {`${layers.length} layers, slowest at Z${slowest.z.toFixed(2)}: ${formatDuration(slowest.time)}`}
+      </title>
+      {bars.map((time, i) => {
+        const height = (time / max) * CHART_HEIGHT;
+        return (
+          <rect
+            key={i}
+            x={i * barWidth}
+            y={CHART_HEIGHT - height}
+            width={barWidth}
+            height={height}
+            fill="currentColor"
+          />
+        );
+      })}
+    </svg>
+  );
+}
+
+function formatLimit(issue: ValidationIssue) {
+  const max = issue.max === null ? "∞" : issue.max;
+  const value = issue.value === null ? "NaN" : issue.value.toFixed(3);
+  return `${issue.axis} ${value} not in [${issue.min}, ${max}]`;
+}
+
+// Points outside the bed or the axis ranges (see GCode.validate); clicking an
+// issue selects its G-code line.
+function ValidationIssues({ validation }: { validation: Validation }) {
+  const [open, setOpen] = useState(false);
+  if (validation.count === 0) return null;
+
+  return (
+    <div className="relative">
+      <button
+        onClick={() => setOpen(!open)}
+        className="flex items-center gap-1 text-yellow-400 hover:text-yellow-300"
+        title="Points outside the machine limits"
+      >
+        <TriangleAlert size={12} />
+        {validation.count} out of limits
+      </button>
+      {open && (
+        <ul className="absolute right-0 top-5 z-20 max-h-64 w-80 overflow-auto rounded border border-gray-700 bg-gray-800 py-1 shadow-lg">
+          {validation.issues.map((issue, i) => (
+            <li key={i}>
+              <button
+                disabled={issue.line === null}
+                onClick={() =>
+                  issue.line !== null && setSelectedLine(issue.line)
+                }
+                className="w-full px-2 py-0.5 text-left text-gray-300 enabled:hover:bg-gray-700"
+                title={
+                  issue.line === null
+                    ? undefined
+                    : `Show G-code line ${issue.line + 1}`
+                }
+              >
+                path {issue.path} pt {issue.point}: {formatLimit(issue)}
+                {issue.points > 1 && ` (${issue.points} pts)`}
+                {issue.line !== null && (
+                  <span className="text-gray-500"> L{issue.line + 1}</span>
+                )}
+              </button>
+            </li>
+          ))}
+          {validation.issues.length < validation.count && (
+            <li className="px-2 py-0.5 text-gray-500">
+              {validation.count} values in total
+            </li>
+          )}
+        </ul>
+      )}
+    </div>
+  );
+}
+
+function RunStats() {
+  const runInfo = useSyncExternalStore(subscribe, getRunInfoSnapshot);
+
+  if (!runInfo) return null;
+
+  const { cache, memory, quality, report, summary, validation } = runInfo;
+  const lookups = cache.hits + cache.misses;
+  const simplify = report?.simplify;
+  const order = report?.order;
+  const draft = report?.quality;
+
+  return (
+    <div className="flex items-center gap-3 text-xs text-gray-400 font-mono">
+      {quality?.mode === "draft" && (
+        <span
+          className="text-amber-400"
+          title={`Draft preview: 1 in ${quality.point_step} points, infill ${quality.infill_scale}× coarser${draft ? `\n${draft.points_after} of ${draft.points_before} points, ${draft.paths_after} of ${draft.paths_before} paths` : ""}\nThe full model follows when the code rests`}
+        >
+          draft
+        </span>
+      )}
+      {validation && <ValidationIssues validation={validation} />}
+      {summary && summary.paths > 0 && (
+        <>
+          <span
+            title={`Estimated print time${summary.acceleration ? " (with acceleration)" : " (at programmed feed rates)"}\nprint ${(summary.print_distance / 1000).toFixed(2)} m, travel ${(summary.travel_distance / 1000).toFixed(2)} m`}
+          >
+            {formatDuration(summary.print_time)}
+          </span>
+          <span title="Filament length and mass">
+            {(summary.filament_length / 1000).toFixed(2)} m /{" "}
+            {summary.filament_mass.toFixed(1)} g
+          </span>
+          <LayerTimeChart layers={summary.layers} />
+        </>
+      )}
+      {lookups > 0 && (
+        <span
+          title={`${cache.entries} cached results, ${formatBytes(cache.bytes)} of ${formatBytes(cache.max_bytes)}`}
+        >
+          cache {Math.round((cache.hit_rate ?? 0) * 100)}% ({cache.hits}/
+          {lookups})
+        </span>
+      )}
+      {memory?.heap != null && (
+        <span
+          title={`WASM heap of the worker${memory.peak != null ? `, traced peak ${formatBytes(memory.peak)}` : ""}${memory.limit != null ? `, limit ${formatBytes(memory.limit)}` : ""}`}
+        >
+          heap {formatBytes(memory.heap)}
+        </span>
+      )}
+      {simplify && (
+        <span
+          title={`${simplify.points_before} points before simplification, ${simplify.points_after} after`}
+        >
+          simplified -{simplify.dropped} pts
+        </span>
+      )}
+      {order && (
+        <span title="Travel distance before and after reordering the paths">
+          travel {Math.round(order.travel_before)} →{" "}
+          {Math.round(order.travel_after)} mm
+        </span>
+      )}
+    </div>
+  );
+}
+
+export default RunStats;
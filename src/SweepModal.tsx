@@ -0,0 +1,240 @@
+import { useState, useCallback } from "react";
+import {
+  expandSweep,
+  formatParams,
+  paramsSlug,
+  parseSweepSpec,
+  runSweep,
+} from "./sweep";
+import type { SweepParams } from "./sweep";
+import type { BatchResult } from "./pyodide";
+import {
+  gcodeFileParts,
+  getStartEndGCode,
+  saveBlob,
+  withGCodeExtension,
+} from "./download";
+import { createZip } from "./zip";
+import { formatBytes, formatDuration } from "./format";
+
+interface SweepModalProps {
+  isOpen: boolean;
+  onClose: () => void;
+  code: string;
+  // A script run is in progress; a sweep would queue behind it
+  isBusy: boolean;
+}
+
+interface SweepRow {
+  params: SweepParams;
+  result: BatchResult | Error | null;
+}
+
+const SPEC_STORAGE_KEY = "gcoordinator-sweep-spec";
+const DEFAULT_SPEC = "# NAME = a, b, c  or  NAME = start:stop:step\n";
+
+function variantFilename(params: SweepParams): string {
+  return withGCodeExtension(`gcoordinator-web-${paramsSlug(params)}`);
+}
+
+function variantBlob(result: BatchResult): Blob {
+  const { start, end } = getStartEndGCode();
+  return new Blob(gcodeFileParts(start, result.gcode, end), {
+    type: "text/plain",
+  });
+}
+
+function SweepModal({ isOpen, onClose, code, isBusy }: SweepModalProps) {
+  const [spec, setSpec] = useState(
+    () => localStorage.getItem(SPEC_STORAGE_KEY) ?? DEFAULT_SPEC,
+  );
+  const [rows, setRows] = useState<SweepRow[]>([]);
+  const [error, setError] = useState<string | null>(null);
+  const [isRunning, setIsRunning] = useState(false);
+
+  const handleSpecBlur = useCallback(() => {
+    localStorage.setItem(SPEC_STORAGE_KEY, spec);
+  }, [spec]);
+
+  const handleRun = useCallback(async () => {
+    let variants: SweepParams[];
+    try {
+      variants = expandSweep(parseSweepSpec(spec));
+    } catch (err) {
+      setError(err instanceof Error ? err.message : String(err));
+      return;
+    }
+    if (variants.length === 0) {
+      setError("Declare at least one parameter");
+      return;
+    }
+
+    setError(null);
+    setIsRunning(true);
+    setRows(variants.map((params) => ({ params, result: null })));
+    try {
+      await runSweep(code, variants, (index, result) => {
+        setRows((prev) =>
+          prev.map((row, i) => (i === index ? { ...row, result } : row)),
+        );
+      });
+    } finally {
+      setIsRunning(false);
+    }
+  }, [spec, code]);
+
+  const handleDownloadAll = useCallback(async () => {
+    const entries = rows.flatMap(({ params, result }) =>
+      result && !(result instanceof Error)
+        ? [{ name: variantFilename(params), data: [variantBlob(result)] }]
+        : [],
+    );
+    if (entries.length === 0) return;
+    const zip = await createZip(entries);
+    saveBlob(zip, "gcoordinator-web-sweep.zip");
+  }, [rows]);
+
+  const handleBackdropClick = useCallback(
+    (e: React.MouseEvent<HTMLDivElement>) => {
+      if (e.target === e.currentTarget) {
+        onClose();
+      }
+    },
+    [onClose],
+  );
+
+  if (!isOpen) return null;
+
+  const hasResults = rows.some(
+    ({ result }) => result && !(result instanceof Error),
+  );
+
+  return (
+    <div
+      className="fixed inset-0 z-40 flex items-center justify-center bg-black/60 p-4"
+      onClick={handleBackdropClick}
+    >
+      <div className="flex max-h-[90vh] w-full max-w-4xl flex-col rounded-md border border-gray-700 bg-gray-900 p-4 shadow-xl">
+        <div className="mb-3 flex items-center justify-between">
+          <h2 className="text-sm font-semibold text-gray-100">
+            Parameter sweep
+          </h2>
+          <button
+            type="button"
+            onClick={onClose}
+            className="text-2xl leading-none text-gray-400 hover:text-white"
+          >
+            ×
+          </button>
+        </div>
+
+        <div className="space-y-1">
+          <label className="text-xs text-gray-300">
+            Parameters (top-level constants of the script)
+          </label>
+          <textarea
+            value={spec}
+            onChange={(e) => setSpec(e.target.value)}
+            onBlur={handleSpecBlur}
+            placeholder={"WAVE_AMPLITUDE = 0.8, 1.2, 1.6\nTOTAL_LAYERS = 50:150:50"}
+            className="h-28 w-full resize-none rounded-md border border-gray-600 bg-gray-800 px-2 py-1 font-mono text-sm text-gray-100 transition-colors placeholder:text-gray-500 hover:bg-gray-700 focus:outline-none focus:ring-1 focus:ring-blue-500"
+          />
+          {error && <p className="text-xs text-red-400">{error}</p>}
+        </div>
+
+        <div className="mt-3 min-h-0 flex-1 overflow-auto">
+          {rows.length > 0 && (
+            <table className="w-full text-left font-mono text-xs text-gray-300">
+              <thead className="sticky top-0 bg-gray-900 text-gray-400">
+                <tr>
+                  <th className="px-2 py-1 font-normal">Parameters</th>
+                  <th className="px-2 py-1 text-right font-normal">Size</th>
+                  <th className="px-2 py-1 text-right font-normal">Paths</th>
+                  <th className="px-2 py-1 text-right font-normal">
+                    Filament
+                  </th>
+                  <th className="px-2 py-1 text-right font-normal">Time</th>
+                  <th className="px-2 py-1" />
+                </tr>
+              </thead>
+              <tbody>
+                {rows.map(({ params, result }, index) => (
+                  <tr key={index} className="border-t border-gray-800">
+                    <td className="px-2 py-1">{formatParams(params)}</td>
+                    {result === null ? (
+                      <td colSpan={5} className="px-2 py-1 text-gray-500">
+                        {isRunning ? "Running..." : "Not run"}
+                      </td>
+                    ) : result instanceof Error ? (
+                      <td
+                        colSpan={5}
+                        className="max-w-xs truncate px-2 py-1 text-red-400"
+                        title={result.message}
+                      >
+                        {result.message}
+                      </td>
+                    ) : (
+                      <>
+                        <td className="px-2 py-1 text-right">
+                          {formatBytes(result.gcode.length)}
+                        </td>
+                        <td className="px-2 py-1 text-right">
+                          {result.info.summary?.paths ?? "-"}
+                        </td>
+                        <td className="px-2 py-1 text-right">
+                          {result.info.summary
+                            ? `${(result.info.summary.filament_length / 1000).toFixed(2)} m`
+                            : "-"}
+                        </td>
+                        <td className="px-2 py-1 text-right">
+                          {result.info.summary
+                            ? formatDuration(result.info.summary.print_time)
+                            : "-"}
+                        </td>
+                        <td className="px-2 py-1 text-right">
+                          <button
+                            type="button"
+                            onClick={() =>
+                              saveBlob(
+                                variantBlob(result),
+                                variantFilename(params),
+                              )
+                            }
+                            className="text-blue-400 hover:text-blue-300"
+                          >
+                            Download
+                          </button>
+                        </td>
+                      </>
+                    )}
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          )}
+        </div>
+
+        <div className="mt-3 flex justify-end gap-2">
+          <button
+            type="button"
+            onClick={handleDownloadAll}
+            disabled={!hasResults || isRunning}
+            className="rounded-md border border-gray-600 bg-gray-800 px-3 py-1 text-sm text-gray-200 transition-colors hover:bg-gray-700 disabled:opacity-50"
+          >
+            Download all (.zip)
+          </button>
+          <button
+            type="button"
+            onClick={handleRun}
+            disabled={isRunning || isBusy}
+            className="rounded-md border border-blue-500 bg-blue-600 px-3 py-1 text-sm text-white transition-colors hover:bg-blue-500 disabled:opacity-50"
+          >
+            {isRunning ? "Running..." : "Run sweep"}
+          </button>
+        </div>
+      </div>
+    </div>
+  );
+}
+
+export default SweepModal;
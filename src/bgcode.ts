@@ -0,0 +1,134 @@
+// Writer for binary G-code (.bgcode), the block-based format read by Prusa
+// printers. Every block is deflate compressed and CRC32 checksummed; the
+// G-code itself is stored as plain text (no MeatPack encoding).
+
+import { crc32 } from "./zip";
+
+const VERSION = 1;
+const CHECKSUM_CRC32 = 1;
+
+const BLOCK_FILE_METADATA = 0;
+const BLOCK_GCODE = 1;
+const BLOCK_SLICER_METADATA = 2;
+const BLOCK_PRINTER_METADATA = 3;
+const BLOCK_PRINT_METADATA = 4;
+
+const COMPRESSION_DEFLATE = 1;
+const ENCODING_INI = 0;
+const ENCODING_NONE = 0;
+
+// Blocks hold at most this many uncompressed bytes.
+const MAX_BLOCK_SIZE = 65535;
+
+export type BGCodeMetadata = Record<string, string>;
+
+export interface BGCodeOptions {
+  printer?: BGCodeMetadata;
+  print?: BGCodeMetadata;
+}
+
+const encoder = new TextEncoder();
+
+async function deflate(data: Uint8Array<ArrayBuffer>): Promise<Uint8Array> {
+  const stream = new Blob([data])
+    .stream()
+    .pipeThrough(new CompressionStream("deflate"));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+function fileHeader(): Uint8Array {
+  const header = new DataView(new ArrayBuffer(10));
+  encoder.encodeInto("GCDE", new Uint8Array(header.buffer));
+  header.setUint32(4, VERSION, true);
+  header.setUint16(8, CHECKSUM_CRC32, true);
+  return new Uint8Array(header.buffer);
+}
+
+async function block(
+  type: number,
+  encoding: number,
+  data: Uint8Array<ArrayBuffer>,
+): Promise<Uint8Array> {
+  const compressed = await deflate(data);
+  const size = 12 + 2 + compressed.length + 4;
+  const bytes = new Uint8Array(size);
+  const view = new DataView(bytes.buffer);
+
+  view.setUint16(0, type, true);
+  view.setUint16(2, COMPRESSION_DEFLATE, true);
+  view.setUint32(4, data.length, true);
+  view.setUint32(8, compressed.length, true);
+  view.setUint16(12, encoding, true);
+  bytes.set(compressed, 14);
+  view.setUint32(size - 4, crc32(bytes.subarray(0, size - 4)), true);
+  return bytes;
+}
+
+function metadataBlock(type: number, metadata: BGCodeMetadata) {
+  const ini = Object.entries(metadata)
+    .map(([key, value]) => `${key}=${value}\n`)
+    .join("");
+  return block(type, ENCODING_INI, encoder.encode(ini));
+}
+
+// Splits text into chunks of whole lines that encode to at most
+// MAX_BLOCK_SIZE bytes. A single longer line is split where it must be.
+function* gcodeChunks(text: string): Generator<Uint8Array<ArrayBuffer>> {
+  const lineEnd = (pos: number, end: number) => {
+    const newline = text.lastIndexOf("\n", end - 1);
+    return newline >= pos ? newline + 1 : end;
+  };
+
+  let pos = 0;
+  while (pos < text.length) {
+    let end = Math.min(pos + MAX_BLOCK_SIZE, text.length);
+    if (end < text.length) end = lineEnd(pos, end);
+    let chunk = encoder.encode(text.slice(pos, end));
+    while (chunk.length > MAX_BLOCK_SIZE) {
+      end = lineEnd(pos, pos + Math.ceil((end - pos) / 2));
+      chunk = encoder.encode(text.slice(pos, end));
+    }
+    yield chunk;
+    pos = end;
+  }
+}
+
+// Reads a Blob as pieces of text that end at line ends (the last one at the
+// end of the Blob).
+async function* blobTexts(blob: Blob): AsyncGenerator<string> {
+  const reader = blob.stream().pipeThrough(new TextDecoderStream()).getReader();
+  let carry = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    const text = carry + value;
+    const end = text.lastIndexOf("\n") + 1;
+    if (end > 0) yield text.slice(0, end);
+    carry = text.slice(end);
+  }
+  if (carry) yield carry;
+}
+
+// Yields the file piece by piece, so at most one block is held in memory
+// besides the source text; Blob sources are read as they are needed.
+export async function* bgcodeParts(
+  texts: (string | Blob)[],
+  options: BGCodeOptions = {},
+): AsyncGenerator<Uint8Array> {
+  yield fileHeader();
+  yield await metadataBlock(BLOCK_FILE_METADATA, {
+    Producer: "gcoordinator-web",
+  });
+  yield await metadataBlock(BLOCK_PRINTER_METADATA, options.printer ?? {});
+  yield await metadataBlock(BLOCK_PRINT_METADATA, options.print ?? {});
+  yield await metadataBlock(BLOCK_SLICER_METADATA, {});
+
+  for (const source of texts) {
+    const pieces = typeof source === "string" ? [source] : blobTexts(source);
+    for await (const text of pieces) {
+      for (const chunk of gcodeChunks(text)) {
+        yield await block(BLOCK_GCODE, ENCODING_NONE, chunk);
+      }
+    }
+  }
+}
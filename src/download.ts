@@ -0,0 +1,154 @@
+import { bgcodeParts } from "./bgcode";
+import type { BGCodeOptions } from "./bgcode";
+
+export const STORAGE_KEY_START = "gcoordinator-start-gcode";
+export const STORAGE_KEY_END = "gcoordinator-end-gcode";
+
+// The start and end G-code the user configured in the download dialog.
+export function getStartEndGCode(): { start: string; end: string } {
+  return {
+    start: localStorage.getItem(STORAGE_KEY_START) ?? "",
+    end: localStorage.getItem(STORAGE_KEY_END) ?? "",
+  };
+}
+
+export type DownloadFormat = "gcode" | "gzip" | "bgcode";
+
+export const DOWNLOAD_FORMATS: Record<
+  DownloadFormat,
+  { label: string; extension: string; mimeType: string }
+> = {
+  gcode: { label: "G-code", extension: ".gcode", mimeType: "text/plain" },
+  gzip: {
+    label: "G-code, gzip",
+    extension: ".gcode.gz",
+    mimeType: "application/gzip",
+  },
+  bgcode: {
+    label: "Binary G-code",
+    extension: ".bgcode",
+    mimeType: "application/octet-stream",
+  },
+};
+
+export function withGCodeExtension(
+  filename: string,
+  format: DownloadFormat = "gcode",
+): string {
+  const { extension } = DOWNLOAD_FORMATS[format];
+  const base = filename.replace(/\.(gcode(\.gz)?|bgcode)$/, "");
+  return `${base}${extension}`;
+}
+
+export function saveBlob(blob: Blob, filename: string): void {
+  const url = URL.createObjectURL(blob);
+
+  const anchor = document.createElement("a");
+  anchor.href = url;
+  anchor.download = filename;
+  anchor.click();
+
+  URL.revokeObjectURL(url);
+}
+
+// A piece of a G-code file: text, or a Blob such as an OPFS output file
+export type GCodePart = string | Blob;
+
+// The parts of the final file: start G-code, generated G-code and end G-code,
+// skipping empty ones, separated by newlines.
+export function gcodeFileParts(
+  start: string,
+  gcode: GCodePart,
+  end: string,
+): GCodePart[] {
+  const parts: GCodePart[] = [];
+  for (const part of [start, gcode, end]) {
+    if (typeof part === "string" ? !part.trim() : part.size === 0) continue;
+    if (parts.length > 0) parts.push("\n");
+    parts.push(part);
+  }
+  return parts;
+}
+
+// The File System Access API is not in the DOM typings yet.
+type WindowWithFilePicker = Window & {
+  showSaveFilePicker?: (options?: {
+    suggestedName?: string;
+  }) => Promise<FileSystemFileHandle>;
+};
+
+function fromAsyncIterable(
+  iterable: AsyncIterable<Uint8Array>,
+): ReadableStream<Uint8Array> {
+  const iterator = iterable[Symbol.asyncIterator]();
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      const { value, done } = await iterator.next();
+      if (done) {
+        controller.close();
+      } else {
+        controller.enqueue(value);
+      }
+    },
+  });
+}
+
+function fileStream(
+  parts: GCodePart[],
+  format: DownloadFormat,
+  bgcodeOptions?: BGCodeOptions,
+): ReadableStream<Uint8Array> {
+  switch (format) {
+    case "gcode":
+      return new Blob(parts).stream();
+    case "gzip":
+      return new Blob(parts)
+        .stream()
+        .pipeThrough(new CompressionStream("gzip"));
+    case "bgcode":
+      return fromAsyncIterable(bgcodeParts(parts, bgcodeOptions));
+  }
+}
+
+// Saves the G-code file without joining its parts into one string. Where the
+// File System Access API is available the file is streamed straight to disk,
+// otherwise it is collected into a Blob (compressed formats are built
+// chunk by chunk either way). Returns false if the user cancelled the save
+// dialog.
+export async function saveGCode(
+  parts: GCodePart[],
+  filename: string,
+  format: DownloadFormat,
+  bgcodeOptions?: BGCodeOptions,
+): Promise<boolean> {
+  const { mimeType } = DOWNLOAD_FORMATS[format];
+  const pickerWindow = window as WindowWithFilePicker;
+
+  if (pickerWindow.showSaveFilePicker) {
+    let handle: FileSystemFileHandle;
+    try {
+      handle = await pickerWindow.showSaveFilePicker({
+        suggestedName: filename,
+      });
+    } catch (err) {
+      if (err instanceof DOMException && err.name === "AbortError") {
+        return false;
+      }
+      throw err;
+    }
+    await fileStream(parts, format, bgcodeOptions).pipeTo(
+      await handle.createWritable(),
+    );
+    return true;
+  }
+
+  const blob =
+    format === "gcode"
+      ? new Blob(parts, { type: mimeType })
+      : new Blob(
+          [await new Response(fileStream(parts, format, bgcodeOptions)).blob()],
+          { type: mimeType },
+        );
+  saveBlob(blob, filename);
+  return true;
+}
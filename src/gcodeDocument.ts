@@ -0,0 +1,268 @@
+// The G-code of the last run, as the viewers and the download read it: either
+// text in memory or files in the origin private file system written by the
+// workers (see outputFile.ts). Lines are numbered from 0 as in
+// `text.split("\n")`, so a text ending with a newline has an empty last line.
+import { LINES_PER_CHECKPOINT, OUTPUT_ROOT } from "./outputFile";
+import type { OutputSegment } from "./outputFile";
+
+// Lines per chunk of `GCodeDocument.lines` for in-memory text
+const LINES_PER_CHUNK = 65536;
+
+export interface GCodeDocument {
+  readonly lineCount: number;
+  // Size in bytes; G-code is ASCII, so the same as its length in characters
+  readonly size: number;
+  // Lines start..end-1
+  readLines(start: number, end: number): Promise<string[]>;
+  // All lines in order, a chunk at a time
+  lines(): AsyncGenerator<string[]>;
+  blob(): Promise<Blob>;
+  // Keeps the document readable until the returned function is called,
+  // even if it is disposed in between.
+  hold(): () => void;
+  // Frees the storage once nothing holds the document.
+  dispose(): void;
+}
+
+export class TextDocument implements GCodeDocument {
+  readonly text: string;
+  private splitLines: string[] | null = null;
+
+  constructor(text: string) {
+    this.text = text;
+  }
+
+  private getLines(): string[] {
+    if (this.splitLines === null) {
+      this.splitLines = this.text.split("\n");
+    }
+    return this.splitLines;
+  }
+
+  get lineCount(): number {
+    return this.getLines().length;
+  }
+
+  get size(): number {
+    return this.text.length;
+  }
+
+  async readLines(start: number, end: number): Promise<string[]> {
+    return this.getLines().slice(start, end);
+  }
+
+  async *lines(): AsyncGenerator<string[]> {
+    const lines = this.getLines();
+    for (let i = 0; i < lines.length; i += LINES_PER_CHUNK) {
+      yield lines.slice(i, i + LINES_PER_CHUNK);
+    }
+  }
+
+  async blob(): Promise<Blob> {
+    return new Blob([this.text], { type: "text/plain" });
+  }
+
+  hold(): () => void {
+    return () => {};
+  }
+
+  dispose(): void {}
+}
+
+export const EMPTY_DOCUMENT: GCodeDocument = new TextDocument("");
+
+// Index of the first element of the sorted `values` greater than `value`
+function upperBound(values: number[], value: number): number {
+  let low = 0;
+  let high = values.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (values[mid] <= value) low = mid + 1;
+    else high = mid;
+  }
+  return low;
+}
+
+async function getFileHandle(
+  file: string,
+): Promise<[FileSystemDirectoryHandle, string, FileSystemFileHandle]> {
+  const names = file.split("/");
+  let directory = await navigator.storage.getDirectory();
+  for (const name of names.slice(0, -1)) {
+    directory = await directory.getDirectoryHandle(name);
+  }
+  const name = names[names.length - 1];
+  return [directory, name, await directory.getFileHandle(name)];
+}
+
+export class FileDocument implements GCodeDocument {
+  readonly lineCount: number;
+  readonly size: number;
+  private segments: OutputSegment[];
+  // Byte offset of each segment in the whole document
+  private segmentOffsets: number[] = [];
+  // Known line starts: line numbers and their byte offsets, both ascending
+  private checkpointLines: number[] = [0];
+  private checkpointOffsets: number[] = [0];
+  private files: Promise<File[]> | null = null;
+  private holds = 0;
+  private disposed = false;
+
+  constructor(segments: OutputSegment[]) {
+    this.segments = segments;
+    let newlines = 0;
+    let offset = 0;
+    let atLineStart = true;
+    for (const segment of segments) {
+      this.segmentOffsets.push(offset);
+      if (offset > 0 && atLineStart) {
+        this.checkpointLines.push(newlines);
+        this.checkpointOffsets.push(offset);
+      }
+      segment.checkpoints.forEach((checkpoint, i) => {
+        this.checkpointLines.push(newlines + (i + 1) * LINES_PER_CHECKPOINT);
+        this.checkpointOffsets.push(offset + checkpoint);
+      });
+      newlines += segment.newlines;
+      offset += segment.size;
+      if (segment.size > 0) atLineStart = segment.endsWithNewline;
+    }
+    this.lineCount = newlines + 1;
+    this.size = offset;
+  }
+
+  private getFiles(): Promise<File[]> {
+    if (!this.files) {
+      this.files = Promise.all(
+        this.segments.map(async (segment) => {
+          const [, , handle] = await getFileHandle(segment.file);
+          return handle.getFile();
+        }),
+      );
+    }
+    return this.files;
+  }
+
+  // Bytes start..end-1 of the whole document as text
+  private async readBytes(start: number, end: number): Promise<string> {
+    const files = await this.getFiles();
+    const parts: Blob[] = [];
+    files.forEach((file, i) => {
+      const offset = this.segmentOffsets[i];
+      const from = Math.max(start - offset, 0);
+      const to = Math.min(end - offset, file.size);
+      if (from < to) parts.push(file.slice(from, to));
+    });
+    return new Blob(parts).text();
+  }
+
+  async readLines(start: number, end: number): Promise<string[]> {
+    start = Math.max(0, start);
+    end = Math.min(this.lineCount, end);
+    if (start >= end) return [];
+    const first = upperBound(this.checkpointLines, start) - 1;
+    const last = upperBound(this.checkpointLines, end - 1);
+    const byteEnd =
+      last < this.checkpointOffsets.length
+        ? this.checkpointOffsets[last]
+        : this.size;
+    const text = await this.readBytes(this.checkpointOffsets[first], byteEnd);
+    const firstLine = this.checkpointLines[first];
+    return text.split("\n").slice(start - firstLine, end - firstLine);
+  }
+
+  async *lines(): AsyncGenerator<string[]> {
+    const files = await this.getFiles();
+    let carry = "";
+    for (const file of files) {
+      const reader = file
+        .stream()
+        .pipeThrough(new TextDecoderStream())
+        .getReader();
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        const lines = (carry + value).split("\n");
+        carry = lines.pop() ?? "";
+        if (lines.length > 0) yield lines;
+      }
+    }
+    yield [carry];
+  }
+
+  async blob(): Promise<Blob> {
+    return new Blob(await this.getFiles(), { type: "text/plain" });
+  }
+
+  hold(): () => void {
+    this.holds++;
+    let released = false;
+    return () => {
+      if (released) return;
+      released = true;
+      this.holds--;
+      if (this.disposed && this.holds === 0) this.removeFiles();
+    };
+  }
+
+  dispose(): void {
+    if (this.disposed) return;
+    this.disposed = true;
+    if (this.holds === 0) this.removeFiles();
+  }
+
+  private removeFiles() {
+    for (const segment of this.segments) {
+      getFileHandle(segment.file)
+        .then(([directory, name]) => directory.removeEntry(name))
+        .catch((err) => {
+          console.error("Failed to remove output file", err);
+        });
+    }
+  }
+}
+
+// One output directory per tab, held with a Web Lock for the lifetime of the
+// tab so that other tabs know it is in use.
+const SESSION_DIRECTORY = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+let fileCount = 0;
+let outputFilesReady = false;
+
+// A new file path in this tab's output directory, or null if output files
+// are not available (see initOutputFiles).
+export function newOutputFile(): string | null {
+  if (!outputFilesReady) return null;
+  return `${OUTPUT_ROOT}/${SESSION_DIRECTORY}/${++fileCount}.gcode`;
+}
+
+// Takes the lock on this tab's output directory and removes the directories
+// of tabs that are gone (closed or crashed without cleaning up). Without
+// OPFS or Web Locks (e.g. outside secure contexts) runs return text.
+export async function initOutputFiles(): Promise<void> {
+  if (!navigator.locks || !navigator.storage?.getDirectory) return;
+  const lockName = `${OUTPUT_ROOT}/${SESSION_DIRECTORY}`;
+  await new Promise<void>((acquired) => {
+    navigator.locks.request(lockName, () => {
+      acquired();
+      return new Promise<never>(() => {});
+    });
+  });
+
+  const { held = [] } = await navigator.locks.query();
+  const inUse = new Set(held.map((lock) => lock.name));
+  const root = await navigator.storage.getDirectory();
+  const outputRoot = await root.getDirectoryHandle(OUTPUT_ROOT, {
+    create: true,
+  });
+  // Directory iteration is not in the DOM typings yet.
+  const names = (outputRoot as unknown as { keys(): AsyncIterable<string> })
+    .keys();
+  const stale: string[] = [];
+  for await (const name of names) {
+    if (!inUse.has(`${OUTPUT_ROOT}/${name}`)) stale.push(name);
+  }
+  await Promise.all(
+    stale.map((name) => outputRoot.removeEntry(name, { recursive: true })),
+  );
+  outputFilesReady = true;
+}
@@ -1,5 +1,17 @@
 import { useEffect, useRef } from "react";
 
+const DEFAULT_DELAY = 800;
+const MIN_DELAY = 250;
+const MAX_DELAY = 1500;
+
+// The pause in typing after which an edit is run, from the smoothed run time
+// in milliseconds: quick scripts follow the typing closely, slow ones wait
+// longer so fewer runs are started only to be superseded.
+export function autoRunDelay(runTime: number | null): number {
+  if (runTime === null) return DEFAULT_DELAY;
+  return Math.min(MAX_DELAY, Math.max(MIN_DELAY, runTime / 2));
+}
+
 interface UseAutoRunOptions {
   code: string;
   isLoading: boolean;
@@ -7,6 +19,11 @@ interface UseAutoRunOptions {
   lastRunCodeRef: React.RefObject<string>;
   onRun: () => void;
   delay?: number;
+  // Whether the shown result is a draft; it is then replaced by calling
+  // onIdleRun once the code has stayed unchanged for idleDelay.
+  isDraft?: boolean;
+  onIdleRun?: () => void;
+  idleDelay?: number;
 }
 
 export function useAutoRun({
@@ -15,26 +32,52 @@ export function useAutoRun({
   isRunning,
   lastRunCodeRef,
   onRun,
-  delay = 800,
+  delay = DEFAULT_DELAY,
+  isDraft = false,
+  onIdleRun,
+  idleDelay = 2500,
 }: UseAutoRunOptions): void {
   const timerRef = useRef<number | null>(null);
 
   useEffect(() => {
-    if (isLoading || isRunning) return;
-    if (code === lastRunCodeRef.current) return;
+    if (isLoading) return;
+
+    // Edits are run even while an older version is running (see
+    // usePyodideRunner); the idle run waits for a quiet moment.
+    let run: () => void;
+    let wait: number;
+    if (code !== lastRunCodeRef.current) {
+      run = onRun;
+      wait = delay;
+    } else if (isDraft && onIdleRun && !isRunning) {
+      run = onIdleRun;
+      wait = idleDelay;
+    } else {
+      return;
+    }
 
     if (timerRef.current !== null) {
       window.clearTimeout(timerRef.current);
     }
 
     timerRef.current = window.setTimeout(() => {
-      onRun();
-    }, delay);
+      run();
+    }, wait);
 
     return () => {
       if (timerRef.current !== null) {
         window.clearTimeout(timerRef.current);
       }
     };
-  }, [code, isLoading, isRunning, onRun, delay, lastRunCodeRef]);
+  }, [
+    code,
+    isLoading,
+    isRunning,
+    onRun,
+    delay,
+    lastRunCodeRef,
+    isDraft,
+    onIdleRun,
+    idleDelay,
+  ]);
 }
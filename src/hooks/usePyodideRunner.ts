@@ -1,21 +1,79 @@
 import { useState, useCallback, useRef, useEffect } from "react";
-import { initPyodide, runPython } from "../pyodide";
-import { setGcode, setStdout, setError, clearOutput } from "../outputStore";
+import { canStartRun, initPyodide, runPython } from "../pyodide";
+import type { RunCallbacks, RunOptions, RunResult } from "../pyodide";
+import { hasPythonSyntaxErrors } from "../ruffFormatter";
+import {
+  setGcode,
+  appendStdout,
+  setError,
+  setRunInfo,
+  setProgress,
+  setProfile,
+  setTiming,
+  clearOutput,
+} from "../outputStore";
+
+const runCallbacks: RunCallbacks = {
+  onStdout: appendStdout,
+  onProgress: setProgress,
+};
+
+// Weight of the latest run in the run time estimate
+const RUN_TIME_SMOOTHING = 0.3;
+
+function showResult(result: RunResult) {
+  if (result.transferTime !== undefined) {
+    setTiming("transfer", result.transferTime);
+  }
+  if (result.profile !== undefined) {
+    setProfile(result.profile);
+  }
+  // Before the G-code: the 3D viewer reads the layers of the run info when
+  // the G-code changes.
+  setRunInfo(result.info);
+  setGcode(result.gcode);
+}
+
+// A requested run; `seq` increases with every request. `done` gets whether
+// its result was shown.
+interface RunRequest {
+  seq: number;
+  code: string;
+  options?: RunOptions;
+  done: (shown: boolean) => void;
+}
 
 interface UsePyodideRunnerResult {
   isLoading: boolean;
   isRunning: boolean;
-  runCode: (code: string) => Promise<void>;
+  // Resolves to true once the result of this run is shown, and to false if
+  // it failed, was superseded by a newer request, or was not started
+  runCode: (code: string, options?: RunOptions) => Promise<boolean>;
   lastRunCodeRef: React.RefObject<string>;
+  // Smoothed wall time of recent runs in milliseconds, null before the first
+  runTime: number | null;
 }
 
+// Runs scripts as they are edited. A new run starts as soon as a worker is
+// free, even while an older version of the script is still running (on the
+// standby worker, see setStandbyWorker), as long as Ruff can parse it. When
+// no worker is free only the latest request waits; older waiting requests
+// are dropped. A result is shown only if no newer run has been shown, and
+// the console follows the newest run.
 export function usePyodideRunner(
   initialCode: string | null,
 ): UsePyodideRunnerResult {
   const [isLoading, setIsLoading] = useState(true);
-  const [isRunning, setIsRunning] = useState(false);
+  const [activeRuns, setActiveRuns] = useState(0);
+  const [runTime, setRunTime] = useState<number | null>(null);
   const lastRunCodeRef = useRef<string>(initialCode ?? "");
   const hasBootstrappedRef = useRef(false);
+  const seqRef = useRef(0);
+  // The newest run started and the newest run whose outcome is shown
+  const startedSeqRef = useRef(0);
+  const shownSeqRef = useRef(0);
+  const activeRunsRef = useRef(0);
+  const waitingRef = useRef<RunRequest | null>(null);
 
   useEffect(() => {
     if (hasBootstrappedRef.current) return;
@@ -29,16 +87,16 @@ export function usePyodideRunner(
         await initPyodide();
         if (cancelled) return;
 
-        setIsRunning(true);
+        setActiveRuns(1);
         clearOutput();
         const result = await runPython(
           `import sys\nprint(sys.version)\n${initialCode}`,
+          runCallbacks,
         );
         if (cancelled) return;
 
         lastRunCodeRef.current = initialCode;
-        setGcode(result.gcode);
-        setStdout(result.stdout);
+        showResult(result);
         setError(null);
       } catch (err) {
         if (!cancelled) {
@@ -46,7 +104,8 @@ export function usePyodideRunner(
         }
       } finally {
         if (!cancelled) {
-          setIsRunning(false);
+          setProgress(null);
+          setActiveRuns(0);
           setIsLoading(false);
         }
       }
@@ -59,29 +118,120 @@ export function usePyodideRunner(
     };
   }, [initialCode]);
 
-  const runCode = useCallback(async (code: string) => {
-    if (isLoading || isRunning) return;
+  // Runs `first`, then the request that waited for it, as long as a worker
+  // is free for it
+  const start = useCallback(async (first: RunRequest) => {
+    let request: RunRequest | null = first;
+    while (request !== null) {
+      const { seq, code, options } = request;
+      startedSeqRef.current = seq;
+      setActiveRuns(++activeRunsRef.current);
+      clearOutput();
 
-    lastRunCodeRef.current = code;
+      const isNewest = () => seq === startedSeqRef.current;
+      const callbacks: RunCallbacks = {
+        onStdout: (text) => {
+          if (isNewest()) appendStdout(text);
+        },
+        onProgress: (progress) => {
+          if (isNewest()) setProgress(progress);
+        },
+      };
+      const startedAt = performance.now();
+      let shown = false;
 
-    setIsRunning(true);
-    clearOutput();
+      try {
+        const result = await runPython(code, callbacks, options);
+        const elapsed = performance.now() - startedAt;
+        setRunTime((previous) =>
+          previous === null
+            ? elapsed
+            : previous + RUN_TIME_SMOOTHING * (elapsed - previous),
+        );
+        if (seq > shownSeqRef.current) {
+          shownSeqRef.current = seq;
+          showResult(result);
+          shown = true;
+        } else {
+          result.gcode.dispose();
+        }
+      } catch (err) {
+        if (seq > shownSeqRef.current) {
+          shownSeqRef.current = seq;
+          setError(err instanceof Error ? err.message : String(err));
+        }
+      } finally {
+        if (isNewest()) {
+          setProgress(null);
+        }
+        setActiveRuns(--activeRunsRef.current);
+        request.done(shown);
+      }
 
-    try {
-      const result = await runPython(code);
-      setGcode(result.gcode);
-      setStdout(result.stdout);
-    } catch (err) {
-      setError(err instanceof Error ? err.message : String(err));
-    } finally {
-      setIsRunning(false);
+      request = null;
+      const waiting = waitingRef.current;
+      if (waiting && canStartRun()) {
+        waitingRef.current = null;
+        request = waiting;
+      }
     }
-  }, [isLoading, isRunning]);
+  }, []);
+
+  const runCode = useCallback(
+    (code: string, options?: RunOptions) => {
+      if (isLoading) return Promise.resolve(false);
+
+      lastRunCodeRef.current = code;
+
+      return new Promise<boolean>((resolve) => {
+        const request = {
+          seq: ++seqRef.current,
+          code,
+          options,
+          done: resolve,
+        };
+
+        const schedule = async () => {
+          // Code that does not parse is not started next to another run; it
+          // waits for that run, then reports its error.
+          let speculate = activeRunsRef.current === 0;
+          if (!speculate) {
+            try {
+              speculate = !(await hasPythonSyntaxErrors(code));
+            } catch (err) {
+              console.error("Failed to check syntax with Ruff", err);
+            }
+          }
+          if (request.seq !== seqRef.current) {
+            request.done(false);
+            return;
+          }
+          // A waiting request is always older than this one
+          waitingRef.current?.done(false);
+          waitingRef.current = null;
+          // Without a run of its own to wait for (e.g. during a sweep), it
+          // is started and waits on the worker
+          if (
+            activeRunsRef.current === 0 ||
+            (speculate && canStartRun())
+          ) {
+            start(request);
+          } else {
+            waitingRef.current = request;
+          }
+        };
+
+        schedule();
+      });
+    },
+    [isLoading, start],
+  );
 
   return {
     isLoading,
-    isRunning,
+    isRunning: activeRuns > 0,
     runCode,
     lastRunCodeRef,
+    runTime,
   };
 }
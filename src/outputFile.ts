@@ -0,0 +1,123 @@
+// G-code output files in the origin private file system (OPFS). A worker
+// writes the G-code of a run straight into a file through a sync access
+// handle as Python generates it, so the text is never held as a whole in
+// either the Python or the JavaScript heap. Besides the file, the main
+// thread gets a sparse line index to read any line range on demand (see
+// gcodeDocument.ts).
+
+// Files live in one directory per browser tab below this directory.
+export const OUTPUT_ROOT = "gcode-output";
+
+// Every this many lines, the byte offset of the line start is recorded.
+export const LINES_PER_CHECKPOINT = 256;
+
+// A G-code file written by a worker. A run's G-code may span several files
+// (one per worker for parallel generation); they are read in order.
+export type OutputSegment = {
+  // Path below the OPFS root, "/"-separated
+  file: string;
+  // Size in bytes
+  size: number;
+  // Number of "\n" in the file
+  newlines: number;
+  // Byte offsets of the starts of lines LINES_PER_CHECKPOINT,
+  // 2 * LINES_PER_CHECKPOINT, ... of the file
+  checkpoints: Float64Array;
+  endsWithNewline: boolean;
+};
+
+// Sync access handles are only in the worker typings.
+type SyncAccessHandle = {
+  write(buffer: Uint8Array, options?: { at?: number }): number;
+  truncate(size: number): void;
+  flush(): void;
+  close(): void;
+};
+
+type FileHandleWithSyncAccess = FileSystemFileHandle & {
+  createSyncAccessHandle?: () => Promise<SyncAccessHandle>;
+};
+
+const NEWLINE = 10;
+
+// Whether this context can write output files (dedicated workers only).
+export function canWriteOutputFiles(): boolean {
+  return (
+    typeof FileSystemFileHandle !== "undefined" &&
+    "createSyncAccessHandle" in FileSystemFileHandle.prototype &&
+    typeof navigator.storage?.getDirectory === "function"
+  );
+}
+
+// Resolves "a/b/c.gcode" to the handle of directory b and the name c.gcode,
+// creating the directories.
+async function openDirectory(
+  file: string,
+): Promise<[FileSystemDirectoryHandle, string]> {
+  const names = file.split("/");
+  let directory = await navigator.storage.getDirectory();
+  for (const name of names.slice(0, -1)) {
+    directory = await directory.getDirectoryHandle(name, { create: true });
+  }
+  return [directory, names[names.length - 1]];
+}
+
+// Creates (or truncates) `file` and calls `produce` with a function that
+// appends text to it. Text is written as it comes and indexed on the way;
+// the file is removed again if `produce` throws.
+export async function writeOutputFile(
+  file: string,
+  produce: (write: (text: string) => void) => void,
+): Promise<OutputSegment> {
+  const [directory, name] = await openDirectory(file);
+  const fileHandle: FileHandleWithSyncAccess = await directory.getFileHandle(
+    name,
+    { create: true },
+  );
+  if (!fileHandle.createSyncAccessHandle) {
+    throw new Error("Sync access handles are not available");
+  }
+  const handle = await fileHandle.createSyncAccessHandle();
+  const encoder = new TextEncoder();
+  const checkpoints: number[] = [];
+  let size = 0;
+  let newlines = 0;
+  let lastByte = -1;
+
+  try {
+    handle.truncate(0);
+    produce((text) => {
+      const bytes = encoder.encode(text);
+      if (bytes.length === 0) return;
+      handle.write(bytes, { at: size });
+      for (
+        let i = bytes.indexOf(NEWLINE);
+        i !== -1;
+        i = bytes.indexOf(NEWLINE, i + 1)
+      ) {
+        newlines++;
+        if (newlines % LINES_PER_CHECKPOINT === 0) {
+          checkpoints.push(size + i + 1);
+        }
+      }
+      size += bytes.length;
+      lastByte = bytes[bytes.length - 1];
+    });
+    handle.flush();
+  } catch (error) {
+    handle.close();
+    // The caller only learns the name of a complete file, so nothing else
+    // would remove this one
+    await directory.removeEntry(name).catch(() => {});
+    throw error;
+  }
+  handle.close();
+
+  return {
+    file,
+    size,
+    newlines,
+    checkpoints: Float64Array.from(checkpoints),
+    endsWithNewline: lastByte === NEWLINE,
+  };
+}
@@ -1,18 +1,31 @@
 // Store for managing large output/error text without React state
+import type { RunInfo, RunProfile, RunProgress } from "./pyodide";
+import { EMPTY_DOCUMENT } from "./gcodeDocument";
+import type { GCodeDocument } from "./gcodeDocument";
+
 type Listener = () => void;
 
 interface OutputStore {
-  gcode: string;
+  gcode: GCodeDocument;
   stdout: string;
   error: string | null;
   selectedLine: number | null;
+  runInfo: RunInfo | null;
+  progress: RunProgress | null;
+  profile: RunProfile | null;
+  // Milliseconds spent on the main thread for the last run, by stage
+  timings: Record<string, number>;
 }
 
 let store: OutputStore = {
-  gcode: "",
+  gcode: EMPTY_DOCUMENT,
   stdout: "",
   error: null,
   selectedLine: null,
+  runInfo: null,
+  progress: null,
+  profile: null,
+  timings: {},
 };
 
 const listeners = new Set<Listener>();
@@ -23,7 +36,9 @@ function emitChange() {
   }
 }
 
-export function setGcode(value: string) {
+// The store owns the document: it is disposed once replaced.
+export function setGcode(value: GCodeDocument) {
+  if (store.gcode !== value) store.gcode.dispose();
   store = { ...store, gcode: value };
   emitChange();
 }
@@ -33,13 +48,31 @@ export function setStdout(value: string) {
   emitChange();
 }
 
+export function appendStdout(value: string) {
+  store = {
+    ...store,
+    stdout: store.stdout ? `${store.stdout}\n${value}` : value,
+  };
+  emitChange();
+}
+
 export function setError(value: string | null) {
   store = { ...store, error: value };
   emitChange();
 }
 
 export function clearOutput() {
-  store = { gcode: "", stdout: "", error: null, selectedLine: null };
+  store.gcode.dispose();
+  store = {
+    gcode: EMPTY_DOCUMENT,
+    stdout: "",
+    error: null,
+    selectedLine: null,
+    runInfo: store.runInfo,
+    progress: null,
+    profile: store.profile,
+    timings: {},
+  };
   emitChange();
 }
 
@@ -48,6 +81,26 @@ export function setSelectedLine(line: number | null) {
   emitChange();
 }
 
+export function setRunInfo(value: RunInfo | null) {
+  store = { ...store, runInfo: value };
+  emitChange();
+}
+
+export function setProgress(value: RunProgress | null) {
+  store = { ...store, progress: value };
+  emitChange();
+}
+
+export function setProfile(value: RunProfile | null) {
+  store = { ...store, profile: value };
+  emitChange();
+}
+
+export function setTiming(stage: string, milliseconds: number) {
+  store = { ...store, timings: { ...store.timings, [stage]: milliseconds } };
+  emitChange();
+}
+
 export function getSnapshot(): OutputStore {
   return store;
 }
@@ -58,7 +111,7 @@ export function subscribe(listener: Listener): () => void {
 }
 
 // Selectors for useSyncExternalStore
-export function getGcodeSnapshot(): string {
+export function getGcodeSnapshot(): GCodeDocument {
   return store.gcode;
 }
 
@@ -73,3 +126,19 @@ export function getErrorSnapshot(): string | null {
 export function getSelectedLineSnapshot(): number | null {
   return store.selectedLine;
 }
+
+export function getRunInfoSnapshot(): RunInfo | null {
+  return store.runInfo;
+}
+
+export function getProgressSnapshot(): RunProgress | null {
+  return store.progress;
+}
+
+export function getProfileSnapshot(): RunProfile | null {
+  return store.profile;
+}
+
+export function getTimingsSnapshot(): Record<string, number> {
+  return store.timings;
+}
@@ -1,88 +1,564 @@
 import PyodideWorker from "./pyodide.worker?worker";
+import {
+  FileDocument,
+  TextDocument,
+  initOutputFiles,
+  newOutputFile,
+} from "./gcodeDocument";
+import type { GCodeDocument } from "./gcodeDocument";
+import type { OutputSegment } from "./outputFile";
+
+export type CacheStats = {
+  hits: number;
+  misses: number;
+  hit_rate: number | null;
+  entries: number;
+  bytes: number;
+  max_bytes: number;
+};
+
+export type LayerTime = {
+  z: number;
+  time: number;
+};
+
+// See GCode.stats in src/python/gcoordinator_web/stats.py
+export type RunSummary = {
+  paths: number;
+  points: number;
+  print_distance: number;
+  travel_distance: number;
+  filament_length: number;
+  filament_mass: number;
+  print_time: number;
+  acceleration: boolean;
+  layers: LayerTime[];
+};
+
+// What each enabled output stage did, by stage name (see GCode.report).
+export type RunReport = Record<string, Record<string, number>>;
+
+// See GCode.validate in src/python/gcoordinator_web/gcode.py
+export type ValidationIssue = {
+  path: number;
+  point: number;
+  axis: string;
+  value: number | null;
+  min: number;
+  max: number | null;
+  points: number;
+  // 0-based G-code line, null when generated in parallel
+  line: number | null;
+};
+
+export type Validation = {
+  count: number;
+  issues: ValidationIssue[];
+};
+
+// See memory.report in src/python/gcoordinator_web/memory.py; sizes in bytes.
+export type ArrayInfo = {
+  shape: number[];
+  dtype: string;
+  bytes: number;
+};
+
+export type MemoryReport = {
+  heap: number | null;
+  limit: number | null;
+  traced: boolean;
+  peak: number | null;
+  current: number | null;
+  arrays: ArrayInfo[] | null;
+};
+
+// See quality.get_quality in src/python/gcoordinator_web/quality.py
+export type RunQuality = {
+  mode: "full" | "draft";
+  point_step: number;
+  layer_step: number;
+  infill_scale: number;
+};
+
+// See GCode.layers in src/python/gcoordinator_web/gcode.py
+export type RunLayer = {
+  // 0-based G-code line where the layer's first path starts
+  line: number;
+  // Content hash; equal hashes mean equal moves
+  hash: string;
+  // [line, width, height] in mm from each of these lines on
+  sizes: [number, number, number][];
+};
+
+export type RunInfo = {
+  cache: CacheStats;
+  memory: MemoryReport;
+  quality: RunQuality;
+  summary: RunSummary | null;
+  report: RunReport | null;
+  validation: Validation | null;
+  // Null when generated in parallel
+  layers: RunLayer[] | null;
+};
+
+// See src/python/gcoordinator_web/profiling.py; times in seconds.
+export type ProfileFunction = {
+  function: string;
+  file: string;
+  line: number;
+  calls: number;
+  own: number;
+  cumulative: number;
+};
+
+export type RunProfile = {
+  stages: Record<string, number>;
+  total: number;
+  functions: ProfileFunction[];
+  collapsed: string;
+};
 
 export type RunResult = {
+  gcode: GCodeDocument;
+  info: RunInfo;
+  // Only set for profile runs
+  profile?: RunProfile | null;
+  // Milliseconds from posting the worker result to receiving it
+  transferTime?: number;
+};
+
+// One variant of a parameter sweep
+export type BatchResult = {
   gcode: string;
-  stdout: string;
+  info: RunInfo;
+};
+
+export interface RunOptions {
+  // Profile the script with cProfile and time each stage; the G-code is
+  // then generated by one worker so its time is comparable.
+  profile?: boolean;
+  // Run in draft quality: fewer points and coarser infill for a quick preview
+  draft?: boolean;
+}
+
+export type RunProgress = {
+  stage: string;
+  current: number;
+  total: number | null;
+};
+
+export interface RunCallbacks {
+  onStdout?: (text: string) => void;
+  onProgress?: (progress: RunProgress) => void;
+}
+
+type EmitResult = {
+  text: string;
+  output: OutputSegment | null;
+};
+
+type WorkerRunResult = {
+  // The G-code, or its first part if workItems is not empty; empty if it
+  // was written to `output`
+  gcode: string;
+  output: OutputSegment | null;
+  info: RunInfo;
+  profile: RunProfile | null;
+  workItems: Uint8Array[];
+  sentAt: number;
 };
 
 type WorkerResponse =
   | { type: "init-complete" }
   | { type: "init-error"; error: string }
-  | { type: "run-result"; id: number; result: RunResult }
-  | { type: "run-error"; id: number; error: string };
+  | { type: "stdout"; id: number; text: string }
+  | { type: "progress"; id: number; progress: RunProgress }
+  | { type: "run-result"; id: number; result: WorkerRunResult }
+  | { type: "run-error"; id: number; error: string }
+  | {
+      type: "emit-result";
+      id: number;
+      result: EmitResult;
+    }
+  | { type: "emit-error"; id: number; error: string };
+
+interface PendingRequest {
+  resolve: (value: unknown) => void;
+  reject: (error: Error) => void;
+  callbacks: RunCallbacks;
+}
 
-let worker: Worker | null = null;
-let initPromise: Promise<void> | null = null;
 let messageId = 0;
 
-const pendingRequests = new Map<
-  number,
-  { resolve: (value: RunResult) => void; reject: (error: Error) => void }
->();
-
-function getWorker(): Worker {
-  if (!worker) {
-    worker = new PyodideWorker();
-    worker.onmessage = (event: MessageEvent<WorkerResponse>) => {
-      const message = event.data;
-
-      switch (message.type) {
-        case "run-result": {
-          const pending = pendingRequests.get(message.id);
-          if (pending) {
-            pending.resolve(message.result);
-            pendingRequests.delete(message.id);
-          }
-          break;
-        }
-        case "run-error": {
-          const pending = pendingRequests.get(message.id);
-          if (pending) {
-            pending.reject(new Error(message.error));
-            pendingRequests.delete(message.id);
-          }
-          break;
-        }
-      }
+// One Pyodide worker with its own interpreter.
+class PyodideWorkerClient {
+  private worker: Worker;
+  private initPromise: Promise<void> | null = null;
+  private pendingRequests = new Map<number, PendingRequest>();
+  private activeRuns = 0;
+  isReady = false;
+
+  constructor() {
+    this.worker = new PyodideWorker();
+    this.worker.onmessage = (event: MessageEvent<WorkerResponse>) => {
+      this.handleMessage(event.data);
     };
   }
-  return worker;
+
+  private handleMessage(message: WorkerResponse) {
+    switch (message.type) {
+      case "stdout": {
+        this.pendingRequests
+          .get(message.id)
+          ?.callbacks.onStdout?.(message.text);
+        break;
+      }
+      case "progress": {
+        this.pendingRequests
+          .get(message.id)
+          ?.callbacks.onProgress?.(message.progress);
+        break;
+      }
+      case "run-result":
+        this.settle(message.id, (pending) => pending.resolve(message.result));
+        break;
+      case "emit-result":
+        this.settle(message.id, (pending) => pending.resolve(message.result));
+        break;
+      case "run-error":
+      case "emit-error":
+        this.settle(message.id, (pending) =>
+          pending.reject(new Error(message.error)),
+        );
+        break;
+    }
+  }
+
+  private settle(id: number, action: (pending: PendingRequest) => void) {
+    const pending = this.pendingRequests.get(id);
+    if (pending) {
+      this.pendingRequests.delete(id);
+      action(pending);
+    }
+  }
+
+  private request<T>(
+    message: object,
+    callbacks: RunCallbacks = {},
+    transfer: Transferable[] = [],
+  ): Promise<T> {
+    const id = ++messageId;
+    return new Promise<T>((resolve, reject) => {
+      this.pendingRequests.set(id, {
+        resolve: resolve as (value: unknown) => void,
+        reject,
+        callbacks,
+      });
+      this.worker.postMessage({ ...message, id }, transfer);
+    });
+  }
+
+  init(): Promise<void> {
+    if (this.initPromise) {
+      return this.initPromise;
+    }
+
+    this.initPromise = new Promise<void>((resolve, reject) => {
+      const handler = (event: MessageEvent<WorkerResponse>) => {
+        const message = event.data;
+        if (message.type === "init-complete") {
+          this.worker.removeEventListener("message", handler);
+          this.isReady = true;
+          resolve();
+        } else if (message.type === "init-error") {
+          this.worker.removeEventListener("message", handler);
+          reject(new Error(message.error));
+        }
+      };
+
+      this.worker.addEventListener("message", handler);
+      this.worker.postMessage({ type: "init" });
+    });
+
+    return this.initPromise;
+  }
+
+  // Ready and not running a script
+  get isIdle(): boolean {
+    return this.isReady && this.activeRuns === 0;
+  }
+
+  async run(
+    code: string,
+    parallelism: number,
+    callbacks: RunCallbacks,
+    overrides?: Record<string, number>,
+    profile = false,
+    draft = false,
+    outputFile: string | null = null,
+  ): Promise<WorkerRunResult> {
+    this.activeRuns++;
+    try {
+      await this.init();
+      return await this.request<WorkerRunResult>(
+        {
+          type: "run",
+          code,
+          parallelism,
+          overrides: overrides ? JSON.stringify(overrides) : undefined,
+          profile,
+          draft,
+          outputFile,
+          memoryLimit: memoryOptions.limit,
+          traceMemory: memoryOptions.trace,
+        },
+        callbacks,
+      );
+    } finally {
+      this.activeRuns--;
+    }
+  }
+
+  async emit(
+    payload: Uint8Array,
+    outputFile: string | null = null,
+  ): Promise<EmitResult> {
+    await this.init();
+    return this.request<EmitResult>(
+      { type: "emit", payload, outputFile },
+      {},
+      [payload.buffer as ArrayBuffer],
+    );
+  }
+
+  terminate() {
+    this.worker.terminate();
+    for (const pending of this.pendingRequests.values()) {
+      pending.reject(new Error("Worker terminated"));
+    }
+    this.pendingRequests.clear();
+  }
 }
 
-export async function initPyodide(): Promise<void> {
-  if (initPromise) {
-    return initPromise;
+export type MemoryOptions = {
+  // Soft limit in bytes; runs stop with a MemoryLimitError beyond it
+  limit: number | null;
+  // Trace allocations for the peak and the largest arrays (slow)
+  trace: boolean;
+};
+
+let memoryOptions: MemoryOptions = { limit: null, trace: false };
+
+// Sets the memory options of the following runs.
+export function setMemoryOptions(options: MemoryOptions): void {
+  memoryOptions = options;
+}
+
+let primaryWorker: PyodideWorkerClient | null = null;
+// Extra workers used for parallel G-code generation, besides the primary one.
+const poolWorkers: PyodideWorkerClient[] = [];
+// A second interpreter kept loaded so a run can start while the primary
+// worker is still busy with an older version of the script.
+let standbyWorker: PyodideWorkerClient | null = null;
+
+function getPrimaryWorker(): PyodideWorkerClient {
+  if (!primaryWorker) {
+    primaryWorker = new PyodideWorkerClient();
   }
+  return primaryWorker;
+}
 
-  initPromise = new Promise<void>((resolve, reject) => {
-    const w = getWorker();
+export function getMaxPoolSize(): number {
+  return Math.max(1, navigator.hardwareConcurrency || 1);
+}
 
-    const handler = (event: MessageEvent<WorkerResponse>) => {
-      const message = event.data;
-      if (message.type === "init-complete") {
-        w.removeEventListener("message", handler);
-        resolve();
-      } else if (message.type === "init-error") {
-        w.removeEventListener("message", handler);
-        reject(new Error(message.error));
-      }
-    };
+// Sets the number of workers used for G-code generation. Extra workers are
+// started (and their Pyodide loaded) in the background right away.
+export function setPoolSize(size: number): void {
+  const poolSize = Math.min(Math.max(1, Math.floor(size)), getMaxPoolSize());
+  while (poolWorkers.length > poolSize - 1) {
+    poolWorkers.pop()?.terminate();
+  }
+  while (poolWorkers.length < poolSize - 1) {
+    const worker = new PyodideWorkerClient();
+    worker.init().catch((err) => {
+      console.error("Failed to start pool worker", err);
+    });
+    poolWorkers.push(worker);
+  }
+}
 
-    w.addEventListener("message", handler);
-    w.postMessage({ type: "init" });
-  });
+// Starts or stops the standby worker. It loads Pyodide in the background and
+// costs as much memory as the primary worker.
+export function setStandbyWorker(enabled: boolean): void {
+  if (enabled && !standbyWorker) {
+    const worker = new PyodideWorkerClient();
+    worker.init().catch((err) => {
+      console.error("Failed to start standby worker", err);
+    });
+    standbyWorker = worker;
+  } else if (!enabled && standbyWorker) {
+    standbyWorker.terminate();
+    standbyWorker = null;
+  }
+}
 
-  return initPromise;
+// Workers that can take work right now; pool workers still loading Pyodide
+// are skipped.
+function getReadyWorkers(): PyodideWorkerClient[] {
+  return [getPrimaryWorker(), ...poolWorkers.filter((w) => w.isReady)];
 }
 
-export async function runPython(code: string): Promise<RunResult> {
-  await initPyodide();
+// The worker a script run goes to: the primary one unless it is busy and the
+// standby worker is free. Runs on a busy worker wait for it.
+function getRunWorker(): PyodideWorkerClient {
+  const primary = getPrimaryWorker();
+  if (!primary.isIdle && standbyWorker?.isIdle) {
+    return standbyWorker;
+  }
+  return primary;
+}
+
+// Whether a script run would start right away rather than wait for a worker.
+export function canStartRun(): boolean {
+  return getPrimaryWorker().isIdle || (standbyWorker?.isIdle ?? false);
+}
 
-  const id = ++messageId;
-  const w = getWorker();
+// Emits the work items on the given workers, each worker taking the next
+// item as soon as it is free, and returns the texts in item order. With
+// `toFiles`, each item is written to an output file instead. If an item
+// fails, no further items are started and the output files of the items
+// already written are removed once the running ones have finished.
+async function emitOnPool(
+  workers: PyodideWorkerClient[],
+  workItems: Uint8Array[],
+  onProgress?: (progress: RunProgress) => void,
+  toFiles = false,
+): Promise<EmitResult[]> {
+  const texts = new Array<EmitResult>(workItems.length);
+  let next = 0;
+  let done = 0;
+
+  const drain = async (worker: PyodideWorkerClient) => {
+    while (next < workItems.length) {
+      const index = next++;
+      texts[index] = await worker.emit(
+        workItems[index],
+        toFiles ? newOutputFile() : null,
+      );
+      done++;
+      onProgress?.({
+        stage: "generate",
+        current: done,
+        total: workItems.length,
+      });
+    }
+  };
+
+  const settled = await Promise.allSettled(
+    workers.map((worker) =>
+      drain(worker).catch((err) => {
+        next = workItems.length;
+        throw err;
+      }),
+    ),
+  );
+  const failed = settled.find((s) => s.status === "rejected");
+  if (failed) {
+    const outputs = texts
+      .map((item) => item?.output)
+      .filter((output): output is OutputSegment => !!output);
+    new FileDocument(outputs).dispose();
+    throw failed.reason;
+  }
+  return texts;
+}
+
+export async function initPyodide(): Promise<void> {
+  await Promise.all([
+    getPrimaryWorker().init(),
+    initOutputFiles().catch((err) => {
+      console.error("Output files are not available", err);
+    }),
+  ]);
+}
+
+export async function runPython(
+  code: string,
+  callbacks: RunCallbacks = {},
+  options: RunOptions = {},
+): Promise<RunResult> {
+  const runner = getRunWorker();
+  // Ready pool workers help the runner emit large programs
+  const workers = options.profile
+    ? [runner]
+    : [runner, ...poolWorkers.filter((w) => w.isReady)];
+  // The G-code goes to output files where the workers can write them
+  const { gcode, output, workItems, info, profile, sentAt } = await runner.run(
+    code,
+    workers.length,
+    callbacks,
+    undefined,
+    options.profile,
+    options.draft,
+    newOutputFile(),
+  );
+  const transferTime = performance.timeOrigin + performance.now() - sentAt;
+
+  let items: EmitResult[] = [];
+  try {
+    if (workItems.length > 0) {
+      items = await emitOnPool(
+        workers,
+        workItems,
+        callbacks.onProgress,
+        output !== null,
+      );
+    }
+  } catch (err) {
+    if (output) new FileDocument([output]).dispose();
+    throw err;
+  }
+  const result: RunResult = {
+    gcode: output
+      ? new FileDocument([
+          output,
+          ...items.map((item) => item.output as OutputSegment),
+        ])
+      : new TextDocument(gcode + items.map((item) => item.text).join("")),
+    info,
+    transferTime,
+  };
+  if (options.profile) {
+    result.profile = profile;
+  }
+  return result;
+}
+
+// Runs the script once per set of overrides, spreading the runs over the
+// ready workers that are not running a script (or the primary one if none
+// is idle; the runs then wait for it). `onResult` is called as each run
+// finishes.
+export async function runBatch(
+  code: string,
+  variants: Record<string, number>[],
+  onResult: (index: number, result: BatchResult | Error) => void,
+): Promise<void> {
+  const idle = getReadyWorkers().filter((w) => w.isIdle);
+  const workers = idle.length > 0 ? idle : [getPrimaryWorker()];
+  let next = 0;
+
+  const drain = async (worker: PyodideWorkerClient) => {
+    while (next < variants.length) {
+      const index = next++;
+      try {
+        const { gcode, info } = await worker.run(code, 1, {}, variants[index]);
+        onResult(index, { gcode, info });
+      } catch (err) {
+        onResult(index, err instanceof Error ? err : new Error(String(err)));
+      }
+    }
+  };
 
-  return new Promise<RunResult>((resolve, reject) => {
-    pendingRequests.set(id, { resolve, reject });
-    w.postMessage({ type: "run", code, id });
-  });
+  await Promise.all(workers.map(drain));
 }
@@ -1,22 +1,196 @@
 import { loadPyodide, version as pyodideVersion } from "pyodide";
 import type { PyodideInterface } from "pyodide";
+import type { PyProxy } from "pyodide/ffi";
+import { canWriteOutputFiles, writeOutputFile } from "./outputFile";
+import type { OutputSegment } from "./outputFile";
 
 let pyodideInstance: PyodideInterface | null = null;
 
 type WorkerMessage =
   | { type: "init" }
-  | { type: "run"; code: string; id: number };
+  | {
+      type: "run";
+      code: string;
+      id: number;
+      parallelism: number;
+      // JSON object of top-level constants to override (parameter sweeps)
+      overrides?: string;
+      // Profile the script with cProfile and time each stage
+      profile?: boolean;
+      // Run in draft quality (see quality.py)
+      draft?: boolean;
+      // OPFS file to write the G-code to instead of returning it, if possible
+      outputFile: string | null;
+      // Soft memory limit in bytes (null: none) and allocation tracing
+      memoryLimit: number | null;
+      traceMemory: boolean;
+    }
+  | {
+      type: "emit";
+      payload: Uint8Array;
+      id: number;
+      outputFile: string | null;
+    };
+
+type CacheStats = {
+  hits: number;
+  misses: number;
+  hit_rate: number | null;
+  entries: number;
+  bytes: number;
+  max_bytes: number;
+};
+
+type LayerTime = {
+  z: number;
+  time: number;
+};
+
+// See GCode.stats in src/python/gcoordinator_web/stats.py
+type RunSummary = {
+  paths: number;
+  points: number;
+  print_distance: number;
+  travel_distance: number;
+  filament_length: number;
+  filament_mass: number;
+  print_time: number;
+  acceleration: boolean;
+  layers: LayerTime[];
+};
+
+// What each enabled output stage did, by stage name (see GCode.report).
+type RunReport = Record<string, Record<string, number>>;
+
+// See GCode.validate in src/python/gcoordinator_web/gcode.py
+type ValidationIssue = {
+  path: number;
+  point: number;
+  axis: string;
+  value: number | null;
+  min: number;
+  max: number | null;
+  points: number;
+  // 0-based G-code line, null when generated in parallel
+  line: number | null;
+};
+
+type Validation = {
+  count: number;
+  issues: ValidationIssue[];
+};
+
+// See memory.report in src/python/gcoordinator_web/memory.py; sizes in bytes.
+type ArrayInfo = {
+  shape: number[];
+  dtype: string;
+  bytes: number;
+};
+
+type MemoryReport = {
+  heap: number | null;
+  limit: number | null;
+  traced: boolean;
+  peak: number | null;
+  current: number | null;
+  arrays: ArrayInfo[] | null;
+};
+
+// See quality.get_quality in src/python/gcoordinator_web/quality.py
+type RunQuality = {
+  mode: "full" | "draft";
+  point_step: number;
+  layer_step: number;
+  infill_scale: number;
+};
+
+// See GCode.layers in src/python/gcoordinator_web/gcode.py
+type RunLayer = {
+  // 0-based G-code line where the layer's first path starts
+  line: number;
+  // Content hash; equal hashes mean equal moves
+  hash: string;
+  // [line, width, height] in mm from each of these lines on
+  sizes: [number, number, number][];
+};
+
+type RunInfo = {
+  cache: CacheStats;
+  memory: MemoryReport;
+  quality: RunQuality;
+  summary: RunSummary | null;
+  report: RunReport | null;
+  validation: Validation | null;
+  // Null when generated in parallel
+  layers: RunLayer[] | null;
+};
+
+// See src/python/gcoordinator_web/profiling.py
+type ProfileFunction = {
+  function: string;
+  file: string;
+  line: number;
+  calls: number;
+  own: number;
+  cumulative: number;
+};
+
+type RunProfile = {
+  stages: Record<string, number>;
+  total: number;
+  functions: ProfileFunction[];
+  collapsed: string;
+};
 
 type RunResult = {
   gcode: string;
-  stdout: string;
+  // Set instead of `gcode` when the G-code was written to a file
+  output: OutputSegment | null;
+  // Work items left for the worker pool; their G-code follows `gcode`.
+  workItems: Uint8Array[];
+  info: RunInfo;
+  profile: RunProfile | null;
+  // performance.timeOrigin + performance.now() when the result was posted
+  sentAt: number;
+};
+
+type RunProgress = {
+  stage: string;
+  current: number;
+  total: number | null;
 };
 
 type WorkerResponse =
   | { type: "init-complete" }
   | { type: "init-error"; error: string }
+  | { type: "stdout"; id: number; text: string }
+  | { type: "progress"; id: number; progress: RunProgress }
   | { type: "run-result"; id: number; result: RunResult }
-  | { type: "run-error"; id: number; error: string };
+  | { type: "run-error"; id: number; error: string }
+  | {
+      type: "emit-result";
+      id: number;
+      result: { text: string; output: OutputSegment | null };
+    }
+  | { type: "emit-error"; id: number; error: string };
+
+// Runtime extensions for gcoordinator (see src/python/gcoordinator_web)
+const RUNTIME_DIR = "/home/pyodide/runtime";
+const runtimeSources = import.meta.glob<string>("./python/**/*.py", {
+  query: "?raw",
+  import: "default",
+  eager: true,
+});
+
+function installRuntime(pyodide: PyodideInterface): void {
+  for (const [file, source] of Object.entries(runtimeSources)) {
+    const target = `${RUNTIME_DIR}/${file.replace(/^\.\/python\//, "")}`;
+    pyodide.FS.mkdirTree(target.slice(0, target.lastIndexOf("/")));
+    pyodide.FS.writeFile(target, source);
+  }
+  pyodide.runPython(`import sys\nsys.path.insert(0, "${RUNTIME_DIR}")`);
+  pyodide.pyimport("gcoordinator_web").install();
+}
 
 async function initPyodide(): Promise<PyodideInterface> {
   if (pyodideInstance) {
@@ -31,51 +205,168 @@ async function initPyodide(): Promise<PyodideInterface> {
 
   const micropip = pyodide.pyimport("micropip");
   await micropip.install("/gcoordinator-web/gcoordinator-0.0.2-py3-none-any.whl");
+  installRuntime(pyodide);
 
   pyodideInstance = pyodide;
   return pyodide;
 }
 
-async function runPython(code: string): Promise<RunResult> {
+// Console output and progress are streamed while the script runs, throttled
+// so that chatty scripts do not flood postMessage.
+const STREAM_INTERVAL_MS = 100;
+
+function createStdoutStream(id: number) {
+  let pending: string[] = [];
+  let lastFlush = performance.now();
+
+  const flush = () => {
+    if (pending.length === 0) return;
+    self.postMessage({
+      type: "stdout",
+      id,
+      text: pending.join("\n"),
+    } as WorkerResponse);
+    pending = [];
+    lastFlush = performance.now();
+  };
+
+  const write = (line: string) => {
+    pending.push(line);
+    if (performance.now() - lastFlush >= STREAM_INTERVAL_MS) {
+      flush();
+    }
+  };
+
+  return { write, flush };
+}
+
+async function runPython(
+  code: string,
+  id: number,
+  parallelism: number,
+  overrides: string | undefined,
+  profile: boolean,
+  draft: boolean,
+  outputFile: string | null,
+  memoryLimit: number | null,
+  traceMemory: boolean,
+): Promise<RunResult> {
   const pyodide = await initPyodide();
 
-  const outputLines: string[] = [];
+  const stdout = createStdoutStream(id);
+  pyodide.setStdout({ batched: stdout.write });
+  pyodide.setStderr({ batched: stdout.write });
 
-  pyodide.setStdout({
-    batched: (line: string) => {
-      outputLines.push(line);
-    },
-  });
-  pyodide.setStderr({
-    batched: (line: string) => {
-      outputLines.push(line);
-    },
-  });
+  const runtime = pyodide.pyimport("gcoordinator_web");
+  const reportProgress = (
+    stage: string,
+    current: number,
+    total: number | undefined,
+  ) => {
+    stdout.flush();
+    self.postMessage({
+      type: "progress",
+      id,
+      progress: { stage, current, total: total ?? null },
+    } as WorkerResponse);
+  };
+
+  // The G-code generation is timed but not profiled, see profiling.py
+  const profiling = profile ? runtime.profiling : null;
 
   try {
     pyodide.runPython("if 'full_object' in dir(): del full_object");
+    runtime.begin_run.callKwargs(reportProgress, {
+      memory_limit: memoryLimit,
+      trace_memory: traceMemory,
+      draft,
+    });
 
-    pyodide.runPython(code);
+    profiling?.start();
+    pyodide.runPython(
+      overrides ? String(runtime.sweep.apply_overrides(code, overrides)) : code,
+    );
+    profiling?.lap("script");
 
-    const hasFullObject = pyodide.runPython("'full_object' in dir()");
+    const fullObject = pyodide.globals.get("full_object");
+    const file = canWriteOutputFiles() ? outputFile : null;
     let gcode = "";
-    if (hasFullObject) {
-      gcode = String(pyodide.runPython("gc.GCode(full_object).generate()"));
+    let output: OutputSegment | null = null;
+    let workItems: Uint8Array[] = [];
+    let generator: PyProxy | null = null;
+    if (fullObject !== undefined) {
+      const gcodeGenerator = runtime.GCode(fullObject);
+      profiling?.lap("prepare");
+      profiling?.pause();
+      const plan = runtime.parallel.plan(gcodeGenerator, parallelism);
+      if (plan) {
+        let header: string;
+        [header, workItems] = plan.toJs();
+        plan.destroy();
+        if (file !== null) {
+          output = await writeOutputFile(file, (write) => write(header));
+        } else {
+          gcode = header;
+        }
+      } else if (file !== null) {
+        // Streamed to the file as it is generated, see GCode.write
+        output = await writeOutputFile(file, (write) =>
+          gcodeGenerator.write(write),
+        );
+      } else {
+        gcode = String(gcodeGenerator.generate());
+      }
+      generator = gcodeGenerator;
+      fullObject.destroy?.();
+      profiling?.lap("generate");
     }
 
-    return {
-      gcode,
-      stdout: outputLines.join("\n"),
-    };
-  } catch (error) {
-    const stdout = outputLines.join("\n");
-    throw new Error((stdout ? stdout + "\n" : "") + String(error));
+    const info = JSON.parse(String(runtime.run_info(generator))) as RunInfo;
+    generator?.destroy();
+    profiling?.lap("report");
+
+    const report = profiling
+      ? (JSON.parse(String(profiling.stop())) as RunProfile)
+      : null;
+    if (file !== null && !output) {
+      // No full_object: an empty file keeps the result uniform
+      output = await writeOutputFile(file, () => {});
+    }
+    return { gcode, output, workItems, info, profile: report, sentAt: 0 };
+  } finally {
+    profiling?.pause();
+    runtime.memory.end();
+    runtime.progress.set_handler(null);
+    stdout.flush();
   }
 }
 
-self.onmessage = async (event: MessageEvent<WorkerMessage>) => {
-  const message = event.data;
+// A MemoryError that is not the soft limit means the WASM heap is full.
+function describeRunError(error: unknown): string {
+  const message = error instanceof Error ? error.message : String(error);
+  if (
+    message.includes("MemoryError") &&
+    !message.includes("MemoryLimitError")
+  ) {
+    return `${message}\nThe worker ran out of memory. Reduce the resolution or the number of layers and points, or set a memory limit in the Profile tab so that runs stop before this happens.`;
+  }
+  return message;
+}
+
+// Only arrays that own their whole buffer can be transferred; anything else
+// could be a view into the WASM heap.
+function ownBuffers(arrays: Uint8Array[]): ArrayBuffer[] {
+  return arrays
+    .filter(
+      (array) =>
+        array.byteOffset === 0 &&
+        array.buffer.byteLength === array.byteLength &&
+        array.buffer instanceof ArrayBuffer,
+    )
+    .map((array) => array.buffer as ArrayBuffer);
+}
 
+async function handleMessage(message: WorkerMessage): Promise<void> {
   switch (message.type) {
     case "init":
       try {
@@ -91,19 +382,80 @@ self.onmessage = async (event: MessageEvent<WorkerMessage>) => {
 
     case "run":
       try {
-        const result = await runPython(message.code);
+        const result = await runPython(
+          message.code,
+          message.id,
+          message.parallelism,
+          message.overrides,
+          message.profile ?? false,
+          message.draft ?? false,
+          message.outputFile ?? null,
+          message.memoryLimit,
+          message.traceMemory,
+        );
+        result.sentAt = performance.timeOrigin + performance.now();
+        self.postMessage(
+          {
+            type: "run-result",
+            id: message.id,
+            result,
+          } as WorkerResponse,
+          {
+            transfer: [
+              ...ownBuffers(result.workItems),
+              ...(result.output
+                ? [result.output.checkpoints.buffer as ArrayBuffer]
+                : []),
+            ],
+          },
+        );
+      } catch (error) {
         self.postMessage({
-          type: "run-result",
+          type: "run-error",
           id: message.id,
-          result,
+          error: describeRunError(error),
         } as WorkerResponse);
+      }
+      break;
+
+    case "emit":
+      try {
+        const pyodide = await initPyodide();
+        let text = String(
+          pyodide.pyimport("gcoordinator_web").parallel.emit(message.payload),
+        );
+        let output: OutputSegment | null = null;
+        if (message.outputFile !== null && canWriteOutputFiles()) {
+          output = await writeOutputFile(message.outputFile, (write) =>
+            write(text),
+          );
+          text = "";
+        }
+        self.postMessage(
+          {
+            type: "emit-result",
+            id: message.id,
+            result: { text, output },
+          } as WorkerResponse,
+          { transfer: output ? [output.checkpoints.buffer as ArrayBuffer] : [] },
+        );
       } catch (error) {
         self.postMessage({
-          type: "run-error",
+          type: "emit-error",
           id: message.id,
           error: error instanceof Error ? error.message : String(error),
         } as WorkerResponse);
       }
       break;
   }
+}
+
+// Messages are handled one at a time. A run awaits while it opens its output
+// file, and a message handled meanwhile would reset the per-run state
+// (quality, progress handler, memory limit) of the run that is still going.
+let handling: Promise<void> = Promise.resolve();
+
+self.onmessage = (event: MessageEvent<WorkerMessage>) => {
+  const message = event.data;
+  handling = handling.then(() => handleMessage(message));
 };
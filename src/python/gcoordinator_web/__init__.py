@@ -0,0 +1,162 @@
+"""
+Runtime extensions for gcoordinator used by gcoordinator-web.
+
+The web runner bundles this package next to the gcoordinator wheel and calls
+`install()` once after Pyodide has loaded. `install()` patches the imported
+`gcoordinator` modules in place, so user scripts keep writing
+`import gcoordinator as gc` and transparently get the web-specific behaviour.
+
+Functions:
+- install: Applies the extensions to the `gcoordinator` package.
+- begin_run: Resets the per-run state; called by the worker before a run.
+- run_info: Returns the per-run report of the extensions as a JSON string.
+"""
+
+import functools
+import json
+import sys
+
+import gcoordinator
+from gcoordinator import gcode_generator, infill_generator
+from gcoordinator.kinematics.kin_bed_rotate import BedRotate
+from gcoordinator.kinematics.kin_bed_tilt_bc import BedTiltBC
+from gcoordinator.kinematics.kin_nozzle_tilt import NozzleTilt
+from gcoordinator.path_generator import Path
+from gcoordinator.path_transformer import Transform
+from gcoordinator.utils import contour, polygon
+
+from gcoordinator_web import (
+    adaptive_contour, clip, implicit, infill, kinematics, memo, memory, options, parallel, profiling, progress, quality,
+    simplify, sweep,
+)
+from gcoordinator_web.gcode import GCode
+
+_installed = False
+
+
+def install() -> None:
+    """
+    Applies the extensions to the `gcoordinator` package. Safe to call twice.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    # Expensive pure functions are cached across runs. The Cartesian and the
+    # vectorized NozzleTilt `update_attrs` are cheaper to recompute than to
+    # hash, so they are not cached.
+    find_contours = memo.memoize('find_contours')(contour.find_contours)
+    contour.find_contours = find_contours
+    infill_generator.find_contours = find_contours
+    contour.find_contours_adaptive = adaptive_contour.find_contours_adaptive
+
+    # The infill generators follow the draft quality, see `quality`
+    infill_generators = {
+        'gyroid_infill': quality.draft_gyroid_infill(memo.memoize('gyroid_infill')(infill.gyroid_infill)),
+        'line_infill': quality.draft_line_infill(memo.memoize('line_infill')(infill.line_infill)),
+    }
+    for name, generator in infill_generators.items():
+        reported = _report_progress('infill', generator)
+        setattr(infill_generator, name, reported)
+        setattr(gcoordinator, name, reported)
+
+    # points_in_polygon builds N x M temporaries; stop before allocating
+    # them when they would not fit
+    points_in_polygon = _reserve_memory(polygon.points_in_polygon)
+    polygon.points_in_polygon = points_in_polygon
+    infill_generator.points_in_polygon = points_in_polygon
+
+    # polygon booleans, see `clip`
+    for name in ('union', 'difference', 'intersection', 'offset'):
+        setattr(clip, name, memo.memoize(f'clip.{name}')(getattr(clip, name)))
+    sys.modules['gcoordinator.utils.clip'] = clip
+    gcoordinator.utils.clip = clip
+
+    Path.simplified = simplify.simplified
+
+    Transform.offset = staticmethod(memo.memoize('offset')(Transform.offset))
+
+    NozzleTilt.update_attrs = staticmethod(kinematics.update_attrs)
+    NozzleTilt.calculate_extrusion = staticmethod(kinematics.calculate_extrusion)
+    NozzleTilt.generate_gcode_of_path = staticmethod(kinematics.generate_gcode_of_path)
+    for kinematics_class in (BedTiltBC, BedRotate):
+        kinematics_class.update_attrs = staticmethod(memo.memoize_update_attrs(
+            f'{kinematics_class.__name__}.update_attrs', kinematics_class.update_attrs,
+        ))
+
+    gcode_generator.GCode = GCode
+    gcoordinator.GCode = GCode
+
+    gcoordinator.progress = progress.progress
+    gcoordinator.cache_info = memo.cache_info
+    gcoordinator.clear_cache = memo.clear_cache
+    gcoordinator.set_cache_limit = memo.set_cache_limit
+    gcoordinator.set_output_options = options.set_output_options
+    gcoordinator.set_quality = quality.set_quality
+    gcoordinator.implicit_layers = implicit.implicit_layers
+
+
+def _report_progress(stage: str, func):
+    """Wraps `func` so every call counts as one unit of `stage` progress."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = func(*args, **kwargs)
+        progress.progress(stage)
+        return result
+    return wrapper
+
+
+def _reserve_memory(points_in_polygon):
+    """Wraps `points_in_polygon` to reserve its temporaries, see `memory.reserve`."""
+    @functools.wraps(points_in_polygon)
+    def wrapper(points, polygon):
+        # about three float64 arrays and a few boolean masks of N x M
+        memory.reserve(len(points) * len(polygon) * 27, 'points_in_polygon')
+        return points_in_polygon(points, polygon)
+    return wrapper
+
+
+def begin_run(progress_handler=None, memory_limit=None, trace_memory=False, draft=False) -> None:
+    """
+    Resets the per-run state of the extensions.
+
+    Args:
+        progress_handler (callable, optional): Receives the progress events of
+            the run, see `progress.set_handler`.
+        memory_limit (int, optional): The soft memory limit in bytes, see
+            `memory.begin`.
+        trace_memory (bool): Whether to trace allocations during the run.
+        draft (bool): Whether to run in draft quality, see `quality`.
+    """
+    memo.reset_counters()
+    options.reset()
+    quality.set_quality('draft' if draft else 'full')
+    progress.set_handler(progress_handler)
+    memory.begin(memory_limit, trace_memory)
+
+
+def run_info(gcode=None) -> str:
+    """
+    Returns the per-run report of the extensions.
+
+    Args:
+        gcode (GCode, optional): The generator of the run, if there was one.
+
+    Returns:
+        str: A JSON object with a `cache` entry (see `memo.cache_info`), a
+        `memory` entry (see `memory.report`), a `quality` entry (see
+        `quality.get_quality`), a `summary` entry (see
+        `GCode.stats`), a `report` entry (see `GCode.report`), a
+        `validation` entry (see `GCode.validate`) and a `layers` entry (see
+        `GCode.layers`); the last four are null without `gcode`.
+    """
+    return json.dumps({
+        'cache': memo.cache_info(),
+        'memory': memory.report(),
+        'quality': quality.get_quality(),
+        'summary': gcode.stats() if gcode is not None else None,
+        'report': gcode.report if gcode is not None else None,
+        'validation': gcode.validate() if gcode is not None else None,
+        'layers': gcode.layers() if gcode is not None else None,
+    })
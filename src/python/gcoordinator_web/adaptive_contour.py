@@ -0,0 +1,159 @@
+"""
+Adaptive marching squares.
+
+`gcoordinator.utils.contour.find_contours` traces a level set of values
+sampled on a full grid. When the values come from a function, most of that
+grid is usually far from the contour or outside the part, and sampling it
+costs the same everywhere. `find_contours_adaptive()` samples the function on
+a grid `2**levels` times coarser first and splits a cell into four, down to
+the requested grid, only where the contour may pass through it: where its
+corners lie on both sides of the level, or where a corner is closer to the
+level than the function can change within the cell (`lipschitz` times the
+half diagonal). Cells outside the region mask are not split either; nodes
+are located in the mask with `gcoordinator_web.clip.locator`. The nodes
+sampled at the finest level are traced with `find_contours`, the others are
+left NaN.
+
+Given a true bound `lipschitz` on the gradient, every cell of the full grid
+that the contour crosses is sampled, so the result is exactly that of
+sampling the full grid: the accuracy is the one of the finest grid, at a
+fraction of the samples. Without a bound it is estimated from the coarse
+samples, which can miss features smaller than the coarse cells.
+
+Installed as `gcoordinator.utils.contour.find_contours_adaptive`.
+
+Functions:
+- find_contours_adaptive: Traces a level set of a function on an adaptive grid.
+"""
+
+import numpy as np
+
+from gcoordinator.utils import contour
+
+from gcoordinator_web import clip
+
+COARSE_LEVELS = 4  # the first grid is 2**4 times coarser than the requested one
+LIPSCHITZ_SAFETY = 2.0  # factor on an estimated gradient bound
+
+
+def _closed(outline: np.ndarray) -> np.ndarray:
+    if np.allclose(outline[0], outline[-1]):
+        return outline
+    return np.vstack([outline, outline[:1]])
+
+
+def _edge_cells(outlines: list, x: np.ndarray, y: np.ndarray) -> tuple:
+    """
+    Returns the cells of the grid (row and column arrays) that the edges of
+    the outlines pass through, or touch.
+    """
+    step = min(np.min(np.diff(x)), np.min(np.diff(y)))
+    rows, columns = [], []
+    for outline in outlines:
+        if len(outline) < 3:
+            continue
+        outline = _closed(np.asarray(outline, dtype=float))
+        # points along the edges less than a cell apart, so each piece
+        # between two of them lies in the cells of its ends
+        start, end = outline[:-1], outline[1:]
+        pieces = np.maximum(np.ceil(np.hypot(*(end - start).T) / step), 1).astype(np.int64)
+        edge = np.repeat(np.arange(len(start)), pieces)
+        t = (np.arange(len(edge)) - np.repeat(np.cumsum(pieces) - pieces, pieces)) / np.repeat(pieces, pieces)
+        points = np.vstack([start[edge] + (end - start)[edge] * t[:, np.newaxis], outline[-1:]])
+        i = np.clip(np.searchsorted(y, points[:, 1], side='right') - 1, 0, len(y) - 2)
+        j = np.clip(np.searchsorted(x, points[:, 0], side='right') - 1, 0, len(x) - 2)
+        rows += [i, i[:-1], i[1:]]
+        columns += [j, j[1:], j[:-1]]
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def find_contours_adaptive(x: np.ndarray, y: np.ndarray, f, level: float = 0, lipschitz: float = None,
+                           mask: list = None, levels: int = COARSE_LEVELS) -> list:
+    """
+    Traces the contours of `f` at `level` like `find_contours` on the grid
+    `x` by `y`, sampling `f` only where a contour may be.
+
+    Args:
+        x (np.ndarray): Ascending X coordinates of the finest grid (length M).
+        y (np.ndarray): Ascending Y coordinates of the finest grid (length N).
+        f (callable): Called with X and Y arrays of the same shape, returns
+            the values.
+        level (float): The contour level to find.
+        lipschitz (float, optional): An upper bound on the gradient magnitude
+            of `f`. Estimated from the coarse samples if omitted.
+        mask (list, optional): Outlines (K x 2 arrays) combined with the
+            even-odd rule. Only contours inside are traced, as if `f` were NaN
+            outside.
+        levels (int): How many times coarser (as a power of 2) the first grid is.
+
+    Returns:
+        List of paths, where each path is an Nx2 numpy array of (x, y)
+        coordinates, the same as `find_contours` on the full grid.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    nx, ny = len(x), len(y)
+    if nx < 2 or ny < 2:
+        return []
+
+    values = np.full((ny, nx), np.nan)
+    sampled = np.zeros((ny, nx), dtype=bool)
+    inside = np.ones((ny, nx), dtype=bool)
+
+    def sample(i, j):
+        """Samples the nodes (i, j) not sampled yet, returns f - level at them."""
+        flat = np.unique(i * nx + j)
+        flat = flat[~sampled.flat[flat]]
+        if len(flat):
+            si, sj = np.divmod(flat, nx)
+            values[si, sj] = np.broadcast_to(f(x[sj], y[si]), si.shape)
+            sampled[si, sj] = True
+            if mask is not None:
+                inside[si, sj] = in_mask(np.column_stack([x[sj], y[si]]))
+        return values[i, j] - level
+
+    if mask is not None:
+        in_mask = clip.locator(mask)
+        edge_rows, edge_columns = _edge_cells(mask, x, y)
+
+    size = 2 ** levels
+    rows, columns = np.meshgrid(np.arange(-(-(ny - 1) // size)), np.arange(-(-(nx - 1) // size)), indexing='ij')
+    rows, columns = rows.ravel(), columns.ravel()
+    for k in range(levels, 0, -1):
+        size = 2 ** k
+        i0 = rows * size
+        j0 = columns * size
+        i1 = np.minimum(i0 + size, ny - 1)
+        j1 = np.minimum(j0 + size, nx - 1)
+        corners = np.stack([sample(i0, j0), sample(i0, j1), sample(i1, j0), sample(i1, j1)])
+        if lipschitz is None:
+            width = (x[j1] - x[j0])[np.newaxis]
+            height = (y[i1] - y[i0])[np.newaxis]
+            slopes = np.concatenate([
+                np.abs(corners[[0, 2]] - corners[[1, 3]]) / width,
+                np.abs(corners[[0, 1]] - corners[[2, 3]]) / height,
+            ])
+            lipschitz = LIPSCHITZ_SAFETY * np.fmax.reduce(slopes.ravel(), initial=0)
+        half_diagonal = 0.5 * np.hypot(x[j1] - x[j0], y[i1] - y[i0])
+        keep = (
+            (np.fmin.reduce(corners) < 0) & (np.fmax.reduce(corners) >= 0)
+            | (np.fmin.reduce(np.abs(corners)) <= lipschitz * half_diagonal * (1 + 1e-9))
+            | np.isnan(corners).any(axis=0)
+        )
+        if mask is not None:
+            # a cell no edge passes through is either all inside or all outside
+            touched = np.isin(rows * nx + columns, np.unique((edge_rows >> k) * nx + (edge_columns >> k)))
+            keep &= touched | inside[i0, j0] | inside[i0, j1] | inside[i1, j0] | inside[i1, j1]
+        rows = (2 * rows[keep, np.newaxis] + [0, 0, 1, 1]).ravel()
+        columns = (2 * columns[keep, np.newaxis] + [0, 1, 0, 1]).ravel()
+        child_size = size // 2
+        valid = (rows * child_size < ny - 1) & (columns * child_size < nx - 1)
+        rows, columns = rows[valid], columns[valid]
+
+    for di, dj in ((0, 0), (0, 1), (1, 0), (1, 1)):
+        sample(rows + di, columns + dj)
+    if mask is not None:
+        values[~inside] = np.nan
+    return contour.find_contours(x, y, values, level=level)
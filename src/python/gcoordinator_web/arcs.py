@@ -0,0 +1,175 @@
+"""
+Arc fitting for Cartesian paths.
+
+Curved walls are usually sampled at hundreds of points per layer, and every
+point becomes one `G1` line. `generate_gcode_of_path()` replaces runs of points
+that lie on a circular arc (within a tolerance) by a single `G2`/`G3` move
+with the summed extrusion of the segments it replaces. Z may change linearly
+along the arc (helical moves), which covers spiral vases.
+
+Functions:
+- fit_arcs: Splits a path into straight segments and arcs.
+- generate_gcode_of_path: Generates G-code for a Cartesian path with arcs.
+"""
+
+import numpy as np
+
+from gcoordinator.kinematics.kin_cartesian import Cartesian
+
+MIN_ARC_POINTS = 4  # an arc must replace at least three G1 lines
+MAX_ARC_SWEEP = np.pi  # larger arcs are split, firmwares handle them poorly
+MAX_ARC_RADIUS = 1000.0  # mm, flatter runs stay straight lines
+
+
+def _circle(p0, p1, p2):
+    """
+    Returns the center and radius of the circle through three XY points, or
+    None if they are (nearly) collinear.
+    """
+    ax, ay = p1 - p0
+    bx, by = p2 - p0
+    d = 2 * (ax * by - ay * bx)
+    if abs(d) < 1e-12:
+        return None
+    a2 = ax * ax + ay * ay
+    b2 = bx * bx + by * by
+    center = p0 + np.array([by * a2 - ay * b2, ax * b2 - bx * a2]) / d
+    return center, float(np.hypot(*(p0 - center)))
+
+
+def _fit(xy: np.ndarray, z: np.ndarray, tolerance: float):
+    """
+    Checks whether all points lie on one arc.
+
+    Returns:
+        tuple or None: `(center, clockwise)` if the points can be replaced by
+        one arc within `tolerance`, otherwise None.
+    """
+    circle = _circle(xy[0], xy[len(xy) // 2], xy[-1])
+    if circle is None:
+        return None
+    center, radius = circle
+    if radius > MAX_ARC_RADIUS:
+        return None
+
+    offsets = xy - center
+    if np.max(np.abs(np.hypot(offsets[:, 0], offsets[:, 1]) - radius)) > tolerance:
+        return None
+
+    # the points must advance around the center in one direction
+    angles = np.arctan2(offsets[:, 1], offsets[:, 0])
+    steps = (np.diff(angles) + np.pi) % (2 * np.pi) - np.pi
+    if not (np.all(steps > 0) or np.all(steps < 0)):
+        return None
+    swept = np.cumsum(np.abs(steps))
+    if swept[-1] > MAX_ARC_SWEEP:
+        return None
+
+    # the arc bulges away from each chord by its sagitta
+    chords = np.hypot(*np.diff(xy, axis=0).T)
+    sagittas = radius - np.sqrt(np.maximum(radius**2 - (chords / 2) ** 2, 0))
+    if np.max(sagittas) > tolerance:
+        return None
+
+    # Z has to change linearly along the arc
+    expected_z = z[0] + (z[-1] - z[0]) * np.concatenate([[0], swept]) / swept[-1]
+    if np.max(np.abs(z - expected_z)) > tolerance:
+        return None
+
+    return center, bool(steps[0] < 0)
+
+
+def fit_arcs(x, y, z, tolerance: float) -> list:
+    """
+    Splits a polyline into straight segments and arcs.
+
+    Arcs are grown greedily from each point: the length is doubled while the
+    points still fit, then the longest fitting length is found by bisection.
+
+    Args:
+        x, y, z (array-like): The coordinates of the points.
+        tolerance (float): The maximum distance in mm between the arc and the
+            points and segments it replaces.
+
+    Returns:
+        list: `(start, end, arc)` tuples covering the segments in order, where
+        `arc` is None for a straight segment from point `start` to `end`
+        (`end == start + 1`) or `(center, clockwise)` for an arc through the
+        points `start..end`.
+    """
+    xy = np.column_stack([x, y]).astype(float)
+    z = np.asarray(z, dtype=float)
+    n = len(xy)
+    pieces = []
+    i = 0
+    while i < n - 1:
+        def fits(end):
+            return _fit(xy[i:end + 1], z[i:end + 1], tolerance)
+
+        best = None
+        end = i + MIN_ARC_POINTS - 1
+        if end < n and fits(end):
+            good, length = end, MIN_ARC_POINTS - 1
+            bad = None
+            while bad is None:
+                length *= 2
+                candidate = min(i + length, n - 1)
+                if fits(candidate):
+                    good = candidate
+                    if candidate == n - 1:
+                        break
+                else:
+                    bad = candidate
+            if bad is not None:
+                while bad - good > 1:
+                    mid = (good + bad) // 2
+                    if fits(mid):
+                        good = mid
+                    else:
+                        bad = mid
+            best = good
+
+        if best is None:
+            pieces.append((i, i + 1, None))
+            i += 1
+        else:
+            pieces.append((i, best, fits(best)))
+            i = best
+    return pieces
+
+
+def generate_gcode_of_path(path, tolerance: float) -> str:
+    """
+    Generates G-code for a Cartesian path, using G2/G3 where points lie on an
+    arc. Straight segments are written exactly as `Cartesian` writes them.
+
+    Args:
+        path (Path): A Cartesian path whose defaults have been applied.
+        tolerance (float): See `fit_arcs`.
+
+    Returns:
+        str: The G-code for the path.
+    """
+    extrusion = Cartesian.calculate_extrusion(path)
+    x = np.asarray(path.x, dtype=float)
+    y = np.asarray(path.y, dtype=float)
+    z = np.asarray(path.z, dtype=float)
+    x_origin, y_origin = path.x_origin, path.y_origin
+
+    lines = []
+    for start, end, arc in fit_arcs(x, y, z, tolerance):
+        target = (
+            f'X{x[end] + x_origin:.5f} Y{y[end] + y_origin:.5f} Z{z[end]:.5f} '
+        )
+        if arc is None:
+            lines.append(f'G1 F{path.print_speed} {target}E{extrusion[start]:.5f}\n')
+        else:
+            center, clockwise = arc
+            i_offset = center[0] - x[start]
+            j_offset = center[1] - y[start]
+            e = extrusion[start:end].sum()
+            lines.append(
+                f'{"G2" if clockwise else "G3"} F{path.print_speed} {target}'
+                f'I{i_offset:.5f} J{j_offset:.5f} E{e:.5f}\n'
+            )
+    return ''.join(lines)
@@ -0,0 +1,432 @@
+"""
+Boolean operations on polygon regions.
+
+The infill generators of gcoordinator take several outlines and fill what an
+odd number of them encloses; nothing can be added to or cut from such a
+region. This module computes unions, differences, intersections and offsets
+of regions with a sweep line, in NumPy: the plane is cut into vertical slabs
+at every vertex and every crossing of two edges, so that within a slab no
+edges cross and they can be ordered from bottom to top. Counting the edges
+below each piece of an edge gives the winding number of every trapezoid
+between the pieces; the operation decides which trapezoids belong to the
+result, and the pieces between a trapezoid inside the result and one outside
+it are its outline.
+
+A region is an outline (an N x 2 array or a `Path`), or a list of outlines or
+a `PathList`, combined with the even-odd rule as the infill generators do.
+The results are closed outlines that do not cross, outer ones
+counterclockwise and holes clockwise, so they fill the same area with any
+fill rule and can be passed to `gyroid_infill` or `line_infill` as they are.
+`locator()` tests points against a region by finding their slab and counting
+the pieces below them, without the N x M temporaries of `points_in_polygon`.
+
+Installed as `gcoordinator.utils.clip`.
+
+Functions:
+- union: Returns the area inside either region.
+- difference: Returns the area of a region outside another.
+- intersection: Returns the area inside both regions.
+- offset: Grows or shrinks a region by a distance.
+- locator: Returns a function that tests points against a region.
+- contains: Tests which points lie inside a region.
+"""
+
+import numpy as np
+
+from gcoordinator.path_generator import Path, PathList
+
+EPSILON = 1e-9  # relative to the size of the coordinates
+MITER_LIMIT = 2.0  # longer miters are beveled, as a multiple of the distance
+
+
+def _outlines(region) -> list:
+    """Returns the outlines of a region as K x 2 float arrays."""
+    if isinstance(region, PathList):
+        items = region.paths
+    elif isinstance(region, Path) or (isinstance(region, np.ndarray) and region.ndim == 2):
+        items = [region]
+    else:
+        items = list(region)
+    outlines = []
+    for item in items:
+        if isinstance(item, Path):
+            outlines.append(np.column_stack([item.x, item.y]).astype(float))
+        else:
+            outlines.append(np.asarray(item, dtype=float).reshape(len(item), -1)[:, :2])
+    return outlines
+
+
+def _height(region):
+    """Returns the Z of the first point of a Path or PathList region, or None."""
+    paths = region.paths if isinstance(region, PathList) else [region] if isinstance(region, Path) else []
+    for path in paths:
+        if len(path.z):
+            return float(path.z[0])
+    return None
+
+
+def _edges(outlines: list) -> np.ndarray:
+    """Returns the edges of the outlines, each closed, as an E x 4 array of x1, y1, x2, y2."""
+    edges = [np.hstack([outline, np.roll(outline, -1, axis=0)]) for outline in outlines if len(outline) >= 3]
+    return np.vstack(edges) if edges else np.zeros((0, 4))
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """The Z component of the cross products of 2D vectors (on the last axis)."""
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def _y_at(pieces: dict, index, x) -> np.ndarray:
+    """Returns the Y of the edges of `pieces[index]` at `x`, exact at their end points."""
+    x_left, x_right = pieces['x_left'][index], pieces['x_right'][index]
+    y_left, y_right = pieces['y_at_left'][index], pieces['y_at_right'][index]
+    slope = (y_right - y_left) / (x_right - x_left)
+    return np.where(x == x_right, y_right, y_left + (x - x_left) * slope)
+
+
+def _sweep(operands: list) -> tuple:
+    """
+    Cuts the plane into slabs in which the edges of the operands do not cross.
+
+    Args:
+        operands (list): One E x 4 edge array per operand, see `_edges`.
+
+    Returns:
+        tuple: The slab bounds (ascending X), the pieces (a dict of arrays,
+        one entry per part of an edge within a slab, sorted by slab and from
+        bottom to top: `slab`, `operand`, `direction` (+1 for edges running
+        towards +X), `y_left` and `y_right` at the slab bounds, and the end
+        points of the edge) and the tolerance on coordinates.
+    """
+    edges = np.vstack(operands)
+    operand = np.repeat(np.arange(len(operands)), [len(item) for item in operands])
+    tolerance = EPSILON * max(float(np.max(np.abs(edges))) if len(edges) else 0.0, 1.0)
+    x1, y1, x2, y2 = edges.T
+    # vertices closer than the tolerance in X share a bound
+    xs = np.unique(np.concatenate([x1, x2]))
+    distinct = np.diff(xs, prepend=-np.inf) > tolerance
+    bounds = xs[distinct]
+    snap = np.cumsum(distinct) - 1
+    x1, x2 = bounds[snap[np.searchsorted(xs, x1)]], bounds[snap[np.searchsorted(xs, x2)]]
+    # vertical edges have no part inside a slab; the outline rebuilds them
+    slanted = x1 != x2
+    x1, y1, x2, y2, operand = x1[slanted], y1[slanted], x2[slanted], y2[slanted], operand[slanted]
+    forward = x2 > x1
+    edge_pieces = {
+        'x_left': np.where(forward, x1, x2),
+        'y_at_left': np.where(forward, y1, y2),
+        'x_right': np.where(forward, x2, x1),
+        'y_at_right': np.where(forward, y2, y1),
+    }
+
+    while True:
+        first = np.searchsorted(bounds, edge_pieces['x_left'])
+        count = np.searchsorted(bounds, edge_pieces['x_right']) - first
+        edge = np.repeat(np.arange(len(first)), count)
+        slab = first[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(count) - count, count)
+        y_left = _y_at(edge_pieces, edge, bounds[slab])
+        y_right = _y_at(edge_pieces, edge, bounds[slab + 1])
+        order = np.lexsort((y_left + y_right, slab))
+        edge, slab, y_left, y_right = edge[order], slab[order], y_left[order], y_right[order]
+
+        # neighbours whose order differs at the two bounds cross within the
+        # slab; their crossings become bounds until no neighbours cross
+        d_left = y_left[1:] - y_left[:-1]
+        d_right = y_right[1:] - y_right[:-1]
+        crossing = (slab[1:] == slab[:-1]) & (
+            (d_left < -tolerance) & (d_right > tolerance) | (d_left > tolerance) & (d_right < -tolerance)
+        )
+        if not crossing.any():
+            break
+        at = slab[1:][crossing]
+        t = d_left[crossing] / (d_left[crossing] - d_right[crossing])
+        new = np.unique(bounds[at] + t * (bounds[at + 1] - bounds[at]))
+        index = np.clip(np.searchsorted(bounds, new), 1, len(bounds) - 1)
+        distinct = np.minimum(new - bounds[index - 1], bounds[index] - new) > tolerance
+        distinct[1:] &= np.diff(new) > tolerance
+        if not distinct.any():
+            break
+        bounds = np.union1d(bounds, new[distinct])
+
+    pieces = {name: values[edge] for name, values in edge_pieces.items()}
+    pieces.update(
+        slab=slab, operand=operand[edge], direction=np.where(forward[edge], 1, -1), y_left=y_left, y_right=y_right,
+    )
+    return bounds, pieces, tolerance
+
+
+def _boundary(operands: list, positive: list, select) -> list:
+    """
+    Returns the outline of a boolean combination of regions.
+
+    Args:
+        operands (list): One E x 4 edge array per operand, see `_edges`.
+        positive (list): Per operand, whether a point with a positive winding
+            number is inside (otherwise one with an odd winding number is).
+        select (callable): Receives one boolean array per operand, whether
+            points are inside it, and returns whether they are in the result.
+
+    Returns:
+        list: Closed K x 2 outlines, outer ones counterclockwise.
+    """
+    bounds, pieces, tolerance = _sweep(operands)
+    slab = pieces['slab']
+    if len(slab) == 0:
+        return []
+    index = np.arange(len(slab))
+    slab_start = np.r_[True, slab[1:] != slab[:-1]]
+    # coincident pieces (shared edges) form one group
+    group_start = slab_start | np.r_[
+        True,
+        (np.abs(np.diff(pieces['y_left'])) > tolerance) | (np.abs(np.diff(pieces['y_right'])) > tolerance),
+    ]
+    first_in_slab = np.maximum.accumulate(np.where(slab_start, index, 0))
+    inside = []
+    for k, rule in enumerate(positive):
+        direction = np.where(pieces['operand'] == k, pieces['direction'], 0)
+        total = np.cumsum(direction)
+        winding = total - total[first_in_slab] + direction[first_in_slab]
+        inside.append(winding > 0 if rule else winding % 2 == 1)
+    above = select(*inside)
+    below = np.r_[False, above[:-1]] & ~slab_start
+    starts = np.flatnonzero(group_start)
+    ends = np.r_[starts[1:], len(slab)] - 1
+    boundary = below[starts] != above[ends]
+    piece = starts[boundary]
+    if len(piece) == 0:
+        return []
+    up = above[ends[boundary]]  # inside above: the outline runs towards +X
+
+    # nodes: the piece ends on each bound, merged within the tolerance
+    node_bound = np.concatenate([slab[piece], slab[piece] + 1])
+    node_y = np.concatenate([pieces['y_left'][piece], pieces['y_right'][piece]])
+    order = np.lexsort((node_y, node_bound))
+    new_node = np.r_[True, (np.diff(node_bound[order]) != 0) | (np.diff(node_y[order]) > tolerance)]
+    node = np.empty(len(order), dtype=np.int64)
+    node[order] = np.cumsum(new_node) - 1
+    points = np.column_stack([bounds[node_bound[order][new_node]], node_y[order][new_node]])
+    left, right = node[:len(piece)], node[len(piece):]
+    sources = [np.where(up, left, right)]
+    targets = [np.where(up, right, left)]
+
+    # along each bound, the outline runs vertically where the result is
+    # inside on one side only; each piece end toggles its side above it
+    node_count = len(points)
+    bound_start = np.r_[True, np.diff(node_bound[order][new_node]) != 0]
+    first_on_bound = np.maximum.accumulate(np.where(bound_start, np.arange(node_count), 0))
+    sides = []
+    for ends_on_side in (right, left):
+        toggles = np.bincount(ends_on_side, minlength=node_count) % 2
+        total = np.cumsum(toggles)
+        sides.append((total - total[first_on_bound] + toggles[first_on_bound]) % 2 == 1)
+    inside_left, inside_right = sides
+    vertical = np.flatnonzero(~bound_start[1:] & (inside_left[:-1] != inside_right[:-1]))
+    sources.append(np.where(inside_left[vertical], vertical, vertical + 1))
+    targets.append(np.where(inside_left[vertical], vertical + 1, vertical))
+    return _loops(points, np.concatenate(sources), np.concatenate(targets), tolerance)
+
+
+def _loops(points: np.ndarray, sources: np.ndarray, targets: np.ndarray, tolerance: float) -> list:
+    """Chains directed edges between `points` into closed outlines."""
+    order = np.argsort(sources, kind='stable')
+    next_out = np.searchsorted(sources[order], np.arange(len(points))).tolist()
+    out_end = np.searchsorted(sources[order], np.arange(len(points)), side='right').tolist()
+    order, sources, targets = order.tolist(), sources.tolist(), targets.tolist()
+    used = [False] * len(sources)
+    outlines = []
+    for start in range(len(sources)):
+        if used[start]:
+            continue
+        chain = []
+        edge = start
+        while True:
+            used[edge] = True
+            chain.append(sources[edge])
+            node = targets[edge]
+            if node == sources[start]:
+                break
+            while next_out[node] < out_end[node] and used[order[next_out[node]]]:
+                next_out[node] += 1
+            if next_out[node] == out_end[node]:
+                break
+            edge = order[next_out[node]]
+        outline = points[chain]
+        # drop the points on the straight line between their neighbours, such
+        # as where an edge was cut at a slab bound
+        before, after = np.roll(outline, 1, axis=0), np.roll(outline, -1, axis=0)
+        cross = _cross(outline - before, after - before)
+        outline = outline[np.abs(cross) > tolerance * np.hypot(*(after - before).T)]
+        if len(outline) >= 3:
+            outlines.append(np.vstack([outline, outline[:1]]))
+    return outlines
+
+
+def _result(outlines: list, region):
+    """Returns the outlines as a PathList at the height of `region` if it has paths, else as they are."""
+    z = _height(region)
+    if z is None:
+        return outlines
+    return PathList([Path(outline[:, 0], outline[:, 1], np.full(len(outline), z)) for outline in outlines])
+
+
+def union(subject, clip=None):
+    """
+    Returns the area inside `subject` or `clip`. Without `clip`, resolves the
+    overlapping and crossing outlines of `subject` into separate ones.
+
+    Args:
+        subject: A region: an outline (N x 2 array or Path), a list of
+            outlines or a PathList, combined with the even-odd rule.
+        clip (optional): A region.
+
+    Returns:
+        PathList at the height of the first point of `subject` if it is a
+        Path or PathList, else a list of closed N x 2 arrays.
+    """
+    operands = [_edges(_outlines(subject))]
+    if clip is not None:
+        operands.append(_edges(_outlines(clip)))
+    return _result(_boundary(operands, [False] * len(operands), lambda *inside: np.any(inside, axis=0)), subject)
+
+
+def difference(subject, clip):
+    """
+    Returns the area inside `subject` and outside `clip`, e.g. an outline
+    with holes cut out.
+
+    Args:
+        subject: A region, see `union`.
+        clip: A region.
+
+    Returns:
+        PathList or list: See `union`.
+    """
+    operands = [_edges(_outlines(subject)), _edges(_outlines(clip))]
+    return _result(_boundary(operands, [False, False], lambda a, b: a & ~b), subject)
+
+
+def intersection(subject, clip):
+    """
+    Returns the area inside both `subject` and `clip`.
+
+    Args:
+        subject: A region, see `union`.
+        clip: A region.
+
+    Returns:
+        PathList or list: See `union`.
+    """
+    operands = [_edges(_outlines(subject)), _edges(_outlines(clip))]
+    return _result(_boundary(operands, [False, False], np.logical_and), subject)
+
+
+def _offset_outline(outline: np.ndarray, distance: float) -> np.ndarray:
+    """
+    Moves each edge of a closed outline `distance` along its right-hand
+    normal and joins the moved edges: with a miter (or a bevel past
+    MITER_LIMIT) where they part, and through the original vertex where they
+    overlap, so that parts that turn inside out wind the other way and are
+    clipped by the positive fill rule.
+    """
+    outline = outline[:-1]
+    vector = np.roll(outline, -1, axis=0) - outline
+    length = np.hypot(*vector.T)
+    outline, vector, length = outline[length > 0], vector[length > 0], length[length > 0]
+    if len(outline) < 3:
+        return outline
+    normal = np.column_stack([vector[:, 1], -vector[:, 0]]) / length[:, np.newaxis] * distance
+    # at corner i, the edge before ends and edge i starts
+    normal_before = np.roll(normal, 1, axis=0)
+    parting = _cross(np.roll(vector, 1, axis=0), vector) * distance > 0
+    bisector = normal_before + normal
+    bisector_length = np.maximum(np.hypot(*bisector.T), 1e-300)
+    # the cosine of half the turn; the miter is distance / cos long
+    cos_half = np.sum(bisector * normal, axis=1) / bisector_length / abs(distance)
+    miter = parting & (cos_half * MITER_LIMIT > 1)
+    tip = outline + bisector * (abs(distance) / np.where(miter, cos_half, 1) / bisector_length)[:, np.newaxis]
+    # the original vertex is only left out at nearly flat corners (a turn
+    # below about 8 degrees) between edges longer than the distance, which
+    # cannot turn inside out; this keeps smooth outlines cheap
+    flat = 2 * cos_half ** 2 - 1 >= 0.99
+    through_vertex = ~parting & ~(flat & (abs(distance) < np.minimum(length, np.roll(length, 1))))
+    points = np.stack([outline + normal_before, np.where(miter[:, np.newaxis], tip, outline), outline + normal], axis=1)
+    keep = np.stack([~miter, miter | through_vertex, ~miter], axis=1)
+    return points[keep]
+
+
+def offset(region, distance: float):
+    """
+    Grows `region` by `distance` (shrinks it if negative), clipping the
+    offset outlines where they overlap or turn inside out, so holes close and
+    narrow parts vanish. Corners are mitered, or beveled where the miter would
+    be longer than `MITER_LIMIT` times the distance.
+
+    Args:
+        region: A region, see `union`.
+        distance (float): The offset in mm, positive outwards.
+
+    Returns:
+        PathList or list: See `union`.
+    """
+    outlines = _boundary([_edges(_outlines(region))], [False], lambda inside: inside)
+    if distance != 0 and outlines:
+        # the outer outlines run counterclockwise, so their right-hand
+        # normals point out of the region, and those of holes into the holes
+        moved = [_offset_outline(outline, distance) for outline in outlines]
+        outlines = _boundary([_edges(moved)], [True], lambda inside: inside)
+    return _result(outlines, region)
+
+
+def locator(region):
+    """
+    Returns a function that tests points against `region`, which costs
+    O(log K) per point for K edges once the slabs are built.
+
+    Args:
+        region: A region, see `union`.
+
+    Returns:
+        callable: Takes an N x 2 array of points and returns a boolean array
+        of length N, True for the points inside. Points on an outline count
+        as inside on its left and bottom, as with `points_in_polygon`.
+    """
+    bounds, pieces, _ = _sweep([_edges(_outlines(region))])
+    slab_start = np.searchsorted(pieces['slab'], np.arange(len(bounds)))
+
+    def inside(points) -> np.ndarray:
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        slab = np.searchsorted(bounds, x, side='right') - 1
+        valid = (slab >= 0) & (slab < len(bounds) - 1)
+        slab = np.where(valid, slab, 0)
+        if not valid.any():
+            return valid
+        # binary search for the number of pieces of the slab on or below each point
+        low = slab_start[slab]
+        high = np.where(valid, slab_start[np.minimum(slab + 1, len(bounds) - 1)], low)
+        first = low.copy()
+        while True:
+            active = low < high
+            if not active.any():
+                break
+            middle = np.where(active, (low + high) // 2, 0)
+            below = active & (_y_at(pieces, middle, x) <= y)
+            low = np.where(below, middle + 1, low)
+            high = np.where(active & ~below, middle, high)
+        return valid & ((low - first) % 2 == 1)
+
+    return inside
+
+
+def contains(points, region) -> np.ndarray:
+    """
+    Tests which points lie inside `region`, see `locator`.
+
+    Args:
+        points (np.ndarray): An N x 2 array of points.
+        region: A region, see `union`.
+
+    Returns:
+        np.ndarray: A boolean array of length N.
+    """
+    return locator(region)(points)
@@ -0,0 +1,153 @@
+"""
+Modal-state compaction of generated G-code.
+
+The generators write every move with its feed rate and all three axes, and
+wrap every travel in `G91` ... `G90` / `M83`. `compact_gcode()` replays the
+text while tracking the modal state of the printer (feed rate, position,
+positioning and extrusion mode, fan speed and temperatures) and drops the
+words and commands that do not change it. Relative travel moves are rewritten
+as absolute moves when the position is known, so the `G91`/`G90` pair around
+them can go as well. The tool path is unchanged.
+
+Classes:
+- ModalState: The printer state tracked while compacting.
+
+Functions:
+- compact_gcode: Removes redundant words and commands from G-code text.
+"""
+
+MOVE_COMMANDS = ('G0', 'G1', 'G2', 'G3')
+AXES = ('X', 'Y', 'Z')
+SETTING_COMMANDS = {  # command -> the state it sets
+    'M104': 'M104', 'M109': 'M104',
+    'M140': 'M140', 'M190': 'M140',
+    'M106': 'M106',
+}
+WAITING_COMMANDS = ('M109', 'M190')  # never dropped, they block until reached
+
+
+class ModalState:
+    """
+    The printer state tracked while compacting. None means unknown.
+
+    Attributes:
+        absolute (bool or None): True after G90, False after G91. The
+            generators never write the initial G90 and rely on the
+            firmware default, so it starts as True.
+        relative_e (bool or None): True after M83, False after M82.
+        feed (float or None): The last feed rate.
+        position (dict): The last X, Y and Z positions.
+        settings (dict): The last `S` value of M104, M140 and M106.
+    """
+
+    def __init__(self, absolute=True, relative_e=None) -> None:
+        self.reset()
+        self.absolute = absolute
+        self.relative_e = relative_e
+
+    def reset(self) -> None:
+        """Forgets everything, after a command whose effect is not tracked."""
+        self.absolute = None
+        self.relative_e = None
+        self.feed = None
+        self.position = dict.fromkeys(AXES)
+        self.settings = {}
+        # inside a G91 block that is being rewritten as absolute moves
+        self.rewriting_relative = False
+
+
+def _compact_move(command: str, words: list, state: ModalState):
+    """Returns the words of a move without redundant ones, or None to drop it."""
+    is_arc = command in ('G2', 'G3')
+    kept = [command]
+    for word in words:
+        letter, value = word[0].upper(), word[1:]
+        if letter == 'F':
+            feed = float(value)
+            if feed == state.feed:
+                continue
+            state.feed = feed
+        elif letter in AXES:
+            if state.rewriting_relative:
+                target = state.position[letter] + float(value)
+                value = f'{target:.5f}'
+                word = f'{letter}{value}'
+            if state.absolute or state.rewriting_relative:
+                target = float(value)
+                if target == state.position[letter] and not (is_arc and letter in 'XY'):
+                    continue
+                state.position[letter] = target
+            else:
+                state.position[letter] = None
+        kept.append(word)
+    return kept if len(kept) > 1 else None
+
+
+def compact_gcode(text: str, state: ModalState = None, line_map: list = None) -> str:
+    """
+    Removes words and commands that do not change the printer state.
+
+    Args:
+        text (str): G-code text.
+        state (ModalState, optional): The state before the first line, for
+            text that continues other G-code; it is updated in place.
+            Defaults to the state at the start of a program (absolute
+            positioning, everything else unknown).
+        line_map (list, optional): If given, the 0-based output line of each
+            input line is appended to it; dropped lines map to the line after.
+
+    Returns:
+        str: The compacted G-code text.
+    """
+    if state is None:
+        state = ModalState()
+    out = []
+    for line in text.split('\n'):
+        if line_map is not None:
+            line_map.append(len(out))
+        code, sep, comment = line.partition(';')
+        words = code.split()
+        if not words:
+            out.append(line)
+            continue
+        command = words[0].upper()
+
+        if command in MOVE_COMMANDS:
+            kept = _compact_move(command, words[1:], state)
+            if kept is not None:
+                out.append(' '.join(kept) + (f' {sep}{comment}' if sep else ''))
+            continue
+
+        if command == 'G91':
+            if state.absolute and state.relative_e and None not in state.position.values():
+                state.rewriting_relative = True
+                continue
+            state.absolute = False
+        elif command == 'G90':
+            if state.rewriting_relative:
+                state.rewriting_relative = False
+                continue
+            if state.absolute:
+                continue
+            # some firmwares also switch E to absolute on G90
+            state.absolute = True
+            state.relative_e = None
+        elif command in ('M82', 'M83'):
+            relative_e = command == 'M83'
+            if state.relative_e == relative_e:
+                continue
+            state.relative_e = relative_e
+        elif command in SETTING_COMMANDS and len(words) == 2 and words[1][:1].upper() == 'S':
+            key = SETTING_COMMANDS[command]
+            value = float(words[1][1:])
+            if state.settings.get(key) == value and command not in WAITING_COMMANDS:
+                continue
+            state.settings[key] = value
+        elif command == 'M107':
+            state.settings['M106'] = 0.0
+        elif command.startswith('G'):
+            # G28, G92 etc.: give up on everything we know, also for the
+            # chunks that continue with the same state
+            state.reset()
+        out.append(line)
+    return '\n'.join(out)
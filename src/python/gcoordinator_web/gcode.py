@@ -0,0 +1,318 @@
+"""
+The `GCode` class installed as `gcoordinator.GCode` by the web runner.
+
+It keeps the output of the library class and adds the hooks the web runner
+needs while the G-code is generated, plus the optional output stages chosen
+with `gc.set_output_options()`.
+"""
+
+from gcoordinator.gcode_generator import GCode as BaseGCode
+
+from gcoordinator_web import arcs, compact, layers, merge, order, quality, simplify, stats, validate
+from gcoordinator_web.options import get_output_options
+from gcoordinator_web.progress import progress
+
+WRITE_CHUNK_SIZE = 4 * 1024 * 1024  # characters handed to `GCode.write`'s callback at a time
+
+
+class _Stream:
+    """Where `GCode.write` sends the text, and how far it has got."""
+
+    def __init__(self, write, chunk_size: int, compacting: bool) -> None:
+        self.write = write
+        self.chunk_size = chunk_size
+        self.state = compact.ModalState() if compacting else None
+        self.chars = 0
+        self.lines_in = 0  # lines generated so far
+        self.lines_out = 0  # lines written so far, fewer when compacting
+        self.mapped = 0  # entries of `path_lines` converted to written lines
+
+
+class GCode(BaseGCode):
+    """
+    A `gcoordinator.GCode` that reports progress while generating.
+
+    Attributes:
+        options (dict): The output options, see `gcoordinator_web.options`.
+        report (dict): What the enabled output stages did, by stage name.
+        path_lines (list or None): The 0-based G-code line where the print moves of each path start, once generated.
+
+    Methods:
+        __init__(self, full_object:list, **options) -> None: Initializes a new `GCode` object; options not given default to those set with `gc.set_output_options()`.
+        reduce_for_draft(self) -> None: Subsamples the paths and drops layers in draft quality.
+        optimize_order(self, time_budget:float) -> None: Reorders the paths to reduce travel.
+        merge_paths(self) -> None: Joins consecutive paths that touch and have the same settings.
+        simplify_paths(self, tolerance:float) -> None: Drops points within `tolerance` of the simplified paths.
+        generate(self) -> str: Generates the G-code, compacting it if enabled.
+        write(self, write, chunk_size:int=WRITE_CHUNK_SIZE) -> int: Generates the G-code and hands it to `write` piece by piece.
+        stats(self) -> dict: Returns the estimated print time, filament use and distances.
+        validate(self) -> dict: Returns the points that are out of the machine limits.
+        layers(self) -> list or None: Returns the start line, content hash and bead sizes of each layer.
+        generate_gcode(self) -> None: Generates G-code for the full object and reports one 'generate' progress unit per path.
+        print_path(self, path:Path) -> None: Generates G-code for a path, fitting arcs to Cartesian paths if enabled.
+    """
+
+    _stream = None  # set while `write` runs
+
+    def __init__(self, full_object: list, **options) -> None:
+        """
+        Initializes a new `GCode` object with the given `full_object`.
+
+        Args:
+            full_object (list): A list of `Path` objects representing the paths to be printed.
+            **options: Output options, see `gcoordinator_web.options.set_output_options`.
+
+        Returns:
+            None
+        """
+        super().__init__(full_object)
+        self.options = get_output_options(**options)
+        self.report = {}
+        self.path_lines = None
+        if quality.get_quality()['mode'] == 'draft':
+            self.reduce_for_draft()
+        if self.options['optimize_order']:
+            budget = self.options['optimize_order']
+            self.optimize_order(order.DEFAULT_TIME_BUDGET if budget is True else budget)
+        if self.options['merge_paths']:
+            self.merge_paths()
+        if self.options['simplify_tolerance']:
+            self.simplify_paths(self.options['simplify_tolerance'])
+
+    def reduce_for_draft(self) -> None:
+        """
+        Subsamples the paths and drops layers as the draft quality asks, see
+        `gcoordinator_web.quality`, and records the path and point counts
+        before and after in `report['quality']`.
+
+        Returns:
+            None
+        """
+        paths_before = len(self.full_object)
+        points_before = sum(len(path.x) for path in self.full_object)
+        self.full_object = quality.reduce_paths(self.full_object, self.default_settings['layer_height'])
+        self.report['quality'] = {
+            'paths_before': paths_before,
+            'paths_after': len(self.full_object),
+            'points_before': points_before,
+            'points_after': sum(len(path.x) for path in self.full_object),
+        }
+
+    def optimize_order(self, time_budget: float) -> None:
+        """
+        Reorders the paths within each layer to reduce travel, see
+        `gcoordinator_web.order`, and records the travel distance before and
+        after in `report['order']`.
+
+        Args:
+            time_budget (float): Seconds to spend building and refining the order.
+
+        Returns:
+            None
+        """
+        before = order.travel_distance(self.full_object)
+        self.full_object = order.optimize_order(self.full_object, time_budget)
+        self.report['order'] = {'travel_before': before, 'travel_after': order.travel_distance(self.full_object)}
+
+    def merge_paths(self) -> None:
+        """
+        Joins consecutive paths that touch and have the same settings, see
+        `gcoordinator_web.merge`, and records the path counts in
+        `report['merge']`.
+
+        Returns:
+            None
+        """
+        before = len(self.full_object)
+        self.full_object = merge.merge_touching_paths(self.full_object)
+        self.report['merge'] = {'paths_before': before, 'paths_after': len(self.full_object)}
+
+    def simplify_paths(self, tolerance: float) -> None:
+        """
+        Replaces every path by its simplified copy, see `Path.simplified`, and
+        records the number of dropped points in `report['simplify']`.
+
+        Args:
+            tolerance (float): The distance tolerance in mm.
+
+        Returns:
+            None
+        """
+        before = sum(len(path.x) for path in self.full_object)
+        self.full_object = [simplify.simplified(path, tolerance) for path in self.full_object]
+        after = sum(len(path.x) for path in self.full_object)
+        self.report['simplify'] = {'points_before': before, 'points_after': after, 'dropped': before - after}
+
+    def generate(self) -> str:
+        """
+        Generates and returns the complete G-code as a string. With the
+        `compact` option, redundant words and commands are removed, see
+        `gcoordinator_web.compact`.
+
+        Returns:
+            str: The complete G-code text.
+        """
+        super().generate()
+        if self.options['compact'] and self._stream is None:
+            line_map = []
+            self.gcode = compact.compact_gcode(self.gcode, line_map=line_map)
+            self.path_lines = [line_map[line] for line in self.path_lines]
+        return self.gcode
+
+    def write(self, write, chunk_size: int = WRITE_CHUNK_SIZE) -> int:
+        """
+        Generates the same G-code as `generate()`, but hands it to `write` in
+        pieces of about `chunk_size` characters that end at line ends instead
+        of building one string, so that the whole text never exists in
+        memory. `path_lines` is set as by `generate()`; `gcode` is left empty.
+
+        Args:
+            write (callable): Called with each piece of text, in order.
+            chunk_size (int): The size of the pieces in characters.
+
+        Returns:
+            int: The number of characters written.
+        """
+        self._stream = _Stream(write, chunk_size, self.options['compact'])
+        try:
+            self.generate()
+            self._write_chunk(self.gcode)
+            return self._stream.chars
+        finally:
+            self.gcode = ''
+            self._stream = None
+
+    def _write_chunk(self, text: str) -> None:
+        """
+        Writes text that ends at a line end (or the end of the G-code) to the
+        stream, compacting it if enabled; the compaction state carries over
+        from the previous piece.
+        """
+        stream = self._stream
+        if stream.state is not None:
+            line_map = []
+            text = compact.compact_gcode(text, stream.state, line_map=line_map)
+            # the paths started in this piece; `line_map` also maps the line
+            # after it
+            end = stream.lines_in + len(line_map)
+            while stream.mapped < len(self.path_lines) and self.path_lines[stream.mapped] < end:
+                line = self.path_lines[stream.mapped]
+                self.path_lines[stream.mapped] = stream.lines_out + line_map[line - stream.lines_in]
+                stream.mapped += 1
+            stream.lines_in += len(line_map) - 1
+            stream.lines_out += text.count('\n')
+        if text:
+            stream.write(text)
+            stream.chars += len(text)
+
+    def stats(self) -> dict:
+        """
+        Returns the print statistics of the paths, see `gcoordinator_web.stats`.
+        The G-code does not have to be generated first.
+
+        Returns:
+            dict: Print time, filament length and mass, print and travel
+            distance and the time of each layer.
+        """
+        return stats.compute(self.full_object, self.settings)
+
+    def validate(self) -> dict:
+        """
+        Checks the paths against the bed size and the axis ranges, see
+        `gcoordinator_web.validate`. Once the G-code is generated, each issue
+        also gets the 0-based `line` of the offending point, or of the start
+        of its path where points do not map to single lines (arcs, bed
+        kinematics); it is None before.
+
+        Returns:
+            dict: `count`, the number of out-of-limit values, and `issues`.
+        """
+        result = validate.check(self.full_object, self.settings)
+        for issue in result['issues']:
+            issue['line'] = self._issue_line(issue)
+        return result
+
+    def layers(self):
+        """
+        Returns the start line, content hash and bead sizes of each layer,
+        see `gcoordinator_web.layers`.
+
+        Returns:
+            list or None: One dict per layer with `line`, `hash` and `sizes`; None
+            before the G-code is generated and for parallel generation, which
+            does not record the lines of the paths.
+        """
+        if self.path_lines is None:
+            return None
+        return layers.layer_hashes(self.full_object, self.path_lines, self.options)
+
+    def _issue_line(self, issue: dict):
+        if self.path_lines is None:
+            return None
+        line = self.path_lines[issue['path']]
+        path = self.full_object[issue['path']]
+        exact = path.kinematics in ('Cartesian', 'NozzleTilt') and not (
+            self.options['arc_tolerance'] and path.kinematics == 'Cartesian')
+        if issue['axis'] == 'Z (z-hop)':
+            # the z-hop is in the travel block right after the print moves
+            return line + len(path.x) - 1 if exact else line
+        if exact:
+            # the first point is reached by the travel move before the path
+            return line + max(issue['point'] - 1, 0)
+        return line
+
+    def generate_gcode(self) -> None:
+        """
+        Generates G-code instructions for the full object by iterating over its paths and calling
+        the `apply_path_settings` and `print_path` methods for each path, and records the line
+        each path starts at in `path_lines`.
+
+        Returns:
+            None
+        """
+        total = len(self.full_object)
+        self.path_lines = []
+        self.travel_to_first_point(self.full_object[0])
+        # The library methods append to `self.gcode`, which copies the whole
+        # text every time; each path is written to a fresh string instead and
+        # the pieces are joined once, or written out whenever they add up to a
+        # chunk while `write` runs.
+        chunks = [self.gcode]
+        size = len(self.gcode)
+        lines = self.gcode.count('\n')
+        for i in range(total):
+            curr_path = self.full_object[i]
+            self.gcode = ''
+            self.apply_path_settings(curr_path)
+            self.path_lines.append(lines + self.gcode.count('\n'))
+            self.print_path(curr_path)
+            if i < total - 1:
+                self.travel_from_path_to_path(curr_path, self.full_object[i + 1])
+            lines += self.gcode.count('\n')
+            chunks.append(self.gcode)
+            size += len(self.gcode)
+            if self._stream is not None and size >= self._stream.chunk_size:
+                text = ''.join(chunks)
+                cut = text.rfind('\n') + 1
+                self._write_chunk(text[:cut])
+                chunks = [text[cut:]]
+                size = len(chunks[0])
+            progress('generate', i + 1, total)
+        self.gcode = ''.join(chunks)
+
+    def print_path(self, path) -> None:
+        """
+        Generates G-code instructions for printing a given path. With the
+        `arc_tolerance` option, Cartesian paths are written with G2/G3 arcs.
+
+        Args:
+            path (Path): The path to print.
+
+        Returns:
+            None
+        """
+        tolerance = self.options['arc_tolerance']
+        if tolerance and path.kinematics == 'Cartesian':
+            self.gcode += arcs.generate_gcode_of_path(path, tolerance)
+        else:
+            super().print_path(path)
@@ -0,0 +1,112 @@
+"""
+Implicit solids sliced into layers.
+
+Many designs are a solid described by a scalar field, e.g. a sphere as
+`x**2 + y**2 + z**2 - r**2`, traced layer by layer in a Python loop.
+`implicit_layers()` slices such a field in one pipeline: it evaluates the
+field with NumPy broadcasting on a 3D grid, a chunk of layers at a time so
+that memory stays bounded however large the part is, and contours every
+layer with `gcoordinator.utils.contour.find_contours`. The contour calls are
+cached (see `gcoordinator_web.memo`), so after an edit only the layers whose
+field values changed are traced again.
+
+Functions:
+- implicit_layers: Returns the perimeters of an implicit solid, layer by layer.
+"""
+
+import numpy as np
+
+from gcoordinator.path_generator import Path
+from gcoordinator.utils import contour
+
+from gcoordinator_web import quality
+from gcoordinator_web.progress import progress
+
+CHUNK_BYTES = 32 * 1024 * 1024  # field values evaluated at once
+MIN_CONTOUR_POINTS = 3
+
+
+def _axis(low: float, high: float, resolution: float) -> np.ndarray:
+    """Grid coordinates from `low` to `high`, at most `resolution` apart."""
+    count = max(int(np.ceil((high - low) / resolution - 1e-9)), 1) + 1
+    return np.linspace(low, high, count)
+
+
+def _evaluate(f, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Evaluates `f` on the grid, returning an array indexed [z, y, x]."""
+    values = f(x[np.newaxis, np.newaxis, :], y[np.newaxis, :, np.newaxis], z[:, np.newaxis, np.newaxis])
+    # a field that ignores an axis comes back with fewer dimensions
+    return np.broadcast_to(np.asarray(values, dtype=float), (len(z), len(y), len(x)))
+
+
+def _order(contours: list, start: np.ndarray) -> list:
+    """Orders contours so that each starts nearest to where the one before ends."""
+    remaining = list(contours)
+    ordered = []
+    while remaining:
+        starts = np.array([item[0] for item in remaining])
+        nearest = int(np.argmin(np.sum((starts - start) ** 2, axis=1)))
+        ordered.append(remaining.pop(nearest))
+        start = ordered[-1][-1]
+    return ordered
+
+
+def implicit_layers(f, bounds, layer_height: float, resolution: float, level: float = 0.0) -> list:
+    """
+    Slices the solid where `f(x, y, z) < level` into perimeter paths.
+
+    The field is sampled on a grid `resolution` apart at the height of each
+    layer, `z_min + layer_height`, `z_min + 2 * layer_height`, ... up to
+    `z_max`. The solid is clipped to the bounds, so every perimeter is closed.
+
+    Args:
+        f (callable): The field. Called with arrays shaped to broadcast
+            against each other (x varies along the last axis, y along the
+            second, z along the first) and must return the values, e.g.
+            `lambda x, y, z: np.hypot(x, y) - 20 - np.sin(z)`.
+        bounds (tuple): `((x_min, x_max), (y_min, y_max), (z_min, z_max))`.
+        layer_height (float): The distance between layers in mm.
+        resolution (float): The grid spacing in X and Y in mm.
+        level (float): The field value at the surface.
+
+    Returns:
+        list: The perimeter `Path` objects, layer by layer from the bottom;
+        within a layer each starts near the end of the one before.
+
+    Raises:
+        ValueError: If the bounds are empty or a spacing is not positive.
+    """
+    (x_min, x_max), (y_min, y_max), (z_min, z_max) = bounds
+    if layer_height <= 0 or resolution <= 0:
+        raise ValueError('layer_height and resolution must be positive')
+    if x_max <= x_min or y_max <= y_min or z_max <= z_min:
+        raise ValueError('bounds must be ((x_min, x_max), (y_min, y_max), (z_min, z_max)) with min < max')
+
+    x = _axis(x_min, x_max, resolution)
+    y = _axis(y_min, y_max, resolution)
+    layer_count = int(np.floor((z_max - z_min) / layer_height + 1e-9))
+    heights = z_min + layer_height * np.arange(1, layer_count + 1)
+    # draft quality drops layers, see `quality.skips_layer`
+    heights = np.array([z for z in heights if not quality.skips_layer([z], layer_height)])
+    chunk_layers = max(CHUNK_BYTES // (8 * len(x) * len(y)), 1)
+
+    paths = []
+    start = np.array([x_min, y_min])
+    for chunk_start in range(0, len(heights), chunk_layers):
+        chunk = heights[chunk_start:chunk_start + chunk_layers]
+        values = _evaluate(f, x, y, chunk)
+        for k, z in enumerate(chunk):
+            grid = values[k].copy()
+            # above the level on the bounds closes the cut perimeters
+            for edge in (grid[0], grid[-1], grid[:, 0], grid[:, -1]):
+                np.maximum(edge, level, out=edge)
+            contours = [
+                item for item in contour.find_contours(x, y, grid, level=level)
+                if len(item) >= MIN_CONTOUR_POINTS
+            ]
+            for item in _order(contours, start):
+                paths.append(Path(item[:, 0], item[:, 1], np.full(len(item), z)))
+                start = item[-1]
+            progress('implicit', chunk_start + k + 1, len(heights))
+        del values
+    return paths
@@ -0,0 +1,113 @@
+"""
+Vectorized NozzleTilt kinematics.
+
+The library computes the nozzle normals and writes the G-code of a NozzleTilt
+path one point at a time in Python, which makes a five-axis print several
+times slower to generate than the same Cartesian one. The replacements here
+work on whole arrays instead:
+
+- `update_attrs()` converts the (rot, tilt) angles to unit normals with one
+  NumPy expression and stores them as an (n, 3) array rather than a list of
+  tuples.
+- `calculate_extrusion()` takes the segment lengths of the whole path at once.
+- `generate_gcode_of_path()` formats all moves of a path with a single `%`
+  operation over a repeated line template. The text is the same as the
+  library's, apart from an extrusion value that may rarely differ in its last
+  digit, as the segment lengths are summed in a different order.
+
+Functions:
+- update_attrs: Sets the coordinates, normals, center and end points of a path.
+- calculate_extrusion: Returns the extrusion of every segment of a path.
+- format_moves: Formats one G1 move per point from columns of values.
+- generate_gcode_of_path: Generates G-code for a NozzleTilt path.
+"""
+
+import numpy as np
+
+from gcoordinator.kinematics.kin_nozzle_tilt import NozzleTilt
+
+
+def update_attrs(path) -> None:
+    """
+    Sets `coords`, `norms`, `center`, `start_coord` and `end_coord` of a
+    NozzleTilt path, as `NozzleTilt.update_attrs` does.
+
+    Args:
+        path (Path): The path to update.
+    """
+    path.coords = np.column_stack([path.x, path.y, path.z])
+    rot = np.pi / 2.0 - np.asarray(path.rot, dtype=float)
+    tilt = np.asarray(path.tilt, dtype=float)
+    sin_tilt = np.sin(tilt)
+    path.norms = np.column_stack([np.sin(rot) * sin_tilt, np.cos(rot) * sin_tilt, np.cos(tilt)])
+    path.center = np.array([np.mean(path.x), np.mean(path.y), np.mean(path.z)])
+    path.start_coord = path.coords[0]
+    path.end_coord = path.coords[-1]
+
+
+def calculate_extrusion(path) -> np.ndarray:
+    """
+    Returns the extrusion of every segment of a path (see
+    `Kinematics.calculate_extrusion` for the formula).
+
+    Args:
+        path (Path): The path whose defaults have been applied.
+
+    Returns:
+        numpy.ndarray: One extrusion value per segment.
+    """
+    distances = np.linalg.norm(np.diff(np.asarray(path.coords, dtype=float), axis=0), axis=1)
+    numerator = 4 * path.nozzle_diameter * path.layer_height * distances
+    denominator = np.pi * path.filament_diameter**2
+    return numerator / denominator * path.extrusion_multiplier
+
+
+def format_moves(print_speed, columns: list) -> str:
+    """
+    Formats one `G1` line per row of values.
+
+    Args:
+        print_speed: The feed rate written after `F` on every line.
+        columns (list): `(word, values)` pairs in the order of the line, e.g.
+            `[('X', x), ('Y', y), ..., ('E', extrusion)]`; all `values` have
+            the same length and are written with five decimals.
+
+    Returns:
+        str: The lines, each ending with a newline.
+    """
+    count = len(columns[0][1])
+    if count == 0:
+        return ''
+    # the words and the speed are literal text in the % template
+    words = ' '.join(word.replace('%', '%%') + '%.5f' for word, _ in columns)
+    line = f'G1 F{print_speed}'.replace('%', '%%') + f' {words}\n'
+    values = np.column_stack([np.asarray(values, dtype=float) for _, values in columns])
+    return (line * count) % tuple(values.ravel().tolist())
+
+
+def generate_gcode_of_path(path) -> str:
+    """
+    Generates G-code for a NozzleTilt path, like
+    `NozzleTilt.generate_gcode_of_path`. `NozzleTilt.load_settings()` must
+    have been called.
+
+    Args:
+        path (Path): The path whose defaults have been applied.
+
+    Returns:
+        str: The G-code for the path.
+    """
+    extrusion = calculate_extrusion(path)
+    x = np.asarray(path.x, dtype=float)[1:]
+    y = np.asarray(path.y, dtype=float)[1:]
+    z = np.asarray(path.z, dtype=float)[1:]
+    tilt = np.asarray(path.tilt, dtype=float)[1:]
+    rot = np.asarray(path.rot, dtype=float)[1:]
+    return format_moves(path.print_speed, [
+        ('X', x + path.x_origin),
+        ('Y', y + path.y_origin),
+        ('Z', z),
+        (NozzleTilt.tilt_code, tilt + NozzleTilt.tilt_offset),
+        (NozzleTilt.rot_code, rot + NozzleTilt.rot_offset),
+        ('E', extrusion),
+    ])
@@ -0,0 +1,81 @@
+"""
+Per-layer content hashes of the paths of a `GCode`.
+
+The web viewer keeps the geometry it built for each layer between runs. A
+layer here is a run of consecutive paths whose first points lie on the same
+layer (`floor(z / layer_height)` with each path's own layer height, as in
+`gcoordinator_web.stats`). Its hash covers what decides the moves written for
+it: the coordinates, kinematics and settings of its paths, the output options
+and the global settings. A layer whose hash is unchanged since the previous
+run is drawn from the geometry the viewer already has; only the layers whose
+hash changed are rebuilt.
+
+Each layer also lists the bead sizes of its paths, so the viewer can draw
+the extrusions at their width and height: the library extrudes a cross
+section of `nozzle_diameter * layer_height * extrusion_multiplier`, drawn as
+a bead `nozzle_diameter * extrusion_multiplier` wide and `layer_height` high.
+
+Functions:
+- layer_hashes: Returns the start line, content hash and bead sizes of each layer.
+"""
+
+import hashlib
+
+import numpy as np
+
+from gcoordinator_web.memo import content_key
+from gcoordinator_web.merge import SETTING_ATTRS
+
+HASH_SIZE = 8  # bytes
+SETTINGS = SETTING_ATTRS + ('travel_speed',)  # every per-path setting
+
+
+def _first_z(path) -> float:
+    return float(path.z[0]) if len(path.z) else 0.0
+
+
+def _per_path(paths, name) -> np.ndarray:
+    return np.array([getattr(path, name) for path in paths], dtype=float)
+
+
+def layer_hashes(paths: list, path_lines: list, options: dict) -> list:
+    """
+    Returns the start line, content hash and bead sizes of each layer of
+    `paths`.
+
+    Args:
+        paths (list): The paths in print order.
+        path_lines (list): The 0-based line where the print moves of each path
+            start, see `GCode.path_lines`.
+        options (dict): The output options of the run.
+
+    Returns:
+        list: One dict per layer in print order, with `line`, the start line
+        of its first path, `hash`, a hex string, and `sizes`, a list of
+        `[line, width, height]` for its first path and every path whose bead
+        size differs from the one before.
+    """
+    if not paths:
+        return []
+    first_z = np.fromiter(map(_first_z, paths), dtype=float, count=len(paths))
+    layer_index = np.floor(first_z / _per_path(paths, 'layer_height') + 1e-6).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(layer_index)) + 1, [len(paths)]))
+    # the settings and options of the run, shared by every layer
+    run_key = content_key('layers', options)
+    settings = [[getattr(path, name) for name in SETTINGS] for path in paths]
+    width = _per_path(paths, 'nozzle_diameter') * _per_path(paths, 'extrusion_multiplier')
+    height = _per_path(paths, 'layer_height')
+    size_changed = (width[1:] != width[:-1]) | (height[1:] != height[:-1])  # from the path before
+
+    layers = []
+    for start, end in zip(starts[:-1], starts[1:]):
+        h = hashlib.blake2b(run_key, digest_size=HASH_SIZE)
+        h.update(repr(settings[start:end]).encode())
+        for path in paths[start:end]:
+            h.update(f'P{path.kinematics}{len(path.x)}'.encode())
+            for name in ('x', 'y', 'z', 'rot', 'tilt'):
+                h.update(np.ascontiguousarray(getattr(path, name), dtype=float))
+        changes = start + 1 + np.flatnonzero(size_changed[start:end - 1])
+        sizes = [[path_lines[i], float(width[i]), float(height[i])] for i in (start, *changes)]
+        layers.append({'line': path_lines[start], 'hash': h.hexdigest(), 'sizes': sizes})
+    return layers
@@ -0,0 +1,332 @@
+"""
+Content-addressed memoization for the pure gcoordinator functions.
+
+The Pyodide worker keeps one interpreter alive between runs, so a cache held
+at module level survives every re-execution of the user script. Calls are
+keyed on a digest of their array contents and arguments (plus the active
+settings), which means an edit that only touches `print_speed` replays the
+infill, offset and contour results of the previous run instead of
+recomputing them.
+
+Functions:
+- memoize: Decorator that caches a function on the content of its arguments.
+- memoize_update_attrs: Wraps a kinematics `update_attrs` staticmethod.
+- cache_info: Returns hit/miss counters and memory usage of the cache.
+- clear_cache: Drops every cached entry.
+- set_cache_limit: Changes the memory bound of the cache in bytes.
+"""
+
+import functools
+import hashlib
+import inspect
+from collections import OrderedDict
+
+import numpy as np
+from gcoordinator.path_generator import Path, PathList
+from gcoordinator.settings import get_settings
+
+DEFAULT_CACHE_LIMIT = 256 * 1024 * 1024  # bytes
+_OBJECT_OVERHEAD = 64  # rough per-object cost used by the size estimate
+_MISSING = object()
+
+
+class _Unhashable(Exception):
+    """Raised when an argument cannot be reduced to a content digest."""
+
+
+class LRUCache:
+    """
+    A least-recently-used cache bounded by the estimated size of its values.
+
+    Attributes:
+        max_bytes (int): The memory bound of the cache in bytes.
+        total_bytes (int): The estimated size of all stored values in bytes.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the value stored for `key` and marks it as recently used.
+
+        Returns:
+            The stored value, or `_MISSING` when the key is not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, nbytes: int) -> None:
+        """
+        Stores `value` under `key` and evicts old entries until the cache fits.
+        Values larger than the whole cache are not stored.
+        """
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, nbytes)
+        self.total_bytes += nbytes
+        self._evict()
+
+    def resize(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.total_bytes -= nbytes
+
+
+_cache = LRUCache(DEFAULT_CACHE_LIMIT)
+_counters = {}  # function name -> {'hits': int, 'misses': int, 'bypass': int}
+
+
+def _digest_into(h, obj) -> None:
+    """
+    Feeds a canonical byte representation of `obj` into the hash `h`.
+
+    Raises:
+        _Unhashable: If `obj` (or something inside it) has no stable content.
+    """
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            h.update(b'O' + repr(obj.tolist()).encode())
+            return
+        h.update(f'A{obj.dtype.str}{obj.shape}'.encode())
+        h.update(np.ascontiguousarray(obj).view(np.uint8).reshape(-1))
+    elif isinstance(obj, Path):
+        h.update(f'P{obj.kinematics}'.encode())
+        for name in ('x', 'y', 'z', 'rot', 'tilt'):
+            _digest_into(h, np.asarray(getattr(obj, name)))
+    elif isinstance(obj, PathList):
+        h.update(f'L{len(obj.paths)}'.encode())
+        for path in obj.paths:
+            _digest_into(h, path)
+    elif isinstance(obj, (list, tuple)):
+        h.update(f'{type(obj).__name__}{len(obj)}'.encode())
+        for item in obj:
+            _digest_into(h, item)
+    elif isinstance(obj, dict):
+        h.update(f'D{len(obj)}'.encode())
+        for key in sorted(obj, key=repr):
+            _digest_into(h, key)
+            _digest_into(h, obj[key])
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(f'{type(obj).__name__}:{obj!r};'.encode())
+    else:
+        raise _Unhashable(type(obj).__name__)
+
+
+def content_key(name: str, *parts) -> bytes:
+    """
+    Computes the cache key of a call from its function name and arguments.
+    The active settings are always part of the key because every `Path`
+    created inside a cached function reads them.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(name.encode())
+    h.update(repr(get_settings()).encode())
+    for part in parts:
+        _digest_into(h, part)
+    return h.digest()
+
+
+def estimate_size(obj, _seen=None) -> int:
+    """
+    Estimates the memory held by `obj` in bytes, counting NumPy buffers exactly
+    and everything else with a flat per-object cost.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes + _OBJECT_OVERHEAD
+    if isinstance(obj, (Path, PathList)):
+        return _OBJECT_OVERHEAD + sum(
+            estimate_size(value, _seen) for key, value in vars(obj).items() if key != 'settings'
+        )
+    if isinstance(obj, (list, tuple)):
+        return _OBJECT_OVERHEAD + 8 * len(obj) + sum(estimate_size(item, _seen) for item in obj)
+    if isinstance(obj, dict):
+        return _OBJECT_OVERHEAD + sum(estimate_size(value, _seen) for value in obj.values())
+    return _OBJECT_OVERHEAD
+
+
+def clone(obj):
+    """
+    Returns a copy of a cached value that the caller is free to mutate.
+
+    Arrays are copied, lists are copied one level deep (their items are
+    immutable tuples and numbers), and cloned paths are re-attached to the
+    settings that are active now rather than the ones of the original run.
+    """
+    if isinstance(obj, np.ndarray):
+        return obj.copy()
+    if isinstance(obj, Path):
+        duplicate = Path.__new__(Path)
+        for key, value in vars(obj).items():
+            duplicate.__dict__[key] = clone(value)
+        duplicate.__dict__['settings'] = get_settings()
+        return duplicate
+    if isinstance(obj, PathList):
+        duplicate = PathList.__new__(PathList)
+        duplicate.__dict__.update(vars(obj))
+        duplicate.__dict__['paths'] = [clone(path) for path in obj.paths]
+        duplicate.__dict__['index'] = 0
+        return duplicate
+    if isinstance(obj, list):
+        return [clone(item) for item in obj]
+    if isinstance(obj, tuple):
+        return tuple(clone(item) for item in obj)
+    if isinstance(obj, dict):
+        return {key: clone(value) for key, value in obj.items()}
+    return obj
+
+
+def _count(name: str, field: str) -> None:
+    counters = _counters.setdefault(name, {'hits': 0, 'misses': 0, 'bypass': 0})
+    counters[field] += 1
+
+
+def memoize(name: str):
+    """
+    Decorator that caches a pure function on the content of its arguments.
+
+    The first result is handed to the caller unchanged while a private copy is
+    stored, and every hit returns a fresh copy, so user code may keep mutating
+    the paths it receives without corrupting the cache. Calls with arguments
+    that cannot be digested are passed through uncached.
+
+    Args:
+        name (str): The name used in the cache key and in `cache_info()`.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = content_key(name, bound.arguments)
+            except (TypeError, _Unhashable):
+                _count(name, 'bypass')
+                return func(*args, **kwargs)
+
+            cached = _cache.get(key)
+            if cached is not _MISSING:
+                _count(name, 'hits')
+                return clone(cached)
+
+            _count(name, 'misses')
+            result = func(*args, **kwargs)
+            stored = clone(result)
+            _cache.put(key, stored, estimate_size(stored))
+            return result
+
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def memoize_update_attrs(name: str, update_attrs):
+    """
+    Wraps a kinematics `update_attrs(path)` so its effect on the path is cached.
+
+    `update_attrs` mutates the path in place, so the cached value is the set of
+    attributes it added or replaced; a hit re-applies copies of them.
+
+    Args:
+        name (str): The name used in the cache key and in `cache_info()`.
+        update_attrs (callable): The original staticmethod function.
+
+    Returns:
+        callable: The memoized function.
+    """
+    @functools.wraps(update_attrs)
+    def wrapper(path) -> None:
+        try:
+            key = content_key(name, path)
+        except _Unhashable:
+            _count(name, 'bypass')
+            return update_attrs(path)
+
+        cached = _cache.get(key)
+        if cached is not _MISSING:
+            _count(name, 'hits')
+            path.__dict__.update(clone(cached))
+            return None
+
+        _count(name, 'misses')
+        before = dict(vars(path))
+        update_attrs(path)
+        changed = {
+            key_: value for key_, value in vars(path).items()
+            if before.get(key_, _MISSING) is not value
+        }
+        stored = clone(changed)
+        _cache.put(key, stored, estimate_size(stored))
+        return None
+
+    wrapper.__wrapped__ = update_attrs
+    return wrapper
+
+
+def cache_info() -> dict:
+    """
+    Returns the counters of the current run and the state of the cache.
+
+    Returns:
+        dict: `hits`, `misses`, `hit_rate`, `entries`, `bytes`, `max_bytes` and
+        a per-function breakdown under `functions`.
+    """
+    hits = sum(c['hits'] for c in _counters.values())
+    misses = sum(c['misses'] for c in _counters.values())
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else None,
+        'entries': len(_cache),
+        'bytes': _cache.total_bytes,
+        'max_bytes': _cache.max_bytes,
+        'functions': {name: dict(c) for name, c in _counters.items()},
+    }
+
+
+def reset_counters() -> None:
+    """Resets the hit/miss counters; called by the worker at the start of a run."""
+    _counters.clear()
+
+
+def clear_cache() -> None:
+    """Drops every cached entry."""
+    _cache.clear()
+
+
+def set_cache_limit(max_bytes: int) -> None:
+    """
+    Changes the memory bound of the cache.
+
+    Args:
+        max_bytes (int): The new bound in bytes. 0 disables caching.
+    """
+    if max_bytes < 0:
+        raise ValueError("max_bytes must not be negative")
+    _cache.resize(int(max_bytes))
@@ -0,0 +1,161 @@
+"""
+Memory accounting and a soft memory limit for a run.
+
+Pyodide runs in a WASM heap that can grow to a fixed maximum; a script that
+needs more fails with a bare `MemoryError` or takes the browser tab down.
+This module lets a run stop earlier with a clear message:
+
+- `check()` raises `MemoryLimitError` once the WASM heap has grown past the
+  soft limit during the run (the heap never shrinks, so a heap that was
+  already larger at the start only counts if it grows further), or, while
+  tracing, once the traced memory exceeds it. It is called with every
+  progress event, i.e. once per path while generating and once per infill.
+- `reserve()` is called before known large temporaries, such as the N x M
+  arrays of `points_in_polygon`, and raises before allocating them.
+
+With `trace=True`, `tracemalloc` records the peak of the run (NumPy arrays
+included) and `report()` lists the largest live NumPy arrays. Tracing slows
+Python code down several times, so it is off by default.
+
+Classes:
+- MemoryLimitError: Raised when a run exceeds the soft memory limit.
+
+Functions:
+- begin: Sets the limit and tracing for a run.
+- check: Raises if the run exceeded the limit.
+- reserve: Raises if an allocation of a given size would exceed the limit.
+- report: Returns the memory use of the run.
+- end: Stops tracing.
+"""
+
+import gc as garbage_collector
+import tracemalloc
+
+import numpy as np
+
+MB = 1024 * 1024
+TOP_ARRAYS = 10
+
+
+class MemoryLimitError(MemoryError):
+    """Raised when a run exceeds the soft memory limit."""
+
+
+_limit = None
+_start_heap = None
+_tracing = False
+
+
+def _heap_size():
+    """Returns the size of the WASM heap in bytes, or None outside Pyodide."""
+    try:
+        import pyodide_js
+    except ImportError:
+        return None
+    return int(pyodide_js._module.HEAPU8.length)
+
+
+def _fail(what: str, used: int) -> None:
+    raise MemoryLimitError(
+        f'{what} needs about {used / MB:.0f} MB, more than the memory limit of '
+        f'{_limit / MB:.0f} MB. Reduce the resolution or the number of layers '
+        f'and points, or raise the limit.'
+    )
+
+
+def begin(limit: int = None, trace: bool = False) -> None:
+    """
+    Sets the soft limit and tracing for a run.
+
+    Args:
+        limit (int, optional): The soft limit in bytes; None disables it.
+        trace (bool): Whether to trace allocations with `tracemalloc`.
+    """
+    global _limit, _start_heap, _tracing
+    end()
+    _limit = limit
+    _start_heap = _heap_size()
+    if trace:
+        tracemalloc.start()
+        _tracing = True
+
+
+def end() -> None:
+    """Stops tracing if `begin()` started it."""
+    global _tracing
+    if _tracing:
+        tracemalloc.stop()
+        _tracing = False
+
+
+def check(what: str = 'The script') -> None:
+    """
+    Raises `MemoryLimitError` if the run exceeded the soft limit.
+
+    Args:
+        what (str): What is reported as needing the memory.
+    """
+    if _limit is None:
+        return
+    heap = _heap_size()
+    if heap is not None and heap > _limit and heap > _start_heap:
+        _fail(what, heap)
+    if _tracing:
+        current = tracemalloc.get_traced_memory()[0]
+        if current > _limit:
+            _fail(what, current)
+
+
+def reserve(nbytes: int, what: str) -> None:
+    """
+    Raises `MemoryLimitError` if allocating about `nbytes` more would exceed
+    the soft limit. Without tracing only the size itself is compared, as the
+    free part of the heap is unknown.
+
+    Args:
+        nbytes (int): The size of the planned allocations in bytes.
+        what (str): What needs the memory, for the message.
+    """
+    if _limit is None:
+        return
+    used = tracemalloc.get_traced_memory()[0] if _tracing else 0
+    if used + nbytes > _limit:
+        _fail(what, used + nbytes)
+
+
+def _largest_arrays(top: int) -> list:
+    """Returns the `top` largest NumPy arrays that own their data."""
+    seen = set()
+    arrays = []
+    for obj in garbage_collector.get_objects():
+        for referent in garbage_collector.get_referents(obj):
+            if type(referent) is np.ndarray and referent.base is None and id(referent) not in seen:
+                seen.add(id(referent))
+                arrays.append(referent)
+    arrays.sort(key=lambda array: array.nbytes, reverse=True)
+    return [
+        {'shape': list(array.shape), 'dtype': str(array.dtype), 'bytes': int(array.nbytes)}
+        for array in arrays[:top]
+    ]
+
+
+def report(top: int = TOP_ARRAYS) -> dict:
+    """
+    Returns the memory use of the run.
+
+    Args:
+        top (int): How many of the largest NumPy arrays to list when tracing.
+
+    Returns:
+        dict: `heap` (bytes of WASM heap, None outside Pyodide), `limit`
+        (bytes or None), `traced` (whether the next entries are set) and,
+        when tracing, `peak` and `current` (bytes traced by `tracemalloc`)
+        and `arrays`, the largest live arrays referenced from Python objects
+        as `{'shape', 'dtype', 'bytes'}`; otherwise those are None.
+    """
+    result = {'heap': _heap_size(), 'limit': _limit, 'traced': _tracing,
+              'peak': None, 'current': None, 'arrays': None}
+    if _tracing:
+        result['current'], result['peak'] = tracemalloc.get_traced_memory()
+        result['arrays'] = _largest_arrays(top)
+    return result
@@ -0,0 +1,97 @@
+"""
+Merging of consecutive paths that touch.
+
+`GCode` writes a travel block (with retraction and z-hop when enabled)
+between every pair of consecutive paths, even when the next path starts
+exactly where the previous one ended, as in spiral vases and walls built
+layer by layer. `merge_touching_paths()` joins such paths into one continuous
+extrusion when nothing else about them differs.
+
+Functions:
+- can_merge: Whether two consecutive paths can be printed as one.
+- merge_touching_paths: Joins consecutive touching paths.
+"""
+
+import copy
+
+import numpy as np
+
+from gcoordinator_web.simplify import POINT_ATTRS, update_derived
+
+MERGE_DISTANCE = 1e-6  # mm (and rad for rot/tilt) between end and start point
+
+# Path attributes that must be equal for two paths to be printed as one. The
+# travel speed is missing on purpose: only the first path is travelled to.
+SETTING_ATTRS = (
+    'kinematics', 'nozzle_diameter', 'filament_diameter', 'layer_height',
+    'print_speed', 'x_origin', 'y_origin', 'fan_speed',
+    'nozzle_temperature', 'bed_temperature', 'retraction', 'retraction_distance',
+    'unretraction_distance', 'z_hop', 'z_hop_distance', 'extrusion_multiplier',
+)
+
+
+def _end(path, name):
+    return np.asarray(getattr(path, name))[-1]
+
+
+def _start(path, name):
+    return np.asarray(getattr(path, name))[0]
+
+
+def can_merge(curr_path, next_path) -> bool:
+    """
+    Whether `next_path` starts where `curr_path` ends (including rot and
+    tilt) and has the same settings, so that both can be printed as one path.
+
+    Args:
+        curr_path (Path): A path whose defaults have been applied.
+        next_path (Path): The path printed after it.
+
+    Returns:
+        bool: True if the paths can be merged.
+    """
+    for name in SETTING_ATTRS:
+        if getattr(curr_path, name) != getattr(next_path, name):
+            return False
+    for name in ('before_gcode', 'after_gcode'):
+        if getattr(curr_path, name, None) or getattr(next_path, name, None):
+            return False
+    return all(
+        abs(_end(curr_path, name) - _start(next_path, name)) <= MERGE_DISTANCE
+        for name in ('x', 'y', 'z', 'rot', 'tilt')
+    )
+
+
+def _join(paths: list):
+    """Returns one path with the points of `paths`, dropping the shared points."""
+    if len(paths) == 1:
+        return paths[0]
+    merged = copy.copy(paths[0])
+    for name in POINT_ATTRS:
+        parts = [np.asarray(getattr(path, name)) for path in paths]
+        setattr(merged, name, np.concatenate([parts[0]] + [part[1:] for part in parts[1:]]))
+    update_derived(merged)
+    return merged
+
+
+def merge_touching_paths(paths: list) -> list:
+    """
+    Joins runs of consecutive paths for which `can_merge` holds.
+
+    Args:
+        paths (list): Flattened `Path` objects whose defaults have been applied.
+
+    Returns:
+        list: The paths after merging. Paths that were not merged are the
+        same objects; merged ones are new, and the inputs are not modified.
+    """
+    result = []
+    run = []
+    for path in paths:
+        if run and not can_merge(run[-1], path):
+            result.append(_join(run))
+            run = []
+        run.append(path)
+    if run:
+        result.append(_join(run))
+    return result
@@ -0,0 +1,79 @@
+"""
+Output options for the G-code generated by the web runner.
+
+Scripts in the web editor never construct `GCode` themselves; the worker does
+after the script has run. `set_output_options()` lets a script choose the
+options the worker passes on. The options are reset before every run, so
+removing the call from a script restores the defaults.
+
+Functions:
+- set_output_options: Sets output options for the current run.
+- get_output_options: Returns the output options of the current run.
+- reset: Restores the default options.
+"""
+
+DEFAULT_OPTIONS = {
+    'arc_tolerance': None,  # mm, None disables arc fitting
+    'simplify_tolerance': None,  # mm, None disables path simplification
+    'compact': False,  # drop G-code words and commands that change nothing
+    'merge_paths': False,  # join consecutive paths that touch
+    'optimize_order': False,  # reorder paths to reduce travel; True or seconds
+}
+
+_options = dict(DEFAULT_OPTIONS)
+
+
+def set_output_options(**options) -> None:
+    """
+    Sets output options for the G-code of the current run.
+
+    Args:
+        arc_tolerance (float or None): Fit G2/G3 arcs to runs of points that
+            lie on a circle within this distance in mm. None disables it.
+        simplify_tolerance (float or None): Drop points that lie within this
+            distance in mm of the simplified path (and within 0.5 degrees
+            for rot/tilt). None disables it.
+        compact (bool): Drop words and commands that do not change the
+            modal state of the printer (feed rate, unchanged axes, G91/G90
+            around travels, repeated fan and temperature commands).
+        merge_paths (bool): Join consecutive paths where the next one starts
+            at the end of the previous one and has the same settings, so no
+            travel (or retraction) is written between them.
+        optimize_order (bool or float): Reorder (and reverse) the paths of
+            each layer to reduce travel, spending at most this many seconds
+            building and refining the order (True: 2 seconds).
+
+    Raises:
+        TypeError: If an option is unknown.
+    """
+    _check(options)
+    _options.update(options)
+
+
+def get_output_options(**overrides) -> dict:
+    """
+    Returns the output options of the current run.
+
+    Args:
+        **overrides: Options that take precedence over the current ones.
+
+    Returns:
+        dict: A copy of the options with the overrides applied.
+
+    Raises:
+        TypeError: If an override is unknown.
+    """
+    _check(overrides)
+    return {**_options, **overrides}
+
+
+def _check(options: dict) -> None:
+    unknown = sorted(set(options) - set(DEFAULT_OPTIONS))
+    if unknown:
+        raise TypeError(f"Unknown output option(s): {', '.join(unknown)}")
+
+
+def reset() -> None:
+    """Restores the default options."""
+    _options.clear()
+    _options.update(DEFAULT_OPTIONS)
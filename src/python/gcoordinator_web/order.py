@@ -0,0 +1,335 @@
+"""
+Travel-minimizing path order.
+
+`PathList.sort_paths` orders paths greedily and never reverses one, so
+infill segments are often printed end to start with a long travel before
+each. `optimize_order()` reorders the flattened paths of a program to shorten
+the travel between them: a greedy nearest-neighbour tour (which may print a
+path backwards) is refined with 2-opt and Or-opt moves until no move helps
+or the time budget runs out. The budget covers building the tour too: its
+nearest endpoints are looked up in a uniform grid, and paths the tour has not
+reached when the budget runs out follow in their input order.
+
+Paths are only reordered within runs of consecutive paths on the same layer
+with the same settings, so layers stay in order and walls printed before
+infill with other settings stay before it. Only planar paths are reversed;
+a spiral printed backwards would run downwards.
+
+Functions:
+- travel_distance: Returns the total travel distance between paths.
+- optimize_order: Reorders paths to reduce the travel between them.
+"""
+
+import copy
+import time
+
+import numpy as np
+
+from gcoordinator_web.merge import SETTING_ATTRS
+from gcoordinator_web.simplify import PER_POINT_KINEMATICS, POINT_ATTRS, update_derived
+
+DEFAULT_TIME_BUDGET = 2.0  # seconds
+IMPROVEMENT_EPSILON = 1e-9  # mm
+GRID_POINTS_PER_CELL = 2  # endpoints per cell of the nearest-neighbour grid
+
+
+def _start(path) -> np.ndarray:
+    return np.asarray(path.coords[0], dtype=float)
+
+
+def _end(path) -> np.ndarray:
+    return np.asarray(path.coords[-1], dtype=float)
+
+
+def travel_distance(paths: list) -> float:
+    """
+    Returns the total length of the straight travel moves between paths.
+
+    Args:
+        paths (list): Flattened `Path` objects in print order.
+
+    Returns:
+        float: The travel distance in mm.
+    """
+    if len(paths) < 2:
+        return 0.0
+    ends = np.array([_end(path) for path in paths[:-1]])
+    starts = np.array([_start(path) for path in paths[1:]])
+    return float(np.linalg.norm(starts - ends, axis=1).sum())
+
+
+def _group_key(path):
+    return (round(float(np.min(path.z)), 6),) + tuple(getattr(path, name) for name in SETTING_ATTRS)
+
+
+def _is_reversible(path) -> bool:
+    return float(np.ptp(path.z)) == 0.0 and not getattr(path, 'before_gcode', None) and not getattr(path, 'after_gcode', None)
+
+
+def _reversed(path):
+    """Returns a copy of `path` printed from its last point to its first."""
+    result = copy.copy(path)
+    for name in POINT_ATTRS:
+        setattr(result, name, np.asarray(getattr(path, name))[::-1].copy())
+    if path.kinematics in PER_POINT_KINEMATICS:
+        # the derived attributes are reversed like the points
+        result.coords = np.asarray(path.coords)[::-1].copy()
+        result.norms = path.norms[::-1]
+        result.start_coord, result.end_coord = result.coords[0], result.coords[-1]
+    else:
+        update_derived(result)
+    return result
+
+
+def _ring(cx: int, cy: int, r: int):
+    """Yields the grid cells at Chebyshev distance `r` from cell `(cx, cy)`."""
+    if r == 0:
+        yield cx, cy
+        return
+    for dx in range(-r, r + 1):
+        yield cx + dx, cy - r
+        yield cx + dx, cy + r
+    for dy in range(-r + 1, r):
+        yield cx - r, cy + dy
+        yield cx + r, cy + dy
+
+
+class _Grid:
+    """
+    Points in a uniform XY grid for nearest-neighbour queries. Points that
+    have been found can be removed; they are dropped from their cell lazily.
+    """
+
+    def __init__(self, points: np.ndarray) -> None:
+        self.points = points
+        self.coords = points.tolist()
+        self.alive = np.ones(len(points), dtype=bool)
+        self.count = len(points)
+        xy = points[:, :2]
+        self.low = xy.min(axis=0)
+        span = xy.max(axis=0) - self.low
+        cells = max(len(points) / GRID_POINTS_PER_CELL, 1.0)
+        # about GRID_POINTS_PER_CELL points per cell, also when the points
+        # lie on a line
+        self.size = max(float(np.sqrt(span[0] * span[1] / cells)), float(span.max()) / cells, 1e-9)
+        keys = np.floor((xy - self.low) / self.size).astype(np.int64)
+        self.extent = keys.max(axis=0)
+        self.cells = {}
+        for index, key in enumerate(map(tuple, keys.tolist())):
+            self.cells.setdefault(key, []).append(index)
+
+    def remove(self, index: int) -> None:
+        if self.alive[index]:
+            self.alive[index] = False
+            self.count -= 1
+
+    def nearest(self, position) -> int:
+        """
+        Returns the index of the remaining point closest to `position`, the
+        lowest index of equally close ones. The rings of cells around the
+        position are searched until no closer point can be in the next one.
+        """
+        px, py, pz = (float(c) for c in position)
+        cx, cy = int((px - self.low[0]) // self.size), int((py - self.low[1]) // self.size)
+        reach = max(abs(cx), abs(cy), abs(self.extent[0] - cx), abs(self.extent[1] - cy))
+        best, best_distance = -1, np.inf  # squared distance
+        for r in range(reach + 1):
+            if 8 * r > self.count:
+                # more cells in the ring than points left: check them all
+                alive = np.flatnonzero(self.alive)
+                distances = np.linalg.norm(self.points[alive] - position, axis=1)
+                return int(alive[np.argmin(distances)])
+            for key in _ring(cx, cy, r):
+                entries = self.cells.get(key)
+                if not entries:
+                    continue
+                live = [index for index in entries if self.alive[index]]
+                if len(live) < len(entries):
+                    self.cells[key] = live
+                for index in live:
+                    x, y, z = self.coords[index]
+                    distance = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2
+                    if distance < best_distance or (distance == best_distance and index < best):
+                        best, best_distance = index, distance
+            if best >= 0 and best_distance <= (r * self.size) ** 2:
+                break
+        return best
+
+
+class _Tour:
+    """
+    An order of paths with a direction for each. `ends[k]` holds the start
+    and end point of each path (index 0 forwards, 1 backwards).
+    """
+
+    def __init__(self, paths: list, anchor) -> None:
+        self.anchor = anchor  # where the nozzle is before the first path
+        self.points = np.array([[_start(path), _end(path)] for path in paths])
+        self.reversible = np.array([_is_reversible(path) for path in paths])
+        self.order = np.arange(len(paths))
+        self.flipped = np.zeros(len(paths), dtype=bool)
+
+    def starts(self) -> np.ndarray:
+        return self.points[self.order, self.flipped.astype(int)]
+
+    def ends(self) -> np.ndarray:
+        return self.points[self.order, 1 - self.flipped.astype(int)]
+
+    def greedy(self, deadline: float) -> None:
+        """
+        Builds a nearest-neighbour tour from the anchor. Paths it has not
+        reached by the deadline follow in their input order.
+        """
+        n = len(self.order)
+        reversible = np.flatnonzero(self.reversible)
+        # endpoint i < n starts path i forwards, endpoint n + j starts path
+        # reversible[j] backwards; forwards wins between equally close ones
+        owner = np.concatenate([np.arange(n), reversible])
+        backward = np.full(n, -1)
+        backward[reversible] = n + np.arange(len(reversible))
+        grid = _Grid(np.concatenate([self.points[:, 0], self.points[reversible, 1]]))
+        position = self.anchor if self.anchor is not None else self.points[0, 0]
+        order, flipped = [], []
+        while len(order) < n and time.monotonic() < deadline:
+            endpoint = grid.nearest(position)
+            index, flip = int(owner[endpoint]), endpoint >= n
+            grid.remove(index)
+            if backward[index] >= 0:
+                grid.remove(backward[index])
+            order.append(index)
+            flipped.append(flip)
+            position = self.points[index, 0 if flip else 1]
+        rest = np.flatnonzero(grid.alive[:n])
+        self.order = np.concatenate([np.array(order, dtype=int), rest])
+        self.flipped = np.concatenate([np.array(flipped, dtype=bool), np.zeros(len(rest), dtype=bool)])
+
+    def two_opt(self, deadline: float) -> bool:
+        """
+        Applies the best improving segment reversal for each start position.
+        Reversing a segment also reverses the direction of its paths.
+        Returns True if anything improved.
+        """
+        n = len(self.order)
+        improved = False
+        for i in range(n):
+            if time.monotonic() > deadline:
+                break
+            starts, ends = self.starts(), self.ends()
+            fixed = np.cumsum(np.concatenate([[0], ~self.reversible[self.order]]))
+            before = self.anchor if i == 0 else ends[i - 1]
+            j = np.arange(i, n)
+            # all paths i..j must be reversible
+            valid = fixed[j + 1] - fixed[i] == 0
+            if before is None or not valid.any():
+                continue
+            next_starts = np.vstack([starts[1:], np.full((1, 3), np.nan)])[j]
+            has_next = j < n - 1
+            old = np.linalg.norm(starts[i] - before) + np.where(
+                has_next, np.linalg.norm(next_starts - ends[j], axis=1), 0)
+            new = np.linalg.norm(ends[j] - before, axis=1) + np.where(
+                has_next, np.linalg.norm(next_starts - starts[i], axis=1), 0)
+            gain = np.where(valid, old - new, 0)
+            best = int(np.argmax(gain))
+            if gain[best] > IMPROVEMENT_EPSILON:
+                k = i + best
+                self.order[i:k + 1] = self.order[i:k + 1][::-1].copy()
+                self.flipped[i:k + 1] = ~self.flipped[i:k + 1][::-1]
+                improved = True
+        return improved
+
+    def or_opt(self, deadline: float) -> bool:
+        """
+        Moves single paths to the position (and direction) where they add
+        the least travel. Returns True if anything improved.
+        """
+        n = len(self.order)
+        improved = False
+        for i in range(n):
+            if time.monotonic() > deadline:
+                break
+            if i == 0 and self.anchor is None:
+                continue
+            starts, ends = self.starts(), self.ends()
+            before = self.anchor if i == 0 else ends[i - 1]
+            after = starts[i + 1] if i < n - 1 else None
+            removed = np.linalg.norm(starts[i] - before)
+            if after is not None:
+                removed += np.linalg.norm(after - ends[i]) - np.linalg.norm(after - before)
+
+            path = self.order[i]
+            keep = np.delete(np.arange(n), i)
+            # insert after position k of the remaining tour (-1: before all)
+            prev_ends = np.vstack([[self.anchor], ends[keep]])
+            next_starts = np.vstack([starts[keep], np.full((1, 3), np.nan)])
+            has_next = np.arange(n) < n - 1
+            base = np.where(has_next, np.linalg.norm(next_starts - prev_ends, axis=1), 0)
+            best_cost, best_k, best_flip = np.inf, None, False
+            for flip in ((False, True) if self.reversible[path] else (False,)):
+                s = self.points[path, int(flip)]
+                e = self.points[path, 1 - int(flip)]
+                cost = np.linalg.norm(prev_ends - s, axis=1) + np.where(
+                    has_next, np.linalg.norm(next_starts - e, axis=1), 0) - base
+                k = int(np.argmin(cost))
+                if cost[k] < best_cost:
+                    best_cost, best_k, best_flip = cost[k], k, flip
+            if removed - best_cost > IMPROVEMENT_EPSILON:
+                order = list(self.order[keep])
+                flipped = list(self.flipped[keep])
+                order.insert(best_k, path)
+                flipped.insert(best_k, best_flip)
+                self.order = np.array(order)
+                self.flipped = np.array(flipped)
+                improved = True
+        return improved
+
+
+def _optimize_group(paths: list, anchor, deadline: float) -> list:
+    if time.monotonic() >= deadline:
+        return paths
+    tour = _Tour(paths, anchor)
+    tour.greedy(deadline)
+    while time.monotonic() < deadline:
+        improved = tour.two_opt(deadline)
+        improved = tour.or_opt(deadline) or improved
+        if not improved:
+            break
+    return [
+        _reversed(paths[index]) if flip else paths[index]
+        for index, flip in zip(tour.order, tour.flipped)
+    ]
+
+
+def optimize_order(paths: list, time_budget: float = DEFAULT_TIME_BUDGET) -> list:
+    """
+    Reorders (and where possible reverses) paths to reduce travel.
+
+    Args:
+        paths (list): Flattened `Path` objects whose defaults have been applied.
+        time_budget (float): Seconds to spend building and refining the
+            tours; paths not reached by then keep their input order. Only
+            reversing the paths printed backwards comes on top.
+
+    Returns:
+        list: The paths in the new order. Reversed paths are new objects; the
+        inputs are not modified.
+    """
+    deadline = time.monotonic() + time_budget
+    result = []
+    i = 0
+    while i < len(paths):
+        key = _group_key(paths[i])
+        j = i + 1
+        while j < len(paths) and _group_key(paths[j]) == key:
+            j += 1
+        group = paths[i:j]
+        if len(group) > 1:
+            anchor = _end(result[-1]) if result else None
+            if anchor is None:
+                # nothing is known before the first path; keep it first
+                result.append(group[0])
+                group = group[1:]
+                anchor = _end(result[-1])
+            group = _optimize_group(group, anchor, deadline) if group else group
+        result.extend(group)
+        i = j
+    return result
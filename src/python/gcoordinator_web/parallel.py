@@ -0,0 +1,215 @@
+"""
+Splitting G-code generation into independent work items for a worker pool.
+
+`print_path` of each path only depends on the path itself, and the travel
+move after it only needs the first point of the next path. `plan()` cuts the
+flattened paths of a `GCode` into balanced work items that carry exactly that
+information, and `emit()` turns one work item back into G-code text in any
+worker. Concatenating the header and the emitted items in order gives the
+same text as `GCode.generate()`:
+
+- With arc fitting, Cartesian paths are emitted whole, since arcs are fitted
+  per path and would be refitted at the cut.
+- With compaction, each item continues the modal state of the text before
+  it. The first item gets the state after the header; the others replay the
+  last task of the item before them, with the temperatures and fan speed
+  `plan()` tracked up to that task.
+
+Functions:
+- plan: Splits a `GCode` into a header and pickled work items.
+- emit: Generates the G-code text of one pickled work item.
+"""
+
+import copy
+import pickle
+
+import numpy as np
+
+from gcoordinator_web.compact import ModalState, compact_gcode
+from gcoordinator_web.gcode import GCode
+from gcoordinator_web.simplify import POINT_ATTRS
+
+MIN_PARALLEL_POINTS = 100_000  # below this the pickling overhead dominates
+ITEMS_PER_WORKER = 4  # more items than workers keeps the pool balanced
+SPLITTABLE_KINEMATICS = ('Cartesian', 'NozzleTilt')  # one G-code line and one coord per point
+PATH_SETTING_COMMANDS = (  # see BaseGCode.apply_path_settings
+    ('nozzle_temperature', 'M104'),
+    ('bed_temperature', 'M140'),
+    ('fan_speed', 'M106'),
+)
+
+
+class PathHead:
+    """
+    The part of a path a travel move into it needs: its first point and its
+    travel speed.
+    """
+
+    def __init__(self, path) -> None:
+        self.x = np.asarray(path.x[:1])
+        self.y = np.asarray(path.y[:1])
+        self.z = np.asarray(path.z[:1])
+        self.travel_speed = path.travel_speed
+
+
+def _piece(path, start: int, stop: int):
+    """
+    Returns the points `start..stop` (inclusive) of `path` as a shallow copy.
+    Consecutive pieces share one point, so each segment is printed once.
+
+    Only paths of `SPLITTABLE_KINEMATICS` are split. Their `coords` and
+    `norms` have one entry per point and are sliced along; BedTiltBC and
+    BedRotate add sub-segments to them (see `simplify.update_derived`) and
+    are always emitted whole.
+    """
+    if path.kinematics not in SPLITTABLE_KINEMATICS:
+        raise ValueError(f'{path.kinematics} paths cannot be split')
+    piece = copy.copy(path)
+    for name in POINT_ATTRS + ('coords', 'norms'):
+        setattr(piece, name, getattr(path, name)[start:stop + 1])
+    piece.start_coord = piece.coords[0]
+    piece.end_coord = piece.coords[-1]
+    return piece
+
+
+def _tasks(paths, max_points: int, splittable=SPLITTABLE_KINEMATICS):
+    """
+    Yields `(path, apply_settings, travel_to)` tuples for every path, splitting
+    paths of the `splittable` kinematics with more than `max_points` points
+    into pieces.
+    """
+    for i, path in enumerate(paths):
+        travel_to = PathHead(paths[i + 1]) if i < len(paths) - 1 else None
+        n = len(path.x)
+        if n <= max_points or path.kinematics not in splittable:
+            yield path, True, travel_to
+            continue
+        bounds = list(range(0, n - 1, max_points)) + [n - 1]
+        for j in range(len(bounds) - 1):
+            is_last = j == len(bounds) - 2
+            yield _piece(path, bounds[j], bounds[j + 1]), j == 0, travel_to if is_last else None
+
+
+def plan(gcode: GCode, workers: int):
+    """
+    Splits the generation of `gcode` into work items.
+
+    Args:
+        gcode (GCode): A G-code generator whose paths have their defaults applied.
+        workers (int): The number of workers the items will be spread over.
+
+    Returns:
+        tuple or None: `(header, items)`, where `header` is the G-code text
+        before the first path and `items` is a list of pickled work items
+        (bytes), or None when the program is too small to be worth splitting.
+    """
+    paths = gcode.full_object
+    total_points = sum(len(path.x) for path in paths)
+    if workers < 2 or total_points < MIN_PARALLEL_POINTS:
+        return None
+
+    gcode.gcode = ''
+    gcode.set_initial_settings()
+    gcode.travel_to_first_point(paths[0])
+    header = gcode.gcode
+    gcode.gcode = ''
+    compacting = gcode.options['compact']
+    context = None
+    if compacting:
+        context = ModalState()
+        header = compact_gcode(header, context)
+
+    splittable = SPLITTABLE_KINEMATICS
+    if gcode.options['arc_tolerance']:
+        splittable = tuple(k for k in SPLITTABLE_KINEMATICS if k != 'Cartesian')
+    defaults = gcode.default_settings
+    # the value of each setting command as compaction will have parsed it
+    path_settings = {command: float(f'{defaults[name]}') for name, command in PATH_SETTING_COMMANDS}
+
+    target = max(1, total_points // (workers * ITEMS_PER_WORKER))
+    items = []
+    batch, batch_points = [], 0
+    for task in _tasks(paths, target, splittable):
+        if not batch:
+            items.append((batch, context))
+        path, apply_settings, _ = task
+        before = path_settings
+        if compacting and apply_settings:
+            path_settings = dict(path_settings)
+            for name, command in PATH_SETTING_COMMANDS:
+                if getattr(path, name) != defaults[name]:
+                    path_settings[command] = float(f'{getattr(path, name)}')
+        batch.append(task)
+        batch_points += len(path.x)
+        if batch_points >= target:
+            if compacting:
+                context = (task, before)
+            batch, batch_points = [], 0
+
+    payloads = [
+        pickle.dumps(
+            (gcode.settings, gcode.default_settings, gcode.options, batch, context),
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+        for batch, context in items
+    ]
+    return header, payloads
+
+
+def emit(payload: bytes) -> str:
+    """
+    Generates the G-code text of one work item created by `plan()`.
+
+    Args:
+        payload (bytes): A pickled work item.
+
+    Returns:
+        str: The G-code text of the item.
+    """
+    if hasattr(payload, 'to_bytes'):  # a Uint8Array handed over by the worker
+        payload = payload.to_bytes()
+    settings, default_settings, options, batch, context = pickle.loads(payload)
+    gcode = GCode.__new__(GCode)
+    gcode.full_object = []
+    gcode.settings = settings
+    gcode.default_settings = default_settings
+    gcode.options = options
+    state = _start_state(gcode, context) if options['compact'] else None
+    gcode.gcode = ''
+    for task in batch:
+        _emit_task(gcode, task)
+    if state is not None:
+        return compact_gcode(gcode.gcode, state)
+    return gcode.gcode
+
+
+def _emit_task(gcode: GCode, task) -> None:
+    """Appends the G-code text of one task from `_tasks()` to `gcode.gcode`."""
+    path, apply_settings, travel_to = task
+    if apply_settings:
+        gcode.apply_path_settings(path)
+    gcode.print_path(path)
+    if travel_to is not None:
+        gcode.travel_from_path_to_path(path, travel_to)
+
+
+def _start_state(gcode: GCode, context) -> ModalState:
+    """
+    Returns the compaction state at the start of a work item: the state after
+    the header for the first item, otherwise the state after replaying the
+    last task of the item before it.
+
+    Every task before an item ends with a travel, so the replay starts in
+    absolute mode with relative E. Its print moves set the feed rate and the
+    position before its own travel needs them, except on a single-point path,
+    where they stay unknown and compaction just keeps more words.
+    """
+    if isinstance(context, ModalState):
+        return context
+    task, path_settings = context
+    state = ModalState(absolute=True, relative_e=True)
+    state.settings = dict(path_settings)
+    gcode.gcode = ''
+    _emit_task(gcode, task)
+    compact_gcode(gcode.gcode, state)
+    return state
@@ -0,0 +1,162 @@
+"""
+Profiling of a run for the "Profile run" mode of the web runner.
+
+The worker runs the script and the G-code generation as separate calls from
+JavaScript, so profiling is driven by calls around them: `start()` enables
+`cProfile`, `lap(stage)` records the wall time since the previous lap (or
+the start) under `stage`, `pause()` turns `cProfile` off while the laps go
+on, and `stop()` returns the report.
+
+The G-code generation is only timed, not profiled: the generators build
+their text one formatted line at a time, which the profiling hook slows down
+by two orders of magnitude, so its profile would drown out the script.
+
+The report has the hottest functions by their own time and the profile in
+the collapsed stack format of flame graph tools (`a;b;c <microseconds>`,
+readable by speedscope and flamegraph.pl). `cProfile` only records
+caller/callee pairs, not whole stacks, so the stacks are reconstructed by
+splitting the time of each function among its callers in proportion to the
+time spent under each of them, as gprof does.
+
+Functions:
+- start: Starts profiling a run.
+- lap: Records the time of the stage that just finished.
+- pause: Stops collecting the profile but keeps timing stages.
+- stop: Stops profiling and returns the report as a JSON string.
+"""
+
+import cProfile
+import json
+import pstats
+import time
+
+DEFAULT_TOP = 40
+MAX_STACK_DEPTH = 64
+MIN_STACK_FRACTION = 1e-4  # subtrees with less of the total time are dropped
+
+_profiler = None
+_stages = {}
+_last_lap = 0.0
+
+
+def start() -> None:
+    """
+    Starts profiling. A profile that is still running is discarded.
+    """
+    global _profiler, _last_lap
+    if _profiler is not None:
+        _profiler.disable()
+    _stages.clear()
+    _profiler = cProfile.Profile()
+    _last_lap = time.perf_counter()
+    _profiler.enable()
+
+
+def lap(stage: str) -> None:
+    """
+    Records the wall time since the previous lap (or `start()`) as `stage`.
+    Does nothing when not profiling.
+
+    Args:
+        stage (str): A short name, e.g. 'script' or 'generate'.
+    """
+    global _last_lap
+    if _profiler is None:
+        return
+    now = time.perf_counter()
+    _stages[stage] = _stages.get(stage, 0.0) + now - _last_lap
+    _last_lap = now
+
+
+def pause() -> None:
+    """
+    Stops collecting the profile; stages are still timed with `lap()`.
+    Does nothing when not profiling.
+    """
+    if _profiler is not None:
+        _profiler.disable()
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == '~':  # built-in functions
+        return name
+    module = filename.rsplit('/', 1)[-1]
+    return f'{name} ({module}:{line})'
+
+
+def _collapsed(stats: dict) -> str:
+    """Returns the profile as collapsed stacks with microsecond weights."""
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    min_time = MIN_STACK_FRACTION * sum(entry[2] for entry in stats.values())
+
+    weights = {}
+
+    def walk(func, stack: tuple, fraction: float) -> None:
+        _, _, tottime, cumtime, _ = stats[func]
+        stack = stack + (_label(func),)
+        own = tottime * fraction * 1e6
+        if own >= 0.5:
+            key = ';'.join(stack)
+            weights[key] = weights.get(key, 0.0) + own
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee in callees.get(func, ()):
+            if _label(callee) in stack:  # recursion
+                continue
+            callee_cumtime = stats[callee][3]
+            edge_cumtime = stats[callee][4][func][3]
+            if callee_cumtime <= 0 or edge_cumtime <= 0:
+                continue
+            share = fraction * edge_cumtime / callee_cumtime
+            if share * callee_cumtime >= min_time:
+                walk(callee, stack, share)
+
+    for root in roots:
+        walk(root, (), 1.0)
+    return '\n'.join(f'{stack} {round(weight)}' for stack, weight in weights.items())
+
+
+def stop(top: int = DEFAULT_TOP) -> str:
+    """
+    Stops profiling and returns the report.
+
+    Args:
+        top (int): The number of functions listed.
+
+    Returns:
+        str: A JSON object with `stages` (stage -> seconds, see `lap`),
+        `total` (seconds profiled), `functions`, the `top` functions by own
+        time as `{'function', 'file', 'line', 'calls', 'own', 'cumulative'}`
+        (seconds), and `collapsed`, the flame graph stacks. Null if profiling
+        was not started.
+    """
+    global _profiler
+    if _profiler is None:
+        return json.dumps(None)
+    _profiler.disable()
+    profiler, _profiler = _profiler, None
+
+    stats = pstats.Stats(profiler).stats
+    hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    functions = [
+        {
+            'function': func[2],
+            'file': func[0],
+            'line': func[1],
+            'calls': calls,
+            'own': tottime,
+            'cumulative': cumtime,
+        }
+        for func, (_, calls, tottime, cumtime, _) in hottest
+    ]
+    return json.dumps({
+        'stages': dict(_stages),
+        'total': sum(entry[2] for entry in stats.values()),
+        'functions': functions,
+        'collapsed': _collapsed(stats),
+    })
@@ -0,0 +1,64 @@
+"""
+Progress reporting hook for long-running gcoordinator work.
+
+`GCode.generate` and the infill generators call `progress()` as they work.
+The web worker registers a handler that forwards the events to the UI; the
+events are throttled here so a tight loop does not flood `postMessage`.
+
+Functions:
+- progress: Reports that `current` of `total` units of `stage` are done.
+- set_handler: Registers the callable that receives progress events.
+"""
+
+import time
+
+from gcoordinator_web import memory
+
+MIN_INTERVAL = 0.1  # seconds between two forwarded events
+
+_handler = None
+_last_emit = 0.0
+_counts = {}
+
+
+def set_handler(handler) -> None:
+    """
+    Registers the callable that receives progress events.
+
+    Args:
+        handler (callable or None): Called as `handler(stage, current, total)`,
+            where `total` is None when the amount of work is unknown.
+            None removes the handler.
+    """
+    global _handler, _last_emit
+    _handler = handler
+    _last_emit = 0.0
+    _counts.clear()
+
+
+def progress(stage: str, current: int = None, total: int = None) -> None:
+    """
+    Reports progress of `stage`.
+
+    Events are forwarded at most every `MIN_INTERVAL` seconds, except the
+    final event of a stage (`current == total`), which is always forwarded.
+    Every event also checks the soft memory limit, see `memory.check`.
+
+    Args:
+        stage (str): A short name of the work, e.g. 'generate' or 'infill'.
+        current (int, optional): Units of work done. When omitted, an internal
+            per-stage counter is incremented instead.
+        total (int, optional): Total units of work, if known.
+    """
+    global _last_emit
+    memory.check(f'The run (at {stage})')
+    if current is None:
+        current = _counts.get(stage, 0) + 1
+        _counts[stage] = current
+    if _handler is None:
+        return
+    now = time.monotonic()
+    if now - _last_emit < MIN_INTERVAL and current != total:
+        return
+    _last_emit = now
+    _handler(stage, current, total)
@@ -0,0 +1,186 @@
+"""
+Draft quality for interactive previews.
+
+While a script is being edited, the web runner re-runs it after every pause
+in typing. In draft quality the runtime trades resolution for speed:
+
+- `GCode` keeps every `point_step`-th point of each path (plus its last
+  point) and drops the flat paths of all but every `layer_step`-th layer, so
+  generating, transferring and drawing the preview get cheaper;
+- `gyroid_infill` samples its equation on a grid `infill_scale` times
+  coarser, and `line_infill` spaces its lines `infill_scale` times wider;
+  both return no infill for the layers that are dropped, and
+  `implicit_layers` does not slice them.
+
+The worker sets the quality before each run with `set_quality()`; scripts
+can call it too, e.g. `gc.set_quality('full')` to never preview in draft.
+The cached infill results of both qualities are kept apart because the
+grid spacing and line distance are part of the call.
+
+Functions:
+- set_quality: Sets the quality of the current run.
+- get_quality: Returns the quality of the current run.
+- reset: Restores full quality.
+- skips_layer: Whether a path lies on a layer that draft quality drops.
+- reduce_paths: Applies the point and layer steps to the paths of a `GCode`.
+- draft_gyroid_infill: Wraps `gyroid_infill` to follow the quality.
+- draft_line_infill: Wraps `line_infill` to follow the quality.
+"""
+
+import copy
+import functools
+
+import numpy as np
+from gcoordinator.path_generator import PathList
+from gcoordinator.settings import get_settings
+
+from gcoordinator_web.infill import GRID_SPACING
+from gcoordinator_web.simplify import POINT_ATTRS, update_derived
+
+QUALITIES = {
+    'full': {'point_step': 1, 'layer_step': 1, 'infill_scale': 1.0},
+    'draft': {'point_step': 4, 'layer_step': 1, 'infill_scale': 2.0},
+}
+MIN_DRAFT_POINTS = 16  # paths with fewer points keep all of them
+
+_quality = {'mode': 'full', **QUALITIES['full']}
+
+
+def set_quality(mode: str = 'full', **overrides) -> None:
+    """
+    Sets the quality of the current run.
+
+    Args:
+        mode (str): 'full' or 'draft'.
+        point_step (int): Keep every n-th point of a path.
+        layer_step (int): Keep every n-th layer, counted from the first.
+        infill_scale (float): Factor on the infill grid spacing and line
+            distance.
+
+    Raises:
+        ValueError: If the mode or a value is invalid.
+        TypeError: If an override is unknown.
+    """
+    if mode not in QUALITIES:
+        raise ValueError(f"quality must be one of {', '.join(QUALITIES)}, not {mode!r}")
+    unknown = sorted(set(overrides) - set(QUALITIES[mode]))
+    if unknown:
+        raise TypeError(f"Unknown quality setting(s): {', '.join(unknown)}")
+    quality = {**QUALITIES[mode], **overrides}
+    if int(quality['point_step']) < 1 or int(quality['layer_step']) < 1 or quality['infill_scale'] <= 0:
+        raise ValueError('point_step and layer_step must be at least 1 and infill_scale positive')
+    _quality.clear()
+    _quality.update(
+        mode=mode,
+        point_step=int(quality['point_step']),
+        layer_step=int(quality['layer_step']),
+        infill_scale=float(quality['infill_scale']),
+    )
+
+
+def get_quality() -> dict:
+    """
+    Returns the quality of the current run.
+
+    Returns:
+        dict: `mode`, `point_step`, `layer_step` and `infill_scale`.
+    """
+    return dict(_quality)
+
+
+def reset() -> None:
+    """Restores full quality."""
+    set_quality('full')
+
+
+def _layer_height() -> float:
+    return get_settings()['Print']['layer']['layer_height']
+
+
+def skips_layer(z, layer_height: float) -> bool:
+    """
+    Whether a path with heights `z` lies on a layer the current quality
+    drops. Only flat paths belong to a layer; the first layer is kept.
+
+    Args:
+        z (array-like): The Z coordinates of the path.
+        layer_height (float): The layer height in mm.
+
+    Returns:
+        bool: True if the path is dropped.
+    """
+    step = _quality['layer_step']
+    z = np.asarray(z, dtype=float)
+    if step <= 1 or len(z) == 0 or layer_height <= 0 or np.ptp(z) != 0:
+        return False
+    layer = int(round(z[0] / layer_height))
+    return (layer - 1) % step != 0
+
+
+def _subsampled(path, step: int):
+    """Returns a copy of `path` with every `step`-th point and its last one."""
+    n = len(path.x)
+    if step <= 1 or n < MIN_DRAFT_POINTS:
+        return path
+    keep = np.arange(0, n, step)
+    if keep[-1] != n - 1:
+        keep = np.append(keep, n - 1)
+    result = copy.copy(path)
+    for name in POINT_ATTRS:
+        setattr(result, name, np.asarray(getattr(path, name))[keep])
+    update_derived(result)
+    return result
+
+
+def reduce_paths(paths: list, layer_height: float) -> list:
+    """
+    Applies the point and layer steps of the current quality.
+
+    Args:
+        paths (list): Flattened `Path` objects.
+        layer_height (float): The default layer height in mm.
+
+    Returns:
+        list: The kept paths; subsampled ones are copies, the inputs are not
+        modified. The same list in full quality.
+    """
+    if _quality['point_step'] <= 1 and _quality['layer_step'] <= 1:
+        return paths
+    return [
+        _subsampled(path, _quality['point_step'])
+        for path in paths
+        if not skips_layer(path.z, layer_height)
+    ]
+
+
+def _first_z(path):
+    paths = path.paths if isinstance(path, PathList) else [path]
+    return paths[0].z if paths else ()
+
+
+def draft_gyroid_infill(gyroid_infill):
+    """
+    Wraps `gcoordinator_web.infill.gyroid_infill` (or a cached version of it)
+    so the grid spacing and dropped layers follow the quality.
+    """
+    @functools.wraps(gyroid_infill)
+    def wrapper(path, infill_distance=1, value=0):
+        if skips_layer(_first_z(path), _layer_height()):
+            return PathList([])
+        return gyroid_infill(path, infill_distance, value, GRID_SPACING * _quality['infill_scale'])
+    return wrapper
+
+
+def draft_line_infill(line_infill):
+    """
+    Wraps `line_infill` so the line distance and dropped layers follow the
+    quality.
+    """
+    @functools.wraps(line_infill)
+    def wrapper(path, infill_distance=1, angle=np.pi / 4):
+        if skips_layer(_first_z(path), _layer_height()):
+            return PathList([])
+        if _quality['infill_scale'] != 1:
+            infill_distance = infill_distance * _quality['infill_scale']
+        return line_infill(path, infill_distance, angle)
+    return wrapper
@@ -0,0 +1,164 @@
+"""
+Tolerance-based simplification of paths.
+
+`infill_generator.simplify_path` implements Ramer-Douglas-Peucker for 2D
+points. This module generalizes it to 3D points with rotation and tilt
+channels, so that nearly collinear points of any path can be dropped before
+each of them becomes a G-code line. Extrusion is computed from the kept
+segments when the G-code is generated.
+
+`coords` and `norms` do not always have one entry per point: bed kinematics
+add the sub-segments a move is divided into and count them in
+`sub_segment_cnt`. Code that selects points of a path therefore only indexes
+`POINT_ATTRS` and recomputes the rest with `update_derived()`.
+
+Functions:
+- simplify_mask: Returns which points of a polyline to keep.
+- simplified: Returns a copy of a path without the points that can be dropped.
+- update_derived: Recomputes the attributes a path derives from its points.
+"""
+
+import copy
+
+import numpy as np
+from gcoordinator.kinematics.kin_base import Kinematics
+from gcoordinator.kinematics.kin_bed_rotate import BedRotate
+from gcoordinator.kinematics.kin_bed_tilt_bc import BedTiltBC
+from gcoordinator.kinematics.kin_cartesian import Cartesian
+from gcoordinator.kinematics.kin_nozzle_tilt import NozzleTilt
+
+DEFAULT_ANGLE_TOLERANCE = np.radians(0.5)
+
+# Per-point attributes of a Path; everything else is shared with the copy or
+# derived from them, see `update_derived`.
+POINT_ATTRS = ('x', 'y', 'z', 'rot', 'tilt')
+
+# Kinematics whose `coords` and `norms` have exactly one entry per point
+PER_POINT_KINEMATICS = ('Cartesian', 'NozzleTilt')
+
+KINEMATICS = {
+    'Cartesian': Cartesian,
+    'BedRotate': BedRotate,
+    'BedTiltBC': BedTiltBC,
+    'NozzleTilt': NozzleTilt,
+}
+
+
+def _errors(points, angles, start, end, epsilon, angle_epsilon):
+    """
+    Returns the errors of the points strictly between `start` and `end`
+    relative to the segment between them, as multiples of the tolerances.
+    `start` and `end` may be arrays of the same length as the result.
+    """
+    line_vec = points[end] - points[start]
+    line_len_sq = np.sum(line_vec**2, axis=-1)
+    diff = points[start + 1:end] - points[start] if np.ndim(start) == 0 else points[start + 1] - points[start]
+    safe_len_sq = np.where(line_len_sq == 0, 1, line_len_sq)
+    t = np.sum(diff * line_vec, axis=-1) / safe_len_sq
+    dists = np.linalg.norm(diff - t[..., None] * line_vec, axis=-1)
+    # a closed loop (start == end) is measured from its start point
+    dists = np.where(line_len_sq == 0, np.linalg.norm(diff, axis=-1), dists)
+    errors = dists / epsilon if epsilon > 0 else np.where(dists > 0, np.inf, 0)
+
+    if angles is not None:
+        t = np.clip(t, 0, 1)
+        inner = angles[start + 1:end] if np.ndim(start) == 0 else angles[start + 1]
+        expected = angles[start] + t[..., None] * (angles[end] - angles[start])
+        angle_errors = np.max(np.abs(inner - expected), axis=-1)
+        errors = np.maximum(errors, angle_errors / angle_epsilon)
+    return errors
+
+
+def simplify_mask(points, epsilon: float, angles=None, angle_epsilon: float = DEFAULT_ANGLE_TOLERANCE) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker for 3D points with optional angle channels.
+
+    A point is dropped if it is within `epsilon` of the straight segment
+    between the kept points around it and, for every angle channel, within
+    `angle_epsilon` of the value interpolated linearly along that segment
+    (as the printer interpolates all axes of a move together).
+
+    Points that are already out of tolerance for the segment between their
+    direct neighbours are kept up front in one vectorized pass, and RDP only
+    runs on the stretches between them. This keeps dense, detailed paths
+    (where few points can go) fast.
+
+    Args:
+        points (np.ndarray): (n, 3) point coordinates in mm.
+        epsilon (float): The distance tolerance in mm.
+        angles (np.ndarray, optional): (n, k) angle channels in radians.
+        angle_epsilon (float): The angle tolerance in radians.
+
+    Returns:
+        np.ndarray: A boolean mask of the points to keep. The first and last
+        points are always kept.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep
+    if angles is not None:
+        angles = np.asarray(angles, dtype=float).reshape(n, -1)
+
+    inner = np.arange(1, n - 1)
+    local = _errors(points, angles, inner - 1, inner + 1, epsilon, angle_epsilon)
+    anchors = np.concatenate([[0], inner[local > 1], [n - 1]])
+    gaps = np.flatnonzero(np.diff(anchors) >= 2)
+
+    stack = [(anchors[i], anchors[i + 1]) for i in gaps]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        errors = _errors(points, angles, start, end, epsilon, angle_epsilon)
+        max_idx = np.argmax(errors)
+        if errors[max_idx] > 1:
+            idx = start + 1 + max_idx
+            stack.append((start, idx))
+            stack.append((idx, end))
+        else:
+            keep[start + 1:end] = False
+    return keep
+
+
+def simplified(path, epsilon: float, angle_epsilon: float = DEFAULT_ANGLE_TOLERANCE):
+    """
+    Returns a copy of `path` without the points that lie within the tolerance
+    of the simplified polyline, see `simplify_mask`. Installed as
+    `Path.simplified`.
+
+    Args:
+        path (Path): The path to simplify.
+        epsilon (float): The distance tolerance in mm.
+        angle_epsilon (float): The tolerance for `rot` and `tilt` in radians.
+
+    Returns:
+        Path: The simplified copy; `path` itself is not modified.
+    """
+    points = np.column_stack([path.x, path.y, path.z])
+    angles = np.column_stack([np.broadcast_to(path.rot, len(points)), np.broadcast_to(path.tilt, len(points))])
+    keep = simplify_mask(points, epsilon, angles, angle_epsilon)
+    result = copy.copy(path)
+    if keep.all():
+        return result
+    for name in POINT_ATTRS:
+        value = getattr(path, name)
+        setattr(result, name, np.asarray(value)[keep] if len(value) == len(keep) else value)
+    update_derived(result)
+    return result
+
+
+def update_derived(path) -> None:
+    """
+    Recomputes `coords`, `norms`, `center`, `start_coord`, `end_coord` and,
+    for bed kinematics, `sub_segment_cnt` of `path` from its points, with the
+    `update_attrs` of its kinematics as `Path.__init__` does.
+
+    Args:
+        path (Path): The path whose points were replaced.
+
+    Returns:
+        None
+    """
+    KINEMATICS.get(path.kinematics, Kinematics).update_attrs(path)
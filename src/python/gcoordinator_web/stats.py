@@ -0,0 +1,172 @@
+"""
+Print statistics computed from the paths of a `GCode`.
+
+Everything is computed on the concatenated `coords` of all paths at once:
+the segments inside a path are printed, the segments between the last point
+of a path and the first point of the next one are travels. For bed
+kinematics `coords` are in the frame of the part and include the sub-segments
+the move is divided into. No G-code text is parsed.
+
+Settings read besides the regular print settings (both optional):
+
+    "Print": {"filament": {"filament_density": 1.24}},        # g/cm^3
+    "Hardware": {"acceleration": {"print_acceleration": 1000,  # mm/s^2
+                                  "travel_acceleration": 2000}},
+
+Without an acceleration every move runs at its programmed feed rate. With
+one, each segment gets a trapezoidal velocity profile: moves start and stop
+at the ends of each path, and the speed through a corner inside a path is
+scaled by `(1 + cos(angle)) / 2` of the slower of the two segments.
+
+Functions:
+- compute: Returns time, filament, distance and per-layer statistics.
+"""
+
+import numpy as np
+
+from gcoordinator.settings import get_settings
+
+DEFAULT_FILAMENT_DENSITY = 1.24  # g/cm^3 (PLA)
+BED_KINEMATICS = ('BedTiltBC', 'BedRotate')
+
+
+def _per_path(paths, name) -> np.ndarray:
+    return np.array([getattr(path, name) for path in paths], dtype=float)
+
+
+def _segment_times(lengths, speeds, acceleration, entry, exit_):
+    """
+    Returns the time of each segment for a trapezoidal velocity profile, or
+    the time at constant speed if `acceleration` is None. All speeds in mm/s.
+    """
+    if acceleration is None or acceleration <= 0:
+        return lengths / speeds
+    a = acceleration
+    peak = np.minimum(speeds, np.sqrt(a * lengths + (entry**2 + exit_**2) / 2))
+    accelerate = (peak**2 - entry**2) / (2 * a)
+    decelerate = (peak**2 - exit_**2) / (2 * a)
+    cruise = lengths - accelerate - decelerate
+    reachable = (accelerate >= 0) & (decelerate >= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        trapezoid = (peak - entry) / a + (peak - exit_) / a + np.maximum(cruise, 0) / peak
+        ramp = 2 * lengths / (entry + exit_)
+    times = np.where(reachable, trapezoid, ramp)
+    return np.where(lengths > 0, times, 0.0)
+
+
+def compute(paths, settings=None) -> dict:
+    """
+    Computes the statistics of a program.
+
+    Args:
+        paths (list): The flattened `Path` objects of a `GCode` in print
+            order, with their defaults applied.
+        settings (dict, optional): The gcoordinator settings; defaults to
+            the current ones.
+
+    Returns:
+        dict: `paths` and `points` (counts), `print_distance` and
+        `travel_distance` (mm), `filament_length` (mm, as extruded by the
+        kinematics of each path), `filament_mass` (g),
+        `print_time` (s, printing and travel), `acceleration` (whether the
+        acceleration model was used) and `layers`, a list of
+        `{'z': mm, 'time': s}` ordered by height, where a segment belongs to
+        the layer (a multiple of the layer height) its start point is in and
+        `z` is the lowest start point in the layer.
+    """
+    settings = settings if settings is not None else get_settings()
+    hardware_acceleration = settings.get('Hardware', {}).get('acceleration', {})
+    print_acceleration = hardware_acceleration.get('print_acceleration')
+    travel_acceleration = hardware_acceleration.get('travel_acceleration', print_acceleration)
+    density = settings.get('Print', {}).get('filament', {}).get('filament_density', DEFAULT_FILAMENT_DENSITY)
+
+    if not paths:
+        return {
+            'paths': 0, 'points': 0, 'print_distance': 0.0, 'travel_distance': 0.0,
+            'filament_length': 0.0, 'filament_mass': 0.0, 'print_time': 0.0,
+            'acceleration': print_acceleration is not None, 'layers': [],
+        }
+
+    # bed kinematics add sub-segments to `coords`, so the segments are counted
+    # on `coords` and not on the points
+    counts = np.array([len(path.coords) for path in paths])
+    coords = np.concatenate([np.asarray(path.coords, dtype=float).reshape(-1, 3) for path in paths])
+    path_ids = np.repeat(np.arange(len(paths)), counts)
+    vectors = np.diff(coords, axis=0)
+    lengths = np.linalg.norm(vectors, axis=1)
+    owner = path_ids[:-1]  # the path a segment starts in
+    printed = owner == path_ids[1:]
+
+    # printing
+    p_owner = owner[printed]
+    p_lengths = lengths[printed]
+    p_speeds = _per_path(paths, 'print_speed')[p_owner] / 60
+    entry = np.zeros(len(p_lengths))
+    exit_ = np.zeros(len(p_lengths))
+    if print_acceleration is not None and len(p_lengths) > 1:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            directions = vectors[printed] / p_lengths[:, None]
+        directions = np.nan_to_num(directions)
+        cos_angle = np.sum(directions[:-1] * directions[1:], axis=1)
+        junction = np.minimum(p_speeds[:-1], p_speeds[1:]) * (1 + cos_angle) / 2
+        junction = np.where(p_owner[:-1] == p_owner[1:], junction, 0)
+        exit_[:-1] = junction
+        entry[1:] = junction
+    p_times = _segment_times(p_lengths, p_speeds, print_acceleration, entry, exit_)
+
+    # extrusion, see formula 3 in https://www.ncbi.nlm.nih.gov/pmc/articles/PMC7600913/;
+    # like their `calculate_extrusion`, the bed kinematics use the cross
+    # section of a rectangle with round sides and no extrusion multiplier
+    filament_diameter = _per_path(paths, 'filament_diameter')
+    nozzle_diameter = _per_path(paths, 'nozzle_diameter')
+    path_layer_height = _per_path(paths, 'layer_height')
+    bed = np.array([path.kinematics in BED_KINEMATICS for path in paths])
+    cross_section = np.where(
+        bed,
+        (nozzle_diameter - path_layer_height) * path_layer_height + np.pi * (path_layer_height / 2) ** 2,
+        nozzle_diameter * path_layer_height * _per_path(paths, 'extrusion_multiplier'),
+    )
+    extrusion_factor = 4 * cross_section / (np.pi * filament_diameter**2)
+    filament_per_path = np.bincount(p_owner, weights=p_lengths, minlength=len(paths)) * extrusion_factor
+    filament_length = float(filament_per_path.sum())
+    filament_mass = float(np.sum(filament_per_path * np.pi * (filament_diameter / 2) ** 2) / 1000 * density)
+
+    # travel from each path to the next, including the z-hop up and down
+    t_owner = owner[~printed]
+    z_hop = np.array([path.z_hop_distance if path.z_hop else 0 for path in paths], dtype=float)[t_owner]
+    t_speeds = _per_path(paths, 'travel_speed')[t_owner + 1] / 60
+    t_lengths = lengths[~printed]
+    zeros = np.zeros(len(t_lengths))
+    t_times = (
+        _segment_times(t_lengths, t_speeds, travel_acceleration, zeros, zeros)
+        + 2 * _segment_times(z_hop, t_speeds, travel_acceleration, zeros, zeros)
+    )
+
+    # each segment belongs to the layer its start point is in, so that spiral
+    # paths are split into layers too
+    segment_z = coords[:-1, 2]
+    layer_height = path_layer_height[owner]
+    layer_index = np.floor(segment_z / layer_height + 1e-6).astype(np.int64)
+    segment_times = np.zeros(len(lengths))
+    segment_times[printed] = p_times
+    segment_times[~printed] = t_times
+    layers = []
+    if len(lengths):
+        indices, inverse = np.unique(layer_index, return_inverse=True)
+        layer_times = np.bincount(inverse, weights=segment_times)
+        by_layer = np.argsort(inverse, kind='stable')
+        first = np.searchsorted(inverse[by_layer], np.arange(len(indices)))
+        layer_z = np.minimum.reduceat(segment_z[by_layer], first)
+        layers = [{'z': float(z), 'time': float(t)} for z, t in zip(layer_z, layer_times)]
+
+    return {
+        'paths': len(paths),
+        'points': sum(len(path.x) for path in paths),
+        'print_distance': float(p_lengths.sum()),
+        'travel_distance': float(t_lengths.sum() + 2 * z_hop.sum()),
+        'filament_length': filament_length,
+        'filament_mass': filament_mass,
+        'print_time': float(p_times.sum() + t_times.sum()),
+        'acceleration': print_acceleration is not None,
+        'layers': layers,
+    }
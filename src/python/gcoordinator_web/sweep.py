@@ -0,0 +1,70 @@
+"""
+Parameter overrides for batch runs of the same script.
+
+A sweep runs one script many times with different values of its top-level
+constants (e.g. `WAVE_AMPLITUDE = 1.2`). Instead of asking users to turn the
+constants into function arguments, `apply_overrides()` rewrites the
+assignments in the source before it is executed.
+
+Functions:
+- apply_overrides: Replaces top-level constant assignments in a script.
+"""
+
+import ast
+import json
+
+
+def apply_overrides(code: str, overrides) -> str:
+    """
+    Replaces the top-level assignments of the given names in a script.
+
+    Every top-level `NAME = ...` statement of an overridden name is replaced,
+    so the last assignment in the script also gets the new value.
+
+    Args:
+        code (str): The Python source of the script.
+        overrides (dict or str): Maps names to new values, or the same as a
+            JSON object string.
+
+    Returns:
+        str: The rewritten source.
+
+    Raises:
+        ValueError: If a name is not assigned at the top level of the script,
+            or shares its line with another statement.
+    """
+    if isinstance(overrides, str):
+        overrides = json.loads(overrides)
+    if not overrides:
+        return code
+
+    tree = ast.parse(code)
+    lines = code.splitlines(keepends=True)
+    statement_lines = {}  # line number -> number of top-level statements on it
+    for node in tree.body:
+        for lineno in range(node.lineno, node.end_lineno + 1):
+            statement_lines[lineno] = statement_lines.get(lineno, 0) + 1
+
+    replacements = []
+    found = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            target = node.target
+        else:
+            continue
+        if not isinstance(target, ast.Name) or target.id not in overrides:
+            continue
+        if any(statement_lines[n] > 1 for n in range(node.lineno, node.end_lineno + 1)):
+            raise ValueError(f"`{target.id}` must be assigned on a line of its own")
+        found.add(target.id)
+        replacements.append((node.lineno, node.end_lineno, f'{target.id} = {overrides[target.id]!r}\n'))
+
+    missing = sorted(set(overrides) - found)
+    if missing:
+        raise ValueError(f"Not assigned at the top level of the script: {', '.join(missing)}")
+
+    for start, end, text in sorted(replacements, reverse=True):
+        lines[start - 1:end] = [text]
+    return ''.join(lines)
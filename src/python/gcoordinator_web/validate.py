@@ -0,0 +1,126 @@
+"""
+Machine-limit validation of paths.
+
+`settings['Hardware']['bed_size']` is never checked by gcoordinator, so a bad
+origin or a runaway Z only shows up at the printer. `check()` compares the
+coordinates every path will be written with (origin offsets included, plus
+the z-hop above the end of each path) against the bed size, and the rotation
+and tilt values of multi-axis kinematics against optional ranges:
+
+    "Kinematics": {"NozzleTilt": {..., "tilt_range": [-45, 45], "rot_range": [-360, 360]}}
+
+The ranges apply to the values as written, i.e. including `tilt_offset` and
+`rot_offset`. All points are checked at once on the concatenated arrays.
+
+Functions:
+- check: Returns the points of the paths that are out of the machine limits.
+"""
+
+import numpy as np
+
+from gcoordinator.settings import get_settings
+
+MAX_ISSUES = 100  # issues listed in detail; all are counted
+
+# kinematics -> (path attribute, settings key of the axis letter, offset key, range key)
+ANGLE_AXES = {
+    'NozzleTilt': (('tilt', 'tilt_code', 'tilt_offset', 'tilt_range'), ('rot', 'rot_code', 'rot_offset', 'rot_range')),
+    'BedTiltBC': (('tilt', 'tilt_code', 'tilt_offset', 'tilt_range'), ('rot', 'rot_code', 'rot_offset', 'rot_range')),
+    # BedRotate writes the `tilt` values on its rotation axis
+    'BedRotate': (('tilt', 'rot_code', 'rot_offset', 'rot_range'),),
+}
+
+
+def _concat(paths, name, offset=None) -> np.ndarray:
+    parts = []
+    for path in paths:
+        values = np.asarray(getattr(path, name), dtype=float).ravel()
+        parts.append(values + getattr(path, offset) if offset else values)
+    return np.concatenate(parts)
+
+
+def _axes(paths, settings):
+    """
+    Yields `(axis, values, path_ids, point_ids, minimum, maximum)` for every
+    checked axis, where the ids give the path and point index of each value.
+    """
+    counts = np.array([len(path.x) for path in paths])
+    path_ids = np.repeat(np.arange(len(paths)), counts)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    point_ids = np.arange(len(path_ids)) - starts[path_ids]
+    bed = settings.get('Hardware', {}).get('bed_size', {})
+
+    yield 'X', _concat(paths, 'x', 'x_origin'), path_ids, point_ids, 0.0, bed.get('bed_size_x', np.inf)
+    yield 'Y', _concat(paths, 'y', 'y_origin'), path_ids, point_ids, 0.0, bed.get('bed_size_y', np.inf)
+    yield 'Z', _concat(paths, 'z'), path_ids, point_ids, 0.0, bed.get('bed_size_z', np.inf)
+
+    # the nozzle rises by the z-hop after every path but the last
+    hop_ids = np.array([i for i, path in enumerate(paths[:-1]) if path.z_hop], dtype=int)
+    if len(hop_ids):
+        hop_z = np.array([paths[i].z[-1] + paths[i].z_hop_distance for i in hop_ids], dtype=float)
+        yield 'Z (z-hop)', hop_z, hop_ids, counts[hop_ids] - 1, 0.0, bed.get('bed_size_z', np.inf)
+
+    kinematics_settings = settings.get('Kinematics', {})
+    for kinematics, axes in ANGLE_AXES.items():
+        selected = [i for i, path in enumerate(paths) if path.kinematics == kinematics]
+        if not selected:
+            continue
+        config = kinematics_settings.get(kinematics, {})
+        subset = [paths[i] for i in selected]
+        in_subset = np.isin(path_ids, selected)
+        for name, code_key, offset_key, range_key in axes:
+            limits = config.get(range_key)
+            if limits is None:
+                continue
+            values = _concat(subset, name) + config.get(offset_key, 0)
+            yield (
+                config.get(code_key, name), values, path_ids[in_subset], point_ids[in_subset],
+                float(limits[0]), float(limits[1]),
+            )
+
+
+def check(paths, settings=None) -> dict:
+    """
+    Checks every point of `paths` against the machine limits.
+
+    Args:
+        paths (list): The flattened `Path` objects of a `GCode`, with their
+            defaults applied.
+        settings (dict, optional): The gcoordinator settings; defaults to the
+            current ones.
+
+    Returns:
+        dict: `count`, the number of out-of-limit values, and `issues`, one
+        entry per path and axis (at most `MAX_ISSUES`), each with the `path`
+        index, the first offending `point` index within the path, the
+        `axis`, that `value`, the allowed `min` and `max` and the number of
+        offending `points` of the path on that axis. Non-finite values
+        (NaN, inf) are always out of limits.
+    """
+    settings = settings if settings is not None else get_settings()
+    if not paths:
+        return {'count': 0, 'issues': []}
+
+    count = 0
+    issues = []
+    for axis, values, path_ids, point_ids, minimum, maximum in _axes(paths, settings):
+        bad = ~((values >= minimum) & (values <= maximum))  # also catches NaN
+        offending = np.flatnonzero(bad)
+        if not len(offending):
+            continue
+        count += len(offending)
+        bad_paths, first, points = np.unique(path_ids[offending], return_index=True, return_counts=True)
+        for path, index, n in zip(bad_paths, offending[first], points):
+            if len(issues) >= MAX_ISSUES:
+                break
+            issues.append({
+                'path': int(path),
+                'point': int(point_ids[index]),
+                'axis': axis,
+                'value': float(values[index]) if np.isfinite(values[index]) else None,
+                'min': minimum,
+                'max': maximum if np.isfinite(maximum) else None,
+                'points': int(n),
+            })
+    issues.sort(key=lambda issue: (issue['path'], issue['point']))
+    return {'count': count, 'issues': issues}
@@ -10,10 +10,17 @@ const DEFAULT_RUFF_SETTINGS = {
   },
 };
 
+// Selects no lint rules, so every diagnostic it reports is a syntax error
+const SYNTAX_CHECK_SETTINGS = {
+  ...DEFAULT_RUFF_SETTINGS,
+  lint: { select: [] },
+};
+
 let initPromise: Promise<void> | null = null;
 let workspaceInstance: Workspace | null = null;
+let syntaxWorkspaceInstance: Workspace | null = null;
 
-const ensureWorkspace = async (): Promise<Workspace> => {
+const ensureRuff = async (): Promise<void> => {
   if (!initPromise) {
     initPromise = initRuffWasm({ module_or_path: ruffWasmUrl })
       .then(() => undefined)
@@ -24,6 +31,10 @@ const ensureWorkspace = async (): Promise<Workspace> => {
   }
 
   await initPromise;
+};
+
+const ensureWorkspace = async (): Promise<Workspace> => {
+  await ensureRuff();
 
   if (!workspaceInstance) {
     workspaceInstance = new Workspace(DEFAULT_RUFF_SETTINGS, PositionEncoding.Utf16);
@@ -32,6 +43,16 @@ const ensureWorkspace = async (): Promise<Workspace> => {
   return workspaceInstance;
 };
 
+const ensureSyntaxWorkspace = async (): Promise<Workspace> => {
+  await ensureRuff();
+
+  if (!syntaxWorkspaceInstance) {
+    syntaxWorkspaceInstance = new Workspace(SYNTAX_CHECK_SETTINGS, PositionEncoding.Utf16);
+  }
+
+  return syntaxWorkspaceInstance;
+};
+
 export const formatPythonWithRuff = async (source: string): Promise<string> => {
   if (!source.trim()) {
     return source;
@@ -40,3 +61,10 @@ export const formatPythonWithRuff = async (source: string): Promise<string> => {
   const workspace = await ensureWorkspace();
   return workspace.format(source);
 };
+
+// Whether Ruff's parser rejects the source. Parsing is far cheaper than
+// running the script, so this gates speculative runs.
+export const hasPythonSyntaxErrors = async (source: string): Promise<boolean> => {
+  const workspace = await ensureSyntaxWorkspace();
+  return workspace.check(source).length > 0;
+};
@@ -0,0 +1,149 @@
+import { runBatch } from "./pyodide";
+import type { BatchResult } from "./pyodide";
+
+export type SweepParams = Record<string, number>;
+
+export interface SweepParameter {
+  name: string;
+  values: number[];
+}
+
+export const MAX_SWEEP_VARIANTS = 200;
+const MAX_CACHED_RESULTS = 64;
+
+const RANGE_PATTERN = /^(-?[\d.eE+-]+):(-?[\d.eE+-]+):([\d.eE+-]+)$/;
+
+function parseNumber(text: string, line: string): number {
+  const value = Number(text.trim());
+  if (text.trim() === "" || !Number.isFinite(value)) {
+    throw new Error(`Invalid number "${text.trim()}" in "${line}"`);
+  }
+  return value;
+}
+
+function parseValues(text: string, line: string): number[] {
+  const range = text.replace(/\s+/g, "").match(RANGE_PATTERN);
+  if (range) {
+    const start = parseNumber(range[1], line);
+    const stop = parseNumber(range[2], line);
+    const step = parseNumber(range[3], line);
+    if (step <= 0) {
+      throw new Error(`Step must be positive in "${line}"`);
+    }
+    const values: number[] = [];
+    // Inclusive of `stop`, tolerating floating point error in the steps.
+    const count = Math.floor((stop - start) / step + 1e-9);
+    for (let i = 0; i <= count; i++) {
+      values.push(Number((start + i * step).toPrecision(12)));
+    }
+    return values;
+  }
+  return text.split(",").map((value) => parseNumber(value, line));
+}
+
+// Parses a sweep spec with one parameter per line, either as a list
+// (`WAVE_AMPLITUDE = 0.8, 1.2, 1.6`) or as an inclusive range
+// (`TOTAL_LAYERS = 50:150:25`). Blank lines and `#` comments are ignored.
+export function parseSweepSpec(spec: string): SweepParameter[] {
+  const parameters: SweepParameter[] = [];
+  for (const rawLine of spec.split("\n")) {
+    const line = rawLine.replace(/#.*$/, "").trim();
+    if (!line) continue;
+
+    const match = line.match(/^([A-Za-z_]\w*)\s*=\s*(.+)$/);
+    if (!match) {
+      throw new Error(`Expected "NAME = values" but got "${line}"`);
+    }
+    const [, name, valuesText] = match;
+    if (parameters.some((p) => p.name === name)) {
+      throw new Error(`Parameter "${name}" is declared twice`);
+    }
+    const values = parseValues(valuesText, line);
+    if (values.length === 0) {
+      throw new Error(`No values for "${name}"`);
+    }
+    parameters.push({ name, values });
+  }
+  return parameters;
+}
+
+// Every combination of the parameter values.
+export function expandSweep(parameters: SweepParameter[]): SweepParams[] {
+  const count = parameters.reduce((n, p) => n * p.values.length, 1);
+  if (count > MAX_SWEEP_VARIANTS) {
+    throw new Error(
+      `The sweep has ${count} variants; at most ${MAX_SWEEP_VARIANTS} are allowed`,
+    );
+  }
+
+  let variants: SweepParams[] = [{}];
+  for (const { name, values } of parameters) {
+    variants = variants.flatMap((variant) =>
+      values.map((value) => ({ ...variant, [name]: value })),
+    );
+  }
+  return parameters.length > 0 ? variants : [];
+}
+
+// Results of earlier sweeps, keyed by script and parameter set, so that
+// extending a sweep only runs the new variants. Oldest entries are evicted.
+const resultCache = new Map<string, BatchResult>();
+
+function cacheKey(code: string, params: SweepParams): string {
+  return `${code}\0${JSON.stringify(params)}`;
+}
+
+function cacheResult(key: string, result: BatchResult) {
+  resultCache.delete(key);
+  resultCache.set(key, result);
+  while (resultCache.size > MAX_CACHED_RESULTS) {
+    const oldest = resultCache.keys().next().value;
+    if (oldest === undefined) break;
+    resultCache.delete(oldest);
+  }
+}
+
+// Runs every variant, reusing cached results, and reports each one through
+// `onResult` as soon as it is available.
+export async function runSweep(
+  code: string,
+  variants: SweepParams[],
+  onResult: (index: number, result: BatchResult | Error) => void,
+): Promise<void> {
+  const pending: number[] = [];
+  variants.forEach((params, index) => {
+    const cached = resultCache.get(cacheKey(code, params));
+    if (cached) {
+      onResult(index, cached);
+    } else {
+      pending.push(index);
+    }
+  });
+
+  if (pending.length === 0) return;
+
+  await runBatch(
+    code,
+    pending.map((index) => variants[index]),
+    (i, result) => {
+      const index = pending[i];
+      if (!(result instanceof Error)) {
+        cacheResult(cacheKey(code, variants[index]), result);
+      }
+      onResult(index, result);
+    },
+  );
+}
+
+export function formatParams(params: SweepParams): string {
+  return Object.entries(params)
+    .map(([name, value]) => `${name}=${value}`)
+    .join(", ");
+}
+
+// A filename-safe suffix such as `WAVE_AMPLITUDE-1.2_TOTAL_LAYERS-100`.
+export function paramsSlug(params: SweepParams): string {
+  return Object.entries(params)
+    .map(([name, value]) => `${name}-${value}`)
+    .join("_");
+}
@@ -0,0 +1,193 @@
+// Extrusions drawn at their bead size: one instance of a short prism per
+// move, stretched between the end points of the move and scaled to the width
+// and height of its bead (see RunLayer.sizes). The instances read the end
+// points straight from the line positions of a block, so tubes only add a
+// size and a line number per move.
+import * as THREE from "three";
+
+// Above this many moves the view draws lines instead
+export const TUBE_SEGMENT_BUDGET = 1_000_000;
+
+// Moves per mesh. Meshes are frustum culled one by one, so a zoomed-in view
+// only draws the chunks on screen.
+const TUBE_CHUNK_SIZE = 16384;
+
+// The bead cross-section, a flattened hexagon: y across the bead and z up,
+// both -1..1 and scaled by the shader
+const PROFILE: [number, number][] = [
+  [1, 0],
+  [0.5, 1],
+  [-0.5, 1],
+  [-1, 0],
+  [-0.5, -1],
+  [0.5, -1],
+];
+
+const vertexShader = /* glsl */ `
+attribute vec3 instanceStart;
+attribute vec3 instanceEnd;
+attribute vec2 instanceSize;
+attribute float instanceLine;
+uniform float selectedFrom;
+uniform float selectedTo;
+uniform vec3 colorBefore;
+uniform vec3 colorSelected;
+uniform vec3 colorAfter;
+varying vec3 vColor;
+varying vec3 vNormal;
+
+void main() {
+  vec3 move = instanceEnd - instanceStart;
+  float len = length(move);
+  vec3 forward = len > 0.0 ? move / len : vec3(1.0, 0.0, 0.0);
+  vec3 side = cross(vec3(0.0, 0.0, 1.0), forward);
+  side = length(side) > 1e-6 ? normalize(side) : vec3(1.0, 0.0, 0.0);
+  vec3 up = cross(forward, side);
+  vec2 radius = max(0.5 * instanceSize, vec2(1e-4));
+
+  // The nozzle is at the top of the bead. Both ends reach half a width past
+  // the points, which closes the gaps at corners.
+  vec3 center = mix(instanceStart, instanceEnd, position.x) - up * radius.y
+    + forward * (2.0 * position.x - 1.0) * radius.x;
+  vec3 transformed = center + side * position.y * radius.x + up * position.z * radius.y;
+  vNormal = normalize(normalMatrix * (side * normal.y / radius.x + up * normal.z / radius.y));
+  vColor = instanceLine < selectedFrom
+    ? colorBefore
+    : instanceLine <= selectedTo ? colorSelected : colorAfter;
+  gl_Position = projectionMatrix * modelViewMatrix * vec4(transformed, 1.0);
+}
+`;
+
+const fragmentShader = /* glsl */ `
+varying vec3 vColor;
+varying vec3 vNormal;
+
+void main() {
+  float light = 0.35 + 0.65 * abs(dot(normalize(vNormal), normalize(vec3(0.3, 0.5, 1.0))));
+  gl_FragColor = vec4(vColor * light, 1.0);
+  #include <colorspace_fragment>
+}
+`;
+
+let profile: THREE.BufferGeometry | null = null;
+
+// The profile swept from x = 0 (start of the move) to x = 1 (end)
+function getProfile(): THREE.BufferGeometry {
+  if (profile) return profile;
+  const positions: number[] = [];
+  const normals: number[] = [];
+  for (const x of [0, 1]) {
+    for (const [y, z] of PROFILE) {
+      const length = Math.hypot(y, z);
+      positions.push(x, y, z);
+      normals.push(0, y / length, z / length);
+    }
+  }
+  const sides = PROFILE.length;
+  const index: number[] = [];
+  for (let k = 0; k < sides; k++) {
+    const next = (k + 1) % sides;
+    index.push(k, next, sides + next, k, sides + next, sides + k);
+  }
+  profile = new THREE.BufferGeometry();
+  profile.setIndex(index);
+  profile.setAttribute(
+    "position",
+    new THREE.Float32BufferAttribute(positions, 3),
+  );
+  profile.setAttribute("normal", new THREE.Float32BufferAttribute(normals, 3));
+  return profile;
+}
+
+// The tubes of the moves of a block. `positions` holds the two end points of
+// each move, `lines` its line relative to the block start (ascending) and
+// `sizes` [relative line, width, height] from each of these lines on.
+export function buildTubes(
+  positions: Float32Array,
+  lines: Int32Array,
+  sizes: [number, number, number][],
+): THREE.InstancedBufferGeometry[] {
+  const count = lines.length;
+  const beadSizes = new Float32Array(2 * count);
+  let run = 0;
+  for (let i = 0; i < count; i++) {
+    while (run + 1 < sizes.length && sizes[run + 1][0] <= lines[i]) run++;
+    beadSizes[2 * i] = sizes[run][1];
+    beadSizes[2 * i + 1] = sizes[run][2];
+  }
+  const lineNumbers = Float32Array.from(lines);
+
+  const base = getProfile();
+  const chunks: THREE.InstancedBufferGeometry[] = [];
+  for (let start = 0; start < count; start += TUBE_CHUNK_SIZE) {
+    const end = Math.min(start + TUBE_CHUNK_SIZE, count);
+    const geometry = new THREE.InstancedBufferGeometry();
+    geometry.setIndex(base.index);
+    geometry.setAttribute("position", base.getAttribute("position"));
+    geometry.setAttribute("normal", base.getAttribute("normal"));
+    const points = positions.subarray(6 * start, 6 * end);
+    const ends = new THREE.InstancedInterleavedBuffer(points, 6);
+    geometry.setAttribute(
+      "instanceStart",
+      new THREE.InterleavedBufferAttribute(ends, 3, 0),
+    );
+    geometry.setAttribute(
+      "instanceEnd",
+      new THREE.InterleavedBufferAttribute(ends, 3, 3),
+    );
+    const chunkSizes = beadSizes.subarray(2 * start, 2 * end);
+    geometry.setAttribute(
+      "instanceSize",
+      new THREE.InstancedBufferAttribute(chunkSizes, 2),
+    );
+    geometry.setAttribute(
+      "instanceLine",
+      new THREE.InstancedBufferAttribute(lineNumbers.subarray(start, end), 1),
+    );
+    geometry.instanceCount = end - start;
+
+    // Three cannot compute the bounds of instances, and culls by them
+    let margin = 0;
+    for (const size of chunkSizes) margin = Math.max(margin, size);
+    geometry.boundingBox = new THREE.Box3()
+      .setFromArray(points)
+      .expandByScalar(margin);
+    geometry.boundingSphere = geometry.boundingBox.getBoundingSphere(
+      new THREE.Sphere(),
+    );
+    chunks.push(geometry);
+  }
+  return chunks;
+}
+
+// Moves on lines before `selectedFrom` are drawn in `colorBefore`, moves up
+// to `selectedTo` in `colorSelected` and the rest in `colorAfter`, with lines
+// relative to the block start (see setTubeSelection). Everything is after
+// the selection until it is set; for a single color pass it three times.
+export function createTubeMaterial(
+  colorBefore: number,
+  colorSelected: number,
+  colorAfter: number,
+): THREE.ShaderMaterial {
+  return new THREE.ShaderMaterial({
+    uniforms: {
+      selectedFrom: { value: -1 },
+      selectedTo: { value: -1 },
+      colorBefore: { value: new THREE.Color(colorBefore) },
+      colorSelected: { value: new THREE.Color(colorSelected) },
+      colorAfter: { value: new THREE.Color(colorAfter) },
+    },
+    vertexShader,
+    fragmentShader,
+    side: THREE.DoubleSide,
+  });
+}
+
+export function setTubeSelection(
+  material: THREE.ShaderMaterial,
+  selectedFrom: number,
+  selectedTo: number,
+) {
+  material.uniforms.selectedFrom.value = selectedFrom;
+  material.uniforms.selectedTo.value = selectedTo;
+}
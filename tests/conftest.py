@@ -0,0 +1,81 @@
+"""
+Shared fixtures of the Python runtime tests.
+
+The tests run the runtime package under CPython against the installed
+gcoordinator wheel, e.g. after `pip install public/gcoordinator-0.0.2-py3-none-any.whl`.
+"""
+
+import copy
+import pathlib
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'src' / 'python'))
+
+import gcoordinator as gc  # noqa: E402
+from gcoordinator.settings import get_settings, set_settings  # noqa: E402
+
+import gcoordinator_web  # noqa: E402
+
+KINEMATICS = ('Cartesian', 'NozzleTilt', 'BedTiltBC', 'BedRotate')
+
+
+@pytest.fixture(scope='session')
+def web():
+    """The runtime package, installed into gcoordinator."""
+    gcoordinator_web.install()
+    return gcoordinator_web
+
+
+@pytest.fixture(autouse=True)
+def settings():
+    """The settings of a test; the previous ones are restored afterwards."""
+    previous = get_settings()
+    current = copy.deepcopy(previous)
+    set_settings(current)
+    yield current
+    set_settings(previous)
+
+
+@pytest.fixture(params=KINEMATICS)
+def kinematics(request, settings):
+    """Runs a test once for every kinematics."""
+    settings['Hardware']['kinematics'] = request.param
+    return request.param
+
+
+def make_model(layers: int = 4) -> list:
+    """
+    Returns the paths of a small model: per layer a tilted, rotating circle
+    and two straight lines where the second starts at the end of the first.
+    """
+    paths = []
+    for layer in range(1, layers + 1):
+        z = layer * 0.2
+        t = np.linspace(0, 2 * np.pi, 80)
+        paths.append(gc.Path(10 * np.cos(t), 10 * np.sin(t), np.full_like(t, z), rot=0.1 * t, tilt=np.full_like(t, 0.1)))
+        x = np.linspace(-5, 5, 40)
+        paths.append(gc.Path(x, np.zeros_like(x), np.full_like(x, z)))
+        x = np.linspace(5, 8, 20)
+        paths.append(gc.Path(x, np.zeros_like(x), np.full_like(x, z)))
+    return paths
+
+
+def assert_derived(path):
+    """`coords` and the other derived attributes match the points of `path`."""
+    fresh = path.__class__(path.x, path.y, path.z, rot=path.rot, tilt=path.tilt)
+    np.testing.assert_allclose(np.asarray(path.coords, dtype=float), np.asarray(fresh.coords, dtype=float))
+    np.testing.assert_allclose(np.asarray(path.norms, dtype=float), np.asarray(fresh.norms, dtype=float))
+    assert list(getattr(path, 'sub_segment_cnt', [])) == list(getattr(fresh, 'sub_segment_cnt', []))
+
+
+def run(web, paths, draft: bool = False, **options):
+    """Generates `paths` like the web runner does and returns the `GCode` and its text."""
+    web.begin_run(draft=draft)
+    if options:
+        gc.set_output_options(**options)
+    gcode = gc.GCode(paths)
+    return gcode, gcode.generate()
@@ -0,0 +1,42 @@
+"""
+A minimal G-code interpreter for comparing the output of the generators.
+"""
+
+AXES = ('X', 'Y', 'Z')
+
+
+def replay(text: str) -> list:
+    """
+    Replays G-code text from the power-on state (G90, M82, at the origin).
+
+    Args:
+        text (str): G-code text.
+
+    Returns:
+        list: `(x, y, z, e, feed)` after every move, with `e` the total
+        filament extruded so far.
+    """
+    absolute, relative_e = True, False
+    position = dict.fromkeys(AXES, 0.0)
+    e = feed = 0.0
+    moves = []
+    for line in text.split('\n'):
+        words = line.partition(';')[0].split()
+        if not words:
+            continue
+        command, params = words[0].upper(), {word[0].upper(): float(word[1:]) for word in words[1:]}
+        if command == 'G90':
+            absolute = True
+        elif command == 'G91':
+            absolute = False
+        elif command in ('M82', 'M83'):
+            relative_e = command == 'M83'
+        elif command in ('G0', 'G1', 'G2', 'G3'):
+            feed = params.get('F', feed)
+            for axis in AXES:
+                if axis in params:
+                    position[axis] = params[axis] if absolute else position[axis] + params[axis]
+            if 'E' in params:
+                e = e + params['E'] if relative_e else params['E']
+            moves.append((position['X'], position['Y'], position['Z'], e, feed))
+    return moves
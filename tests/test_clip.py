@@ -0,0 +1,174 @@
+import numpy as np
+import pytest
+
+from gcoordinator.utils.contour import find_contours
+from gcoordinator.utils.polygon import points_in_polygon
+
+SQUARE = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=float)
+
+
+def _even_odd(points, outlines) -> np.ndarray:
+    """Brute-force ray casting over all edges of all outlines."""
+    crossings = np.zeros(len(points), dtype=int)
+    px, py = points[:, :1], points[:, 1:]
+    for outline in outlines:
+        outline = np.asarray(outline, dtype=float)
+        (x1, y1), (x2, y2) = outline.T, np.roll(outline, -1, axis=0).T
+        straddles = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_at = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crossings += np.sum(straddles & (px < x_at), axis=1)
+    return crossings % 2 == 1
+
+
+def _distance_to_edges(points, outlines) -> np.ndarray:
+    distance = np.full(len(points), np.inf)
+    for outline in outlines:
+        a = np.asarray(outline, dtype=float)
+        b = np.roll(a, -1, axis=0)
+        ab = b - a
+        length = np.maximum(np.sum(ab ** 2, axis=1), 1e-300)
+        t = np.clip(np.einsum('nmk,mk->nm', points[:, None] - a, ab) / length, 0, 1)
+        nearest = a + t[..., None] * ab
+        distance = np.minimum(distance, np.hypot(*(points[:, None] - nearest).T).T.min(axis=1))
+    return distance
+
+
+def _area(outlines) -> float:
+    """The signed shoelace area: outer outlines add, holes subtract."""
+    return sum(0.5 * np.sum(o[:, 0] * np.roll(o[:, 1], -1) - np.roll(o[:, 0], -1) * o[:, 1]) for o in outlines)
+
+
+def _test_points(rng, *regions, count=4000):
+    """Random points in the bounding box of the regions, away from their edges."""
+    outlines = [outline for region in regions for outline in region]
+    corners = np.concatenate(outlines)
+    points = rng.uniform(corners.min(axis=0) - 0.5, corners.max(axis=0) + 0.5, size=(count, 2))
+    return points[_distance_to_edges(points, outlines) > 1e-6]
+
+
+def _random_outline(rng, vertices):
+    """A random, usually self-crossing outline."""
+    return rng.uniform(-5, 5, size=(vertices, 2))
+
+
+DEGENERATE = {
+    'identical': ([SQUARE], [SQUARE]),
+    'shared edge': ([SQUARE], [SQUARE + [1, 0]]),
+    'shared corner': ([SQUARE], [SQUARE + [1, 1]]),
+    'overlapping edges': ([SQUARE * [2, 1]], [SQUARE * [2, 1] + [1, 0]]),
+    'disjoint': ([SQUARE], [SQUARE + [3, 0]]),
+    'nested with hole': ([SQUARE * 4, SQUARE + 1], [SQUARE * 2 + 0.5]),
+    'bowtie': ([np.array([[0, 0], [2, 2], [2, 0], [0, 2]], dtype=float)], [SQUARE + 0.5]),
+    'repeated and collinear vertices': (
+        [np.array([[0, 0], [0.5, 0], [0.5, 0], [1, 0], [1, 1], [0, 1], [0, 1]], dtype=float)],
+        [SQUARE + [0.5, 0.5]],
+    ),
+    'sliver': ([np.array([[0, 0], [2, 0], [1, 1e-12]], dtype=float)], [SQUARE]),
+}
+
+OPERATIONS = {
+    'union': np.logical_or,
+    'intersection': np.logical_and,
+    'difference': lambda a, b: a & ~b,
+}
+
+
+def _check_operation(web, name, a, b, rng):
+    result = getattr(web.clip, name)(a, b)
+    points = _test_points(rng, a, b, result)
+    expected = OPERATIONS[name](_even_odd(points, a), _even_odd(points, b))
+    np.testing.assert_array_equal(_even_odd(points, result), expected)
+    for outline in result:
+        np.testing.assert_array_equal(outline[0], outline[-1])
+
+
+@pytest.mark.parametrize('name', OPERATIONS)
+@pytest.mark.parametrize('seed', range(5))
+def test_operations_on_random_outlines(web, name, seed):
+    rng = np.random.default_rng(seed)
+    a = [_random_outline(rng, 8)]
+    b = [_random_outline(rng, 6), _random_outline(rng, 5)]
+    _check_operation(web, name, a, b, rng)
+
+
+@pytest.mark.parametrize('name', OPERATIONS)
+@pytest.mark.parametrize('case', DEGENERATE)
+def test_operations_on_degenerate_outlines(web, name, case):
+    a, b = DEGENERATE[case]
+    _check_operation(web, name, a, b, np.random.default_rng(0))
+
+
+def test_results_are_oriented(web):
+    result = web.clip.difference([SQUARE * 4], [SQUARE + 1])
+    areas = sorted(_area([outline]) for outline in result)
+    np.testing.assert_allclose(areas, [-1, 16])
+
+
+def test_offset_area_of_a_circle(web):
+    # a regular polygon with its edges moved along: its apothem changes by
+    # the distance, and mitered corners keep it regular
+    n, radius = 200, 10
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    circle = np.column_stack([radius * np.cos(t), radius * np.sin(t)])
+    for distance in (1, -1, -4):
+        apothem = radius * np.cos(np.pi / n) + distance
+        result = web.clip.offset([circle], distance)
+        assert len(result) == 1
+        assert _area(result) == pytest.approx(n * apothem ** 2 * np.tan(np.pi / n), rel=1e-9)
+
+
+def test_offset_area_of_a_square(web):
+    square = SQUARE * 10
+    assert _area(web.clip.offset([square], 1)) == pytest.approx(144)
+    assert _area(web.clip.offset([square], -1)) == pytest.approx(64)
+    assert web.clip.offset([square], -5.5) == []
+    # the hole of a frame closes when grown by more than half its width
+    frame = [square, (SQUARE * 2 + 4)[::-1]]
+    assert _area(web.clip.offset(frame, 0.5)) == pytest.approx(11 ** 2 - 1)
+    assert _area(web.clip.offset(frame, 1.5)) == pytest.approx(13 ** 2)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_contains_matches_points_in_polygon(web, seed):
+    rng = np.random.default_rng(seed)
+    outline = _random_outline(rng, 12)
+    points = _test_points(rng, [outline])
+    np.testing.assert_array_equal(web.clip.contains(points, outline), points_in_polygon(points, outline))
+    # outlines of a region combine with the even-odd rule
+    hole = outline * 0.5
+    expected = points_in_polygon(points, outline) ^ points_in_polygon(points, hole)
+    np.testing.assert_array_equal(web.clip.contains(points, [outline, hole]), expected)
+
+
+def _gyroid(x, y):
+    return np.sin(x) * np.cos(y) + np.sin(y) * np.cos(0.7) + np.sin(0.7) * np.cos(x)
+
+
+def _assert_same_contours(actual, expected):
+    assert len(actual) == len(expected)
+    for a, b in zip(actual, expected):
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize('lipschitz', [3.0, None])
+def test_find_contours_adaptive_matches_full_grid(web, lipschitz):
+    x = np.linspace(-20, 20, 201)
+    y = np.linspace(-15, 15, 151)
+    X, Y = np.meshgrid(x, y)
+    expected = find_contours(x, y, _gyroid(X, Y))
+    actual = web.adaptive_contour.find_contours_adaptive(x, y, _gyroid, lipschitz=lipschitz)
+    _assert_same_contours(actual, expected)
+
+
+def test_find_contours_adaptive_with_mask(web):
+    x = np.linspace(-20, 20, 201)
+    y = np.linspace(-15, 15, 151)
+    X, Y = np.meshgrid(x, y)
+    t = np.linspace(0, 2 * np.pi, 100, endpoint=False)
+    mask = [np.column_stack([12 * np.cos(t), 12 * np.sin(t)]), np.column_stack([4 * np.cos(t), 4 * np.sin(t)])]
+    values = _gyroid(X, Y)
+    values[~web.clip.contains(np.column_stack([X.ravel(), Y.ravel()]), mask).reshape(X.shape)] = np.nan
+    expected = find_contours(x, y, values)
+    actual = web.adaptive_contour.find_contours_adaptive(x, y, _gyroid, lipschitz=3.0, mask=mask)
+    _assert_same_contours(actual, expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from conftest import make_model, run
+from replay import replay
+
+
+def _extrusions(moves):
+    """The moves that extrude, as `(x, y, z, e)`, which compaction must keep."""
+    moves = np.array(moves)
+    extruding = np.diff(moves[:, 3], prepend=0) != 0
+    return moves[extruding, :4]
+
+
+@pytest.mark.parametrize('write', [False, True])
+def test_compacted_output_replays_the_same(web, kinematics, write):
+    plain = run(web, make_model())[1]
+    web.begin_run()
+    gcode = web.GCode(make_model(), compact=True)
+    if write:
+        chunks = []
+        gcode.write(chunks.append, chunk_size=512)
+        compacted = ''.join(chunks)
+    else:
+        compacted = gcode.generate()
+    assert len(compacted) < len(plain)
+    expected, actual = replay(plain), replay(compacted)
+    np.testing.assert_allclose(actual[-1][:4], expected[-1][:4], atol=1e-5)
+    np.testing.assert_allclose(_extrusions(actual), _extrusions(expected), atol=1e-5)
+
+
+def test_compact_seeds_absolute_mode(web):
+    # as the generators write it: no G90 before the first move
+    text = 'M83\nG1 F100 X1 Y2 Z3\nG1 F100 X1 Y2 Z3 E1\nG91\nG0 X1 Y0 Z0\nG90\n'
+    compacted = web.compact.compact_gcode(text)
+    assert compacted == 'M83\nG1 F100 X1 Y2 Z3\nG1 E1\nG0 X2.00000\n'
+    assert replay(compacted)[-1] == replay(text)[-1]
+
+
+def test_unknown_command_resets_the_callers_state(web):
+    state = web.compact.ModalState(relative_e=True)
+    web.compact.compact_gcode('G1 F100 X1 Y2 Z3\nG28\n', state)
+    # the next chunk must not drop the move to the position before G28
+    assert web.compact.compact_gcode('G1 F100 X1 Y2 Z3', state) == 'G1 F100 X1 Y2 Z3'
+
+
+def test_compacted_parallel_output_equals_sequential(web, kinematics, monkeypatch):
+    sequential = run(web, make_model(), compact=True)[1]
+    monkeypatch.setattr(web.parallel, 'MIN_PARALLEL_POINTS', 0)
+    web.begin_run()
+    header, items = web.parallel.plan(web.GCode(make_model(), compact=True), workers=3)
+    assert len(items) > 1
+    assert header + ''.join(web.parallel.emit(item) for item in items) == sequential
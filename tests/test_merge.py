@@ -0,0 +1,9 @@
+from conftest import assert_derived, make_model, run
+
+
+def test_merge_on_every_kinematics(web, kinematics):
+    gcode, _ = run(web, make_model(), merge_paths=True)
+    # the second line of each layer starts at the end of the first
+    assert gcode.report['merge'] == {'paths_before': 12, 'paths_after': 8}
+    for path in gcode.full_object:
+        assert_derived(path)
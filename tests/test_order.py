@@ -0,0 +1,35 @@
+import numpy as np
+
+from conftest import assert_derived, make_model, run
+
+
+def test_optimize_order_on_every_kinematics(web, kinematics):
+    paths = make_model()
+    # print the lines of every layer end to start, so reversing them helps
+    for i in range(1, len(paths), 3):
+        paths[i], paths[i + 1] = paths[i + 1], paths[i]
+    gcode, _ = run(web, paths, optimize_order=0.2)
+    report = gcode.report['order']
+    assert report['travel_after'] < report['travel_before']
+    assert any(path.x[0] > path.x[-1] for path in gcode.full_object)
+    for path in gcode.full_object:
+        assert_derived(path)
+        np.testing.assert_allclose(path.start_coord, np.asarray(path.coords, dtype=float)[0])
+
+
+def test_grid_finds_the_nearest_remaining_point(web):
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(0, 50, (500, 2)), np.zeros(500)])
+    grid = web.order._Grid(points)
+    alive = np.ones(len(points), dtype=bool)
+    for position in rng.uniform(-10, 60, (400, 3)):
+        distances = np.where(alive, np.linalg.norm(points - position, axis=1), np.inf)
+        nearest = grid.nearest(position)
+        assert distances[nearest] == distances.min()
+        grid.remove(nearest)
+        alive[nearest] = False
+
+
+def test_optimize_order_keeps_the_input_order_without_time(web):
+    paths = make_model()
+    assert web.order.optimize_order(paths, time_budget=0) == paths
@@ -0,0 +1,52 @@
+import gcoordinator as gc
+import numpy as np
+import pytest
+
+from conftest import make_model, run
+from replay import replay
+
+
+@pytest.mark.parametrize('kinematics', ['Cartesian', 'NozzleTilt'], indirect=True)
+def test_default_output_is_byte_identical(web, kinematics):
+    # the library sorts the paths in a PathList, which fails on the tuple
+    # attributes of the bed kinematics
+    expected = web.GCode.__bases__[0](make_model())
+    expected.generate()
+    assert run(web, make_model())[1] == expected.gcode
+
+
+def test_arcs_replay_the_same(web):
+    plain = run(web, make_model())[1]
+    fitted = run(web, make_model(), arc_tolerance=0.01)[1]
+    assert 'G2 ' in fitted or 'G3 ' in fitted
+    assert len(fitted) < len(plain)
+    expected, actual = replay(plain), replay(fitted)
+    # the arcs replace the points in between, the end and the filament stay;
+    # the plain output rounds every extrusion to 5 decimals
+    np.testing.assert_allclose(actual[-1][:3], expected[-1][:3], atol=1e-5)
+    assert abs(actual[-1][3] - expected[-1][3]) <= plain.count(' E') * 0.5e-5
+
+
+@pytest.mark.parametrize('kinematics', ['BedTiltBC', 'BedRotate'], indirect=True)
+def test_memo_hits_on_the_second_run(web, kinematics):
+    name = f'{kinematics}.update_attrs'
+    gc.clear_cache()
+    for misses, hits in ((True, False), (False, True)):
+        # the paths are built after `begin_run` resets the counters
+        web.begin_run()
+        web.GCode(make_model()).generate()
+        counters = gc.cache_info()['functions'][name]
+        assert (counters.get('misses', 0) > 0, counters.get('hits', 0) > 0) == (misses, hits)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_write_matches_generate(web, kinematics, compact):
+    web.begin_run()
+    expected = web.GCode(make_model(), compact=compact)
+    text = expected.generate()
+    for chunk_size in (1, 512, web.gcode.WRITE_CHUNK_SIZE):
+        web.begin_run()
+        gcode, chunks = web.GCode(make_model(), compact=compact), []
+        gcode.write(chunks.append, chunk_size=chunk_size)
+        assert ''.join(chunks) == text
+        assert gcode.path_lines == expected.path_lines
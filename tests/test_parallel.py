@@ -0,0 +1,29 @@
+import pytest
+
+from conftest import make_model, run
+
+
+@pytest.mark.parametrize('options', [{}, {'arc_tolerance': 0.01}, {'arc_tolerance': 0.01, 'compact': True}])
+def test_parallel_equals_sequential(web, kinematics, monkeypatch, options):
+    sequential = run(web, make_model(), **options)[1]
+
+    monkeypatch.setattr(web.parallel, 'MIN_PARALLEL_POINTS', 0)
+    web.begin_run()
+    gcode = web.GCode(make_model(), **options)
+    header, items = web.parallel.plan(gcode, workers=3)
+    assert len(items) > 1
+    assert header + ''.join(web.parallel.emit(item) for item in items) == sequential
+
+
+def test_only_splittable_paths_are_split(web, kinematics, monkeypatch):
+    monkeypatch.setattr(web.parallel, 'MIN_PARALLEL_POINTS', 0)
+    web.begin_run()
+    gcode = web.GCode(make_model())
+    gcode.apply_defaults_to_instances(gcode.full_object, gcode.default_settings)
+    pieces = [task[0] for task in web.parallel._tasks(gcode.full_object, max_points=10)]
+    if kinematics in web.parallel.SPLITTABLE_KINEMATICS:
+        assert len(pieces) > len(gcode.full_object)
+        for piece in pieces:
+            assert len(piece.coords) == len(piece.x)
+    else:
+        assert pieces == gcode.full_object
@@ -0,0 +1,10 @@
+from conftest import assert_derived, make_model, run
+
+
+def test_draft_on_every_kinematics(web, kinematics):
+    gcode, text = run(web, make_model(), draft=True)
+    report = gcode.report['quality']
+    assert report['points_after'] < report['points_before']
+    for path in gcode.full_object:
+        assert_derived(path)
+    assert text.count('\n') > 0
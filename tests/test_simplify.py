@@ -0,0 +1,18 @@
+import numpy as np
+
+from conftest import assert_derived, make_model, run
+
+
+def test_simplified_keeps_derived_attributes(web, kinematics):
+    for path in make_model(layers=1):
+        result = path.simplified(0.05)
+        assert len(result.x) <= len(path.x)
+        assert_derived(result)
+
+
+def test_simplify_option_on_every_kinematics(web, kinematics):
+    gcode, text = run(web, make_model(), simplify_tolerance=0.05)
+    assert gcode.report['simplify']['dropped'] > 0
+    assert text.count('\n') > 0
+    for path in gcode.full_object:
+        assert_derived(path)
@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+
+from conftest import make_model, run
+from replay import replay
+
+
+def test_stats_on_every_kinematics(web, kinematics):
+    gcode, _ = run(web, make_model())
+    info = json.loads(web.run_info(gcode))
+    summary = info['summary']
+    assert summary['points'] == sum(len(path.x) for path in gcode.full_object)
+    # the printed distance is measured along `coords`, as the extrusion is
+    expected = sum(
+        np.linalg.norm(np.diff(np.asarray(path.coords, dtype=float), axis=0), axis=1).sum()
+        for path in gcode.full_object
+    )
+    assert np.isclose(summary['print_distance'], expected)
+    assert summary['print_time'] > 0
+
+
+def test_filament_length_is_the_emitted_extrusion(web, kinematics):
+    # without retraction, the default, all E words are printing moves
+    gcode, text = run(web, make_model())
+    emitted = replay(text)[-1][3]
+    filament_length = gcode.stats()['filament_length']
+    # every E word is rounded to 5 decimals
+    assert abs(filament_length - emitted) <= text.count(' E') * 0.5e-5